@@ -52,6 +52,7 @@ import pudl.output.glue
 import pudl.output.ferc1
 import pudl.output.eia860
 import pudl.output.eia923
+import pudl.output.epacems
 import pudl.output.pudltabl
 import pudl.output.export
 
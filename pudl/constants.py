@@ -709,6 +709,72 @@ table_map_ferc1_pudl = {'fuel_ferc1': 'f1_fuel',
                         'purchased_power_ferc1': 'f1_purchased_pwr',
                         'accumulated_depreciation_ferc1': 'f1_accumdepr_prvsn'}
 
+# The columns of each FERC Form 1 DB table that the PUDL transforms use, and
+# so the only ones that are pulled out of the DB. Left out are the row_prvlg,
+# row_seq, report_prd and item fields which pudl.transform.ferc1._clean_cols()
+# would drop, along with fuel_cost_kwh and fuel_generaton, which don't make
+# sense for a single fuel. Tables which aren't listed here are pulled whole.
+ferc1_extract_columns = {
+    'fuel_ferc1': (
+        'respondent_id', 'report_year', 'spplmnt_num', 'row_number',
+        'plant_name', 'fuel', 'fuel_unit', 'fuel_quantity', 'fuel_avg_heat',
+        'fuel_cost_delvd', 'fuel_cost_burned', 'fuel_cost_btu'),
+    'plants_steam_ferc1': (
+        'respondent_id', 'report_year', 'spplmnt_num', 'row_number',
+        'plant_name', 'plant_kind', 'type_const', 'yr_const', 'yr_installed',
+        'tot_capacity', 'peak_demand', 'plant_hours', 'plnt_capability',
+        'when_not_limited', 'when_limited', 'avg_num_of_emp',
+        'net_generation', 'cost_land', 'cost_structure', 'cost_equipment',
+        'cost_of_plant_to', 'cost_per_kw', 'expns_operations', 'expns_fuel',
+        'expns_coolants', 'expns_steam', 'expns_steam_othr',
+        'expns_transfer', 'expns_electric', 'expns_misc_power',
+        'expns_rents', 'expns_allowances', 'expns_engnr', 'expns_structures',
+        'expns_boiler', 'expns_plants', 'expns_misc_steam',
+        'tot_prdctn_expns', 'expns_kwh', 'asset_retire_cost'),
+    'plants_small_ferc1': (
+        'respondent_id', 'report_year', 'spplmnt_num', 'row_number',
+        'plant_name', 'yr_constructed', 'capacity_rating', 'net_demand',
+        'net_generation', 'plant_cost', 'plant_cost_mw', 'operation',
+        'expns_fuel', 'expns_maint', 'kind_of_fuel', 'fuel_cost'),
+    'plants_hydro_ferc1': (
+        'respondent_id', 'report_year', 'spplmnt_num', 'row_number',
+        'project_no', 'plant_name', 'plant_kind', 'plant_const', 'yr_const',
+        'yr_installed', 'tot_capacity', 'peak_demand', 'plant_hours',
+        'favorable_cond', 'adverse_cond', 'avg_num_of_emp', 'net_generation',
+        'cost_of_land', 'cost_structure', 'cost_facilities',
+        'cost_equipment', 'cost_roads', 'cost_plant_total', 'cost_per_kw',
+        'expns_operations', 'expns_water_pwr', 'expns_hydraulic',
+        'expns_electric', 'expns_generation', 'expns_rents', 'expns_engnr',
+        'expns_structures', 'expns_dams', 'expns_plant', 'expns_misc_plant',
+        'expns_total', 'expns_kwh', 'asset_retire_cost'),
+    'plants_pumped_storage_ferc1': (
+        'respondent_id', 'report_year', 'spplmnt_num', 'row_number',
+        'project_no', 'plant_name', 'plant_kind', 'yr_const', 'yr_installed',
+        'tot_capacity', 'peak_demand', 'plant_hours', 'plant_capability',
+        'avg_num_of_emp', 'net_generation', 'energy_used', 'net_load',
+        'cost_land', 'cost_structures', 'cost_facilties', 'cost_wheels',
+        'cost_electric', 'cost_misc_eqpmnt', 'cost_roads',
+        'asset_retire_cost', 'cost_of_plant', 'cost_per_kw',
+        'expns_operations', 'expns_water_pwr', 'expns_pump_strg',
+        'expns_electric', 'expns_misc_power', 'expns_rents',
+        'expns_engneering', 'expns_structures', 'expns_dams', 'expns_plant',
+        'expns_misc_plnt', 'expns_producton', 'pumping_expenses',
+        'tot_prdctn_exns', 'expns_kwh'),
+    'plant_in_service_ferc1': (
+        'respondent_id', 'report_year', 'spplmnt_num', 'row_number',
+        'begin_yr_bal', 'addition', 'retirements', 'adjustments',
+        'transfers', 'yr_end_bal'),
+    'purchased_power_ferc1': (
+        'respondent_id', 'report_year', 'spplmnt_num', 'row_number',
+        'athrty_co_name', 'sttstcl_clssfctn', 'rtsched_trffnbr',
+        'avgmth_bill_dmnd', 'avgmth_ncp_dmnd', 'avgmth_cp_dmnd',
+        'mwh_purchased', 'mwh_recv', 'mwh_delvd', 'dmnd_charges',
+        'erg_charges', 'othr_charges', 'settlement_tot'),
+    'accumulated_depreciation_ferc1': (
+        'respondent_id', 'report_year', 'spplmnt_num', 'row_number',
+        'total_cde', 'electric_plant', 'future_plant', 'leased_plant'),
+}
+
 
 # This is the list of EIA923 tables that can be successfully pulled into PUDL
 eia923_pudl_tables = ('plants_eia923',
@@ -1614,45 +1680,107 @@ epacems_columns_to_ignore = {
     "CO2_RATE",
     "CO2_RATE_MEASURE_FLG",
 }
+# The values allowed in the different kinds of EPA CEMS measurement codes.
+# These are used both for the database ENUMs, and for the categorical columns
+# that hold the codes while the data is being processed.
+epacems_measurement_codes = (
+    "LME",
+    "Measured",
+    "Measured and Substitute",
+    "Other",
+    "Substitute",
+    "Undetermined",
+    "Unknown Code",
+    "",
+)
+epacems_nox_codes = (
+    "Calculated",
+    "LME",
+    "Measured",
+    "Measured and Substitute",
+    "Not Applicable",
+    "Other",
+    "Substitute",
+    "Undetermined",
+    "Unknown Code",
+    "",
+)
+epacems_measurement_code_dtype = pd.api.types.CategoricalDtype(
+    categories=epacems_measurement_codes)
+epacems_nox_code_dtype = pd.api.types.CategoricalDtype(
+    categories=epacems_nox_codes)
+epacems_state_dtype = pd.api.types.CategoricalDtype(
+    categories=sorted(cems_states.keys()))
+
 # Specify dtypes to for reading the CEMS CSVs
+# These are as compact as possible, since the CEMS data is very large, and
+# they are retained all the way through the transform step. See
+# epacems_dtypes, below.
 epacems_csv_dtypes = {
-    "STATE": str,
+    "STATE": epacems_state_dtype,
     # "FACILITY_NAME": str,  # Not reading from CSV
-    "ORISPL_CODE": int,
-    "UNITID": str,
+    # Some ORISPL codes (e.g. 880xxx for industrial facilities) are too big
+    # for a uint16.
+    "ORISPL_CODE": "uint32",
+    "UNITID": "category",
     # These op_date, op_hour, and op_time variables get converted to
     # operating_date, operating_datetime and operating_time_interval in
     # transform/epacems.py
-    "OP_DATE": str,
-    "OP_HOUR": int,
-    "OP_TIME": float,
-    "GLOAD (MW)": float,
-    "GLOAD": float,
-    "SLOAD (1000 lbs)": float,
-    "SLOAD (1000lb/hr)": float,
-    "SLOAD": float,
-    "SO2_MASS (lbs)": float,
-    "SO2_MASS": float,
-    "SO2_MASS_MEASURE_FLG": str,
+    # There are only a few dozen distinct dates in each monthly file, so they
+    # are stored as categories, and parsed once per category.
+    "OP_DATE": "category",
+    "OP_HOUR": "uint8",
+    "OP_TIME": "float32",
+    "GLOAD (MW)": "float32",
+    "GLOAD": "float32",
+    "SLOAD (1000 lbs)": "float32",
+    "SLOAD (1000lb/hr)": "float32",
+    "SLOAD": "float32",
+    "SO2_MASS (lbs)": "float32",
+    "SO2_MASS": "float32",
+    "SO2_MASS_MEASURE_FLG": epacems_measurement_code_dtype,
     # "SO2_RATE (lbs/mmBtu)": float,  # Not reading from CSV
     # "SO2_RATE": float,  # Not reading from CSV
     # "SO2_RATE_MEASURE_FLG": str,  # Not reading from CSV
-    "NOX_RATE (lbs/mmBtu)": float,
-    "NOX_RATE": float,
-    "NOX_RATE_MEASURE_FLG": str,
-    "NOX_MASS (lbs)": float,
-    "NOX_MASS": float,
-    "NOX_MASS_MEASURE_FLG": str,
-    "CO2_MASS (tons)": float,
-    "CO2_MASS": float,
-    "CO2_MASS_MEASURE_FLG": str,
+    "NOX_RATE (lbs/mmBtu)": "float32",
+    "NOX_RATE": "float32",
+    "NOX_RATE_MEASURE_FLG": epacems_nox_code_dtype,
+    "NOX_MASS (lbs)": "float32",
+    "NOX_MASS": "float32",
+    "NOX_MASS_MEASURE_FLG": epacems_nox_code_dtype,
+    "CO2_MASS (tons)": "float32",
+    "CO2_MASS": "float32",
+    "CO2_MASS_MEASURE_FLG": epacems_measurement_code_dtype,
     # "CO2_RATE (tons/mmBtu)": float,  # Not reading from CSV
     # "CO2_RATE": float,  # Not reading from CSV
     # "CO2_RATE_MEASURE_FLG": str,  # Not reading from CSV
-    "HEAT_INPUT (mmBtu)": float,
-    "HEAT_INPUT": float,
-    "FAC_ID": int,
-    "UNIT_ID": int,
+    "HEAT_INPUT (mmBtu)": "float32",
+    "HEAT_INPUT": "float32",
+    # These can be NA, so they use the pandas nullable integer type.
+    "FAC_ID": "Int32",
+    "UNIT_ID": "Int32",
+}
+# The data types of the transformed EPA CEMS data, as it is handed off to
+# the database or Apache Parquet loaders.
+epacems_dtypes = {
+    "state": epacems_state_dtype,
+    "plant_id_eia": "uint32",
+    "unitid": "category",
+    "operating_datetime_utc": pd.DatetimeTZDtype(tz="UTC"),
+    "operating_time_hours": "float32",
+    "gross_load_mw": "float32",
+    "steam_load_1000_lbs": "float32",
+    "so2_mass_lbs": "float32",
+    "so2_mass_measurement_code": epacems_measurement_code_dtype,
+    "nox_rate_lbs_mmbtu": "float32",
+    "nox_rate_measurement_code": epacems_nox_code_dtype,
+    "nox_mass_lbs": "float32",
+    "nox_mass_measurement_code": epacems_nox_code_dtype,
+    "co2_mass_tons": "float32",
+    "co2_mass_measurement_code": epacems_measurement_code_dtype,
+    "heat_content_mmbtu": "float32",
+    "facility_id": "Int32",
+    "unit_id_epa": "Int32",
 }
 epacems_columns_fill_na_dict = {
     "gross_load_mw": 0.0,
@@ -4,7 +4,13 @@ Retrieve data from EPA CEMS hourly zipped CSVs.
 This modules pulls data from EPA's published CSV files.
 """
 import os
+import io
+import hashlib
+import collections
+import concurrent.futures
+import zipfile
 import pandas as pd
+import pudl.helpers
 from pudl.settings import SETTINGS
 import pudl.constants as pc
 
@@ -36,39 +42,291 @@ def get_epacems_file(year, month, state):
     Returns:
         path to EPA CEMS zipfiles for that year, month, and state.
     """
-    state = state.lower()
-    month = str(month).zfill(2)
-    filename = f'epacems{year}{state}{month}.zip'
-    full_path = os.path.join(get_epacems_dir(year), filename)
+    full_path = _epacems_path(year, month, state)
     assert os.path.isfile(full_path), (
-        f"ERROR: Failed to find EPA CEMS file for {state}, {year}-{month}.\n" +
-        f"Expected it here: {full_path}")
+        f"ERROR: Failed to find EPA CEMS file for {state.lower()}, "
+        f"{year}-{str(month).zfill(2)}.\nExpected it here: {full_path}")
     return full_path
 
 
-def read_cems_csv(filename):
-    """Read one CEMS CSV file
-    Note that some columns are not read. See epacems_columns_to_ignores.
+def _epacems_path(year, month, state):
+    """Where the EPA CEMS zipfile for a year, month and state should be."""
+    filename = f'epacems{year}{state.lower()}{str(month).zfill(2)}.zip'
+    return os.path.join(get_epacems_dir(year), filename)
+
+
+def available_months(year, state):
+    """
+    Find which months of EPA CEMS data there are files for, in a state-year.
+
+    EPA publishes the data for the current year a month or a quarter at a
+    time, so the most recent year usually isn't complete.
+
+    Args:
+        year (int): The year of the data.
+        state (str): The state of the data.
+    Returns:
+        list: The months (1-12) whose zip files exist, in order.
+    """
+    return [month for month in range(1, 13)
+            if os.path.isfile(_epacems_path(year, month, state))]
+
+
+def _months_to_read(year, state, months=None):
+    """The months to read for a state-year. See extract()."""
+    if months is not None and (year, state) in months:
+        return list(months[(year, state)])
+    found = available_months(year, state)
+    assert found, (
+        f"ERROR: Failed to find any EPA CEMS files for {state}, {year}.\n"
+        f"Expected them here: {get_epacems_dir(year)}")
+    return found
+
+
+def checksum(year, state, months=None):
+    """
+    Calculate a checksum of the monthly EPA CEMS files for a state-year.
+
+    If EPA republishes any of the files, adds more data to them, or adds
+    another month, the checksum will change, so it can be used to tell when
+    a state-year of data needs to be reloaded.
+
+    Args:
+        year (int): The year of the data.
+        state (str): The state of the data.
+        months (iterable): The months to include. Defaults to the ones there
+            are files for (see available_months()).
+    Returns:
+        str: The hex SHA-256 digest of the contents of the monthly zip files,
+        in order.
     """
+    if months is None:
+        months = available_months(year, state)
+    digest = hashlib.sha256()
+    for month in months:
+        with open(get_epacems_file(year, month, state), 'rb') as f:
+            for block in iter(lambda: f.read(1024**2), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+# Reading a column straight into a categorical with fixed categories would
+# silently turn any other values into NA, so those columns are read with
+# whatever categories they have, and checked by _check_categories().
+_FIXED_CATEGORIES = {
+    col: dtype for col, dtype in pc.epacems_csv_dtypes.items()
+    if isinstance(dtype, pd.api.types.CategoricalDtype)
+}
+_CSV_READ_DTYPES = {**pc.epacems_csv_dtypes,
+                    **{col: 'category' for col in _FIXED_CATEGORIES}}
+
+
+def _check_categories(df, filename):
+    """
+    Cast the columns with fixed categories (e.g. measurement codes) to them.
+
+    Raises:
+        ValueError: If a column has values that aren't among its categories,
+            e.g. a measurement code the database ENUM doesn't know about.
+    """
+    for col, dtype in _FIXED_CATEGORIES.items():
+        if col not in df.columns:
+            continue
+        unknown = df[col].cat.categories.difference(dtype.categories)
+        if len(unknown) > 0:
+            raise ValueError(
+                f"{df[col].isin(unknown).sum()} records in {filename} have "
+                f"unrecognized {col} values: {list(unknown)}")
+        df[col] = df[col].astype(dtype)
+    return df
+
+
+def _read_cems_csv_pandas(filename):
+    """Read one CEMS CSV file using pandas.read_csv()."""
     df = pd.read_csv(
         filename,
         index_col=False,
         usecols=lambda col: col not in pc.epacems_columns_to_ignore,
-        dtype=pc.epacems_csv_dtypes,
-    ).rename(columns=pc.epacems_rename_dict)
+        dtype=_CSV_READ_DTYPES,
+    )
+    df = _check_categories(df, filename).rename(
+        columns=pc.epacems_rename_dict)
+    return df
+
+
+def _arrow_type(dtype):
+    """Translate one of the epacems_csv_dtypes into a pyarrow data type."""
+    import pyarrow as pa
+    if dtype is str:
+        return pa.string()
+    if pd.api.types.is_categorical_dtype(dtype):
+        return pa.dictionary(pa.int32(), pa.string())
+    if pd.api.types.is_extension_array_dtype(dtype):
+        # The pandas nullable integer types
+        return pa.from_numpy_dtype(pd.api.types.pandas_dtype(dtype).type)
+    return pa.from_numpy_dtype(pd.api.types.pandas_dtype(dtype))
+
+
+def _read_cems_csv_pyarrow(filename):
+    """
+    Read one zipped CEMS CSV file using the multithreaded pyarrow CSV reader.
+
+    The zip archive member is decompressed as a stream, rather than being
+    unpacked in memory first. The measurement code columns are read directly
+    into dictionary encoded arrays, which become pandas categoricals, rather
+    than Python object strings. The returned DataFrame has the same columns
+    and data types as the one returned by the pandas reader.
+    """
+    import pyarrow.csv
+
+    with zipfile.ZipFile(filename) as zf:
+        # Each of the EPA zipfiles contains exactly one CSV.
+        member = zf.namelist()[0]
+        # The column names vary over time (e.g. "GLOAD" vs. "GLOAD (MW)") so
+        # we need to look at the header before we can tell pyarrow the types.
+        with zf.open(member) as f:
+            header = io.TextIOWrapper(f).readline()
+        columns = [c.strip().strip('"') for c in header.split(',')]
+        columns = [c for c in columns
+                   if c not in pc.epacems_columns_to_ignore]
+        column_types = {col: _arrow_type(pc.epacems_csv_dtypes.get(col, str))
+                        for col in columns}
+        with zf.open(member) as f:
+            table = pyarrow.csv.read_csv(
+                f,
+                read_options=pyarrow.csv.ReadOptions(use_threads=True),
+                convert_options=pyarrow.csv.ConvertOptions(
+                    column_types=column_types,
+                    include_columns=columns,
+                    # pandas treats empty strings as NA. Do the same here.
+                    strings_can_be_null=True,
+                ),
+            )
+    # The dictionary encoded columns come back with whatever categories were
+    # found in the file, and integer columns with nulls come back as floats,
+    # so make the types match the ones we'd get from pandas.
+    df = table.to_pandas().astype(
+        {col: _CSV_READ_DTYPES[col] for col in columns
+         if col in _CSV_READ_DTYPES})
+    # Where the categories aren't fixed ahead of time, pandas sorts the ones
+    # it finds, but pyarrow lists them in the order they appear.
+    for col in df.columns:
+        if isinstance(pc.epacems_csv_dtypes.get(col), str) and \
+                pc.epacems_csv_dtypes[col] == 'category':
+            df[col] = df[col].cat.reorder_categories(
+                df[col].cat.categories.sort_values())
+    df = _check_categories(df, filename).rename(
+        columns=pc.epacems_rename_dict)
     return df
 
 
-def extract(epacems_years, states, verbose=True):
+def read_cems_csv(filename, engine='pandas'):
+    """Read one CEMS CSV file
+    Note that some columns are not read. See epacems_columns_to_ignores.
+
+    Args:
+        filename (str): Path to a zipped monthly EPA CEMS CSV file.
+        engine (str): Which CSV reader to use. Either 'pandas' (the default)
+            or 'pyarrow', which reads the file using multiple threads. Both
+            return the same columns and data types.
+    Returns:
+        pandas.DataFrame: The CEMS data, with the columns renamed according
+        to pc.epacems_rename_dict.
+    """
+    if engine == 'pandas':
+        return _read_cems_csv_pandas(filename)
+    if engine == 'pyarrow':
+        return _read_cems_csv_pyarrow(filename)
+    raise ValueError(f"Unrecognized EPA CEMS CSV reader engine: {engine}")
+
+
+def _concat_months(dfs):
+    """Concatenate the monthly DataFrames, keeping categoricals compact."""
+    return pd.concat(pudl.helpers.unify_categories(dfs),
+                     sort=True, copy=False, ignore_index=True)
+
+
+def _extract_parallel(epacems_years, states, workers, csv_engine='pandas',
+                      verbose=True, months=None):
+    """
+    Extract the EPA CEMS hourly data using a pool of worker processes.
+
+    Each (year, state, month) CSV is read in a separate task. A limited number
+    of state-years are kept in flight at a time, so that the workers stay busy
+    without the whole dataset piling up in memory while the consumer of this
+    generator transforms and loads the results. The state-years are yielded in
+    the same order as the serial extract().
+
+    Args:
+        epacems_years (iterable): The years of data to extract.
+        states (iterable): The states (two letter abbreviations) to extract.
+        workers (int): The number of worker processes to use.
+        csv_engine (str): The CSV reader engine. See read_cems_csv().
+        verbose (bool): If True, print progress messages.
+        months (dict): Which months to read. See extract().
+    Yields:
+        dict: A one-item dictionary mapping (year, state) to a DataFrame.
+    """
+    year_states = iter([(year, state)
+                        for year in epacems_years for state in states])
+    # Each state-year is up to 12 tasks. Keep enough of them queued up that
+    # every worker has something to do, plus one more waiting in the wings.
+    in_flight = -(-workers // 12) + 1
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = collections.deque()
+
+        def submit_next():
+            try:
+                year, state = next(year_states)
+            except StopIteration:
+                return
+            futures = [pool.submit(read_cems_csv,
+                                   get_epacems_file(year, month, state),
+                                   engine=csv_engine)
+                       for month in _months_to_read(year, state, months)]
+            pending.append(((year, state), futures))
+
+        for _ in range(in_flight):
+            submit_next()
+        while pending:
+            (year, state), futures = pending.popleft()
+            submit_next()
+            # Wait on the months in order, so the output is deterministic.
+            dfs = [f.result() for f in futures]
+            if verbose:
+                print(f"        {year} {state}", flush=True)
+            yield {(year, state): _concat_months(dfs)}
+
+
+def extract(epacems_years, states, verbose=True, workers=1,
+            csv_engine='pandas', months=None):
     """
     Extract the EPA CEMS hourly data.
 
     This function is the main function of this file. It returns a generator
     for extracted DataFrames.
+
+    Args:
+        epacems_years (iterable): The years of data to extract.
+        states (iterable): The states (two letter abbreviations) to extract.
+        verbose (bool): If True, print progress messages.
+        workers (int): The number of processes to use for reading the monthly
+            CSV files. With 1 (the default) everything is read serially in
+            this process. Either way, the state-years are yielded in the
+            same order.
+        csv_engine (str): Which CSV reader to use, either 'pandas' or
+            'pyarrow'. See read_cems_csv().
+        months (dict): {(year, state): months} to read for each state-year.
+            By default (and for any state-years not in it), all the months
+            there are files for are read (see available_months()).
     """
-    # TODO: this is really slow. Can we do some parallel processing?
     if verbose:
         print("Extracting EPA CEMS data...", flush=True)
+    if workers is not None and workers > 1:
+        yield from _extract_parallel(epacems_years, states,
+                                     workers=workers, csv_engine=csv_engine,
+                                     verbose=verbose, months=months)
+        return
     for year in epacems_years:
         if verbose:
             print(f"    {year}:", flush=True)
@@ -77,17 +335,15 @@ def extract(epacems_years, states, verbose=True):
             if verbose:
                 print(f"        {state}:", end=" ", flush=True)
             dfs = []
-            for month in range(1, 13):
+            for month in _months_to_read(year, state, months):
                 filename = get_epacems_file(year, month, state)
 
                 if verbose:
                     print(f"{month}", end=" ", flush=True)
-                dfs.append(read_cems_csv(filename))
+                dfs.append(read_cems_csv(filename, engine=csv_engine))
             # Return a dictionary where the key identifies this dataset
             # (just like the other extract functions), but unlike the
             # others, this is yielded as a generator (and it's a one-item
             # dictionary).
             print(" ", flush=True)  # newline...
-            yield {
-                (year, state): pd.concat(dfs, sort=True, copy=False, ignore_index=True)
-            }
+            yield {(year, state): _concat_months(dfs)}
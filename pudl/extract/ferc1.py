@@ -2,41 +2,188 @@
 import os.path
 import string
 import re
+import mmap
+import json
+import hashlib
+import struct
 import datetime
+import collections
+import concurrent.futures
+import numpy as np
 import pandas as pd
 import sqlalchemy as sa
-import dbfread
+import dbfread.codepages
+import pudl
 from pudl.settings import SETTINGS
 import pudl.constants as pc
 
 # MetaData object will contain the ferc1 database schema.
 ferc1_meta = sa.MetaData()
 
+# Which years of which tables are in the FERC Form 1 DB, and which DBF files
+# they came from. Used to tell which of them need to be (re)loaded when the
+# DB is updated incrementally. It's kept apart from ferc1_meta, which is
+# cleared whenever the rest of the schema is defined.
+manifest_meta = sa.MetaData()
+ferc1_load_manifest = sa.Table(
+    'f1_load_manifest', manifest_meta,
+    sa.Column('report_year', sa.SmallInteger, primary_key=True),
+    sa.Column('table_name', sa.String, primary_key=True),
+    sa.Column('checksum', sa.String, nullable=False,
+              comment="SHA-256 digest of the DBF file."),
+    sa.Column('row_count', sa.Integer, nullable=False),
+    sa.Column('loaded_at', sa.TIMESTAMP(timezone=True), nullable=False),
+)
+
+# Respondents whose records are left out of the FERC Form 1 DB clone.
+BAD_RESPONDENTS = (514, 515, 516, 517, 518, 519, 522)
+
 ###########################################################################
 # Functions related to ingest & processing of FERC Form 1 data.
 ###########################################################################
 
 
-def connect_db(testing=False):
+# Where the FERC Form 1 DB can be kept: in PostgreSQL, or in a SQLite file.
+BACKENDS = ('postgres', 'sqlite')
+
+
+def connect_db(testing=False, backend='postgres'):
     """
     Connect to the FERC Form 1 DB using global settings from settings.py.
 
+    Args:
+        testing (bool): If True, connect to the test DB.
+        backend (str): 'postgres' for the PostgreSQL DB, or 'sqlite' for the
+            SQLite file that can stand in for it. The same SQLAlchemy
+            statements work with either of them.
+
     Returns sqlalchemy engine instance.
     """
-    if testing:
-        return sa.create_engine(sa.engine.url.URL(**SETTINGS['db_ferc1_test']))
-
-    return sa.create_engine(sa.engine.url.URL(**SETTINGS['db_ferc1']))
+    if backend not in BACKENDS:
+        raise ValueError(
+            f"Unknown FERC Form 1 DB backend {backend}. "
+            f"Use one of {BACKENDS}.")
+    settings = 'db_ferc1_test' if testing else 'db_ferc1'
+    if backend == 'sqlite':
+        settings += '_sqlite'
+        os.makedirs(os.path.dirname(SETTINGS[settings]['database']),
+                    exist_ok=True)
+    return sa.create_engine(sa.engine.url.URL(**SETTINGS[settings]))
 
 
 def _create_tables(engine):
     """Create the FERC Form 1 DB tables."""
     ferc1_meta.create_all(engine)
+    manifest_meta.create_all(engine)
 
 
 def drop_tables(engine):
     """Drop the FERC Form 1 DB tables."""
     ferc1_meta.drop_all(engine)
+    manifest_meta.drop_all(engine)
+
+
+def dbf_checksum(year, dbf, basedir=SETTINGS['ferc1_data_dir']):
+    """
+    Calculate a checksum of one year of a FERC Form 1 DBF file.
+
+    Args:
+        year (int): The year of the data.
+        dbf (str): The DBF file, e.g. 'F1_1'.
+    Returns:
+        str: The hex SHA-256 digest of the contents of the file.
+    """
+    digest = hashlib.sha256()
+    filename = os.path.join(datadir(year, basedir), '{}.DBF'.format(dbf))
+    with open(filename, 'rb') as f:
+        for block in iter(lambda: f.read(1024**2), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def loaded_checksums(engine):
+    """
+    Look up the DBF file checksums of the years & tables already loaded.
+
+    Returns:
+        dict: {(report_year, table_name): checksum}
+    """
+    ferc1_load_manifest.create(engine, checkfirst=True)
+    rows = engine.execute(sa.select(
+        [ferc1_load_manifest.c.report_year, ferc1_load_manifest.c.table_name,
+         ferc1_load_manifest.c.checksum]))
+    return {(year, table): checksum for year, table, checksum in rows}
+
+
+def record_loads(engine, row_counts, checksums):
+    """
+    Record years of FERC Form 1 tables as loaded, in the load manifest.
+
+    Args:
+        engine (sqlalchemy.engine.Engine): The FERC Form 1 DB engine.
+        row_counts (dict): {(report_year, table_name): records loaded}
+        checksums (dict): {(report_year, table_name): DBF file checksum}
+    """
+    ferc1_load_manifest.create(engine, checkfirst=True)
+    loaded_at = datetime.datetime.now(datetime.timezone.utc)
+    manifest = ferc1_load_manifest
+    with engine.begin() as conn:
+        for (year, table), row_count in row_counts.items():
+            conn.execute(manifest.delete().where(sa.and_(
+                manifest.c.report_year == year,
+                manifest.c.table_name == table)))
+            conn.execute(manifest.insert().values(
+                report_year=year, table_name=table,
+                checksum=checksums[(year, table)], row_count=row_count,
+                loaded_at=loaded_at))
+
+
+def reconcile_schema(engine, verbose=False):
+    """
+    Bring the FERC Form 1 DB tables up to date with ferc1_meta, keeping data.
+
+    Tables which don't exist yet are created. Columns which are missing from
+    the existing tables (e.g. because the DB was defined from an older
+    reference year) are added, and can be NULL. Text columns which are too
+    narrow are widened. Nothing is ever dropped: columns which are no longer
+    in the schema are left alone, and are NULL in newly loaded records.
+
+    Returns:
+        list: The ALTER TABLE statements that were run.
+    """
+    ferc1_meta.create_all(engine, checkfirst=True)
+    manifest_meta.create_all(engine, checkfirst=True)
+    inspector = sa.inspect(engine)
+    changes = []
+    for table in ferc1_meta.sorted_tables:
+        existing = {c['name']: c['type']
+                    for c in inspector.get_columns(table.name)}
+        for col in table.columns:
+            col_type = col.type.compile(dialect=engine.dialect)
+            if col.name not in existing:
+                changes.append(f'ALTER TABLE {table.name} '
+                               f'ADD COLUMN "{col.name}" {col_type}')
+            # SQLite doesn't enforce lengths, or let columns be altered.
+            elif (engine.dialect.name != 'sqlite' and
+                  isinstance(col.type, sa.String) and col.type.length and
+                  getattr(existing[col.name], 'length', None) and
+                  existing[col.name].length < col.type.length):
+                changes.append(f'ALTER TABLE {table.name} '
+                               f'ALTER COLUMN "{col.name}" TYPE {col_type}')
+    with engine.begin() as conn:
+        for sql in changes:
+            conn.execute(sql)
+    if verbose:
+        for sql in changes:
+            print(f"    {sql}")
+    return changes
+
+
+def _delete_year(engine, table_name, year):
+    """Delete the records from one report_year of a FERC Form 1 table."""
+    table = ferc1_meta.tables[table_name]
+    result = engine.execute(table.delete().where(table.c.report_year == year))
+    return result.rowcount
 
 
 def datadir(year, basedir=SETTINGS['ferc1_data_dir']):
@@ -50,57 +197,262 @@ def dbc_filename(year, basedir=SETTINGS['ferc1_data_dir']):
     return os.path.join(datadir(year, basedir), 'F1_PUB.DBC')
 
 
-def get_strings(filename, min_length=4):
-    """
-    Extract printable strings from a binary and return them as a generator.
+###########################################################################
+# A vectorized reader for the FoxPro DBF files the FERC Form 1 data comes in.
+###########################################################################
+# See https://www.clicketyclick.dk/databases/xbase/format/dbf.html and
+# https://docs.microsoft.com/en-us/previous-versions/visualstudio/foxpro/st4a0s68(v=vs.80)
+# for the file format. A DBF file is a header describing the fields, followed
+# by fixed width records. Each record starts with a deletion flag byte ('*'
+# for deleted records), followed by each of the fields in order.
 
-    This is meant to emulate the Unix "strings" command, for the purposes of
-    grabbing database table and column names from the F1_PUB.DBC file that is
-    distributed with the FERC Form 1 data.
+# One field of a DBF file. Nullable fields have a bit in _NullFlags.
+DBFField = collections.namedtuple(
+    'DBFField',
+    ['name', 'type', 'offset', 'length', 'decimal_count', 'nullable'])
+
+# Julian day number of 1970-01-01, for decoding FoxPro datetimes.
+JULIAN_UNIX_EPOCH = 2440588
+
+
+def dbf_header(dbf_filename):
     """
-    with open(filename, errors="ignore") as f:
-        result = ""
-        for c in f.read():
-            if c in string.printable:
-                result += c
-                continue
-            if len(result) >= min_length:
-                yield result
-            result = ""
-        if len(result) >= min_length:  # catch result at EOF
-            yield result
+    Read the header of a DBF file, without reading any of its records.
 
+    Returns:
+        dict: numrecords, headerlen and recordlen (in bytes), the text
+        encoding (guessed from the language driver the same way dbfread does)
+        and the list of DBFField descriptions of the fields.
+    """
+    with open(dbf_filename, 'rb') as f:
+        head = f.read(32)
+        numrecords, headerlen, recordlen = struct.unpack_from('<IHH', head, 4)
+        fields = []
+        # The deletion flag comes first, so the fields start at offset 1.
+        offset = 1
+        while True:
+            desc = f.read(32)
+            if not desc or desc[:1] in (b'\r', b'\n'):
+                break
+            field = DBFField(
+                name=desc[:11].split(b'\0')[0].decode('ascii'),
+                type=chr(desc[11]),
+                offset=offset,
+                length=desc[16],
+                decimal_count=desc[17],
+                nullable=bool(desc[18] & 0x02))
+            fields.append(field)
+            offset += field.length
+    # Don't read past the end of a truncated file.
+    numrecords = min(numrecords, max(
+        os.path.getsize(dbf_filename) - headerlen, 0) // recordlen)
+    return {
+        'numrecords': numrecords,
+        'headerlen': headerlen,
+        'recordlen': recordlen,
+        'encoding': dbfread.codepages.guess_encoding(head[29]),
+        'fields': fields,
+    }
+
+
+def dbf_field_names(dbf_filename):
+    """The names of the data fields in a DBF file, without _NullFlags."""
+    return [f.name for f in dbf_header(dbf_filename)['fields']
+            if f.type != '0']
+
+
+def _decode_dbf_text(values, encoding):
+    """Decode fixed width byte strings, stripping the NUL & space padding."""
+    # Text columns have few distinct values, so decode each of them once.
+    uniques, inverse = np.unique(values, return_inverse=True)
+    decoded = np.array([u.rstrip(b'\0 ').decode(encoding) for u in uniques] +
+                       [None], dtype=object)
+    return decoded[inverse]
+
+
+def _decode_dbf_number(values):
+    """Decode right justified ASCII numbers, which may be blank or '*'s."""
+    values = np.char.strip(np.char.strip(values), b'*')
+    blank = values == b''
+    out = np.full(len(values), np.nan)
+    out[~blank] = np.char.replace(
+        values[~blank], b',', b'.').astype(np.float64)
+    return out
+
+
+def _decode_dbf_field(values, field, encoding):
+    """Decode one column of a structured array of DBF records."""
+    if field.type == 'C':
+        return _decode_dbf_text(values, encoding)
+    if field.type in 'NF':
+        return _decode_dbf_number(values)
+    if field.type in 'I+':
+        return values.astype(np.int64)
+    if field.type in 'BO':
+        return values.astype(np.float64)
+    if field.type == 'Y':
+        # Currency is a 64 bit integer, in units of 1/10000.
+        return values.astype(np.int64) / 10000
+    if field.type == 'D':
+        # YYYYMMDD, with blanks or zeroes for missing dates.
+        valid = np.char.strip(values, b' 0') != b''
+        out = np.full(len(values), np.datetime64('NaT'), dtype='M8[ns]')
+        out[valid] = pd.to_datetime(values[valid].astype(str),
+                                    format='%Y%m%d').values
+        return out
+    if field.type == 'T':
+        # Julian day number and milliseconds since midnight.
+        days = values[:, 0].astype(np.int64) - JULIAN_UNIX_EPOCH
+        msec = days * 86400000 + values[:, 1].astype(np.int64)
+        out = msec.astype('M8[ms]').astype('M8[ns]')
+        out[values[:, 0] == 0] = np.datetime64('NaT')
+        return out
+    if field.type == 'L':
+        out = pd.array(np.full(len(values), pd.NA), dtype='boolean')
+        out[np.isin(values, [b'T', b't', b'Y', b'y'])] = True
+        out[np.isin(values, [b'F', b'f', b'N', b'n'])] = False
+        return out
+    if field.type == 'M':
+        # The memo itself lives in a separate file. Keep the block number
+        # pointing to it, which is either binary or text.
+        if field.length == 4:
+            out = values.astype(np.int64).astype(object)
+        else:
+            out = _decode_dbf_number(values).astype(object)
+            out[pd.isnull(out)] = 0
+        out[out == 0] = None
+        return out
+    raise ValueError(f"Can't read DBF fields of type {field.type}.")
+
+
+def _dbf_dtype(fields, recordlen):
+    """The numpy structured dtype of the records in a DBF file."""
+    formats = {'I': '<i4', '+': '<i4', 'B': '<f8', 'O': '<f8', 'Y': '<i8',
+               'T': ('<i4', 2)}
+    return np.dtype({
+        'names': ['_deleted'] + [f.name for f in fields],
+        'formats': ['S1'] + [
+            formats.get(f.type, f'S{f.length}') if f.type != 'M' or
+            f.length != 4 else '<i4' for f in fields],
+        'offsets': [0] + [f.offset for f in fields],
+        'itemsize': recordlen,
+    })
+
+
+def _dbf_frame(records, fields, columns, encoding, null_flags):
+    """Decode some DBF records into a DataFrame. See read_dbf()."""
+    records = records[records['_deleted'] != b'*']
+    if null_flags is not None:
+        # One bit per nullable field, in field order, starting with the
+        # lowest bit of the first byte.
+        flags = (np.frombuffer(records[null_flags.name].tobytes(),
+                               dtype=np.uint8)
+                 .reshape(len(records), null_flags.length))
+    data = {}
+    null_bit = 0
+    for field in fields:
+        if field.type == '0':
+            continue
+        bit = None
+        if field.nullable:
+            bit, null_bit = null_bit, null_bit + 1
+        if field.name not in columns:
+            continue
+        values = _decode_dbf_field(records[field.name], field, encoding)
+        if bit is not None and null_flags is not None:
+            is_null = (flags[:, bit // 8] >> (bit % 8)) & 1
+            if is_null.any():
+                values = pd.Series(values)
+                if pd.api.types.is_integer_dtype(values):
+                    values = values.astype('Int64')
+                values[is_null.astype(bool)] = None
+                values = values.array
+        data[columns[field.name]] = values
+    return pd.DataFrame(data, columns=list(columns.values()))
+
+
+def read_dbf(dbf_filename, columns=None, batch_size=None):
+    """
+    Read the records of a DBF file into DataFrames, decoding them in bulk.
 
-def extract_dbc_tables(year, min_length=4, basedir=SETTINGS['ferc1_data_dir']):
-    """Extract the names of all the tables and fields from FERC Form 1 DB.
+    The file is memory mapped, and its fixed width records viewed as a numpy
+    structured array, so each field is decoded as a whole column, rather than
+    one value at a time. Deleted records are skipped, and fields whose bit is
+    set in the _NullFlags field are missing (None, NaN or NaT).
 
-    This function reads all the strings in the given DBC database file for the
-    and picks out the ones that appear to be database table names, and their
-    subsequent table field names, for use in re-naming the truncated columns
-    extracted from the corresponding DBF files (which are limited to having
-    only 10 characters in their names.) Strings must have at least min
-    printable characters.
+    The results match dbfread, except that numbers are always floats, dates
+    are datetime64, logicals are a pandas boolean array, memo fields hold the
+    number of the block in the memo file where the memo is stored, and the
+    _NullFlags field itself is left out.
 
+    Args:
+        dbf_filename (str): Path to the DBF file.
+        columns (dict or list): The fields to read. A dict maps the DBF field
+            names onto the names the columns should have in the output.
+            Defaults to all of them.
+        batch_size (int): If given, return a generator of DataFrames of up to
+            this many records each, rather than one big DataFrame.
     Returns:
+        pandas.DataFrame, or a generator of them if batch_size is given.
+    """
+    header = dbf_header(dbf_filename)
+    fields = header['fields']
+    if columns is None:
+        columns = [f.name for f in fields if f.type != '0']
+    if not isinstance(columns, dict):
+        columns = {c: c for c in columns}
+    null_flags = [f for f in fields if f.type == '0']
+    null_flags = null_flags[0] if null_flags else None
+    if header['numrecords']:
+        records = np.memmap(dbf_filename, mode='r',
+                            dtype=_dbf_dtype(fields, header['recordlen']),
+                            offset=header['headerlen'],
+                            shape=(header['numrecords'],))
+    else:
+        records = np.zeros(0, dtype=_dbf_dtype(fields, header['recordlen']))
+
+    def frame(start, stop):
+        return _dbf_frame(records[start:stop], fields, columns,
+                          header['encoding'], null_flags)
+
+    if batch_size is None:
+        return frame(0, len(records))
+    return (frame(start, start + batch_size)
+            for start in range(0, len(records), batch_size))
+
+
+# Runs of printable ASCII characters, like the ones the strings command finds.
+_PRINTABLE = b'[' + re.escape(string.printable.encode('ascii')) + b']'
 
-        dict: A dictionary whose keys are the long table names extracted from
-            the DBC file, and whose values are lists of pairs of values, the
-            first of which is the full name of each field in the table with the
-            same name as the key, and the second of which is the truncated
-            (<=10 character) long name of that field as found in the DBF file.
 
-    TODO: This routine shouldn't refer to any particular year of data, but
-    right now it depends on the ferc1_dbf2tbl dictionary, which was generated
-    from the 2015 Form 1 database.
+def get_strings(filename, min_length=4):
+    """
+    Extract printable strings from a binary and return them as a generator.
+
+    This is meant to emulate the Unix "strings" command, for the purposes of
+    grabbing database table and column names from the F1_PUB.DBC file that is
+    distributed with the FERC Form 1 data.
     """
+    if not os.path.getsize(filename):
+        return
+    pattern = re.compile(_PRINTABLE + b'{%d,}' % min_length)
+    with open(filename, 'rb') as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as dbc:
+        for match in pattern.finditer(dbc):
+            yield match.group().decode('ascii')
+
+
+def _parse_dbc_schema(year, min_length=4, basedir=SETTINGS['ferc1_data_dir']):
+    """Parse the FERC Form 1 DB schema out of the DBC & DBF files."""
     # Extract all the strings longer than "min" from the DBC file
-    dbc_strs = list(get_strings(dbc_filename(year), min_length=min_length))
+    dbc_strs = list(get_strings(dbc_filename(year, basedir),
+                                min_length=min_length))
 
     # Get rid of leading & trailing whitespace in the strings:
     dbc_strs = [s.strip() for s in dbc_strs]
 
     # Get rid of all the empty strings:
-    dbc_strs = [s for s in dbc_strs if s is not '']
+    dbc_strs = [s for s in dbc_strs if s != '']
 
     # Collapse all whitespace to a single space:
     dbc_strs = [re.sub(r'\s+', ' ', s) for s in dbc_strs]
@@ -122,33 +474,131 @@ def extract_dbc_tables(year, min_length=4, basedir=SETTINGS['ferc1_data_dir']):
 
     # strip leading & trailing whitespace from the lists, and get rid of empty
     # strings:
-    dbc_list = [s.strip() for s in dbc_list if s is not '']
+    dbc_list = [s.strip() for s in dbc_list if s != '']
 
     # Create a dictionary using the first element of these strings (the table
-    # name) as the key, and the list of field names as the values, and return
-    # it:
+    # name) as the key, and the list of field names as the values:
     tf_dict = {}
     for tbl in dbc_list:
         x = tbl.split()
         tf_dict[x[0]] = x[1:]
 
-    tf_doubledict = {}
+    schema = {}
     for dbf in pc.ferc1_dbf2tbl:
         filename = os.path.join(datadir(year, basedir), '{}.DBF'.format(dbf))
         if os.path.isfile(filename):
-            dbf_fields = dbfread.DBF(filename).field_names
-            dbf_fields = [f for f in dbf_fields if f != '_NullFlags']
-            tf_doubledict[pc.ferc1_dbf2tbl[dbf]] = \
-                {k: v for k, v in
-                 zip(dbf_fields, tf_dict[pc.ferc1_dbf2tbl[dbf]])}
-            assert len(tf_dict[pc.ferc1_dbf2tbl[dbf]]) == len(dbf_fields)
+            table_name = pc.ferc1_dbf2tbl[dbf]
+            # _NullFlags isn't a "real" data field... leave it out.
+            fields = [f for f in dbf_header(filename)['fields']
+                      if f.type != '0']
+            assert len(tf_dict[table_name]) == len(fields)
+            schema[table_name] = [
+                (f.name, long_name, f.type, f.length)
+                for f, long_name in zip(fields, tf_dict[table_name])]
 
     # Insofar as we are able, make sure that the fields match each other
-    for k in tf_doubledict:
-        for sn, ln in zip(tf_doubledict[k].keys(), tf_doubledict[k].values()):
+    for fields in schema.values():
+        for sn, ln, _, _ in fields:
             assert ln[:8] == sn.lower()[:8]
 
-    return tf_doubledict
+    return schema
+
+
+# Bump this whenever the way the schema is parsed or stored changes, so that
+# the schemas cached on disk are parsed again.
+DBC_SCHEMA_VERSION = 1
+
+
+def _dbc_schema_key(year, min_length=4, basedir=SETTINGS['ferc1_data_dir']):
+    """
+    Hash everything the FERC Form 1 DB schema for a year is parsed from.
+
+    That's the DBC file, and the field descriptions in the headers of the DBF
+    files. The records in the DBF files, and the parts of their headers that
+    change along with them (e.g. the record count), don't affect the schema,
+    so they're left out.
+    """
+    key = hashlib.sha1(f'{DBC_SCHEMA_VERSION} {min_length}'.encode('ascii'))
+    with open(dbc_filename(year, basedir), 'rb') as f:
+        key.update(f.read())
+    for dbf in pc.ferc1_dbf2tbl:
+        filename = os.path.join(datadir(year, basedir), '{}.DBF'.format(dbf))
+        if os.path.isfile(filename):
+            with open(filename, 'rb') as f:
+                head = f.read(32)
+                (headerlen,) = struct.unpack_from('<H', head, 8)
+                key.update(dbf.encode('ascii'))
+                key.update(f.read(headerlen - 32))
+    return key.hexdigest()
+
+
+def dbc_schema(year, min_length=4, basedir=SETTINGS['ferc1_data_dir'],
+               cache_dir=SETTINGS['ferc1_schema_cache']):
+    """
+    Describe the fields of the FERC Form 1 tables for one year of data.
+
+    The long field names come from the master F1_PUB.DBC file, and the short
+    (<=10 character) names, types and lengths come from the DBF files. Picking
+    the names out of the DBC file takes a while, so the schema is saved in a
+    JSON file in cache_dir, named after a hash of the DBC file and the DBF
+    file headers (see _dbc_schema_key()). The schema is only parsed again if
+    any of them change.
+
+    Args:
+        year (int): The year of FERC Form 1 data.
+        min_length (int): The shortest printable string to look at in the
+            DBC file.
+        cache_dir (str): Where to keep the parsed schemas, or None to always
+            parse the schema.
+    Returns:
+        dict: For every FERC Form 1 table which has a DBF file, a list of
+        (short name, long name, DBF type, length) tuples describing its
+        fields, in the order they appear in the DBF file. The _NullFlags
+        field is left out.
+    """
+    if cache_dir is None:
+        return _parse_dbc_schema(year, min_length=min_length, basedir=basedir)
+    cache_path = os.path.join(
+        cache_dir, _dbc_schema_key(year, min_length, basedir) + '.json')
+    if os.path.exists(cache_path):
+        with open(cache_path) as f:
+            return {table: [tuple(field) for field in fields]
+                    for table, fields in json.load(f).items()}
+    schema = _parse_dbc_schema(year, min_length=min_length, basedir=basedir)
+    # Write the whole file before moving it into place, so that a concurrent
+    # reader never finds half of it.
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f'{cache_path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(schema, f, separators=(',', ':'))
+    os.replace(tmp_path, cache_path)
+    return schema
+
+
+def extract_dbc_tables(year, min_length=4, basedir=SETTINGS['ferc1_data_dir']):
+    """Extract the names of all the tables and fields from FERC Form 1 DB.
+
+    This function reads all the strings in the given DBC database file for the
+    and picks out the ones that appear to be database table names, and their
+    subsequent table field names, for use in re-naming the truncated columns
+    extracted from the corresponding DBF files (which are limited to having
+    only 10 characters in their names.) Strings must have at least min
+    printable characters. The results are cached, see dbc_schema().
+
+    Returns:
+
+        dict: A dictionary whose keys are the long table names extracted from
+            the DBC file, and whose values are dictionaries mapping the
+            truncated (<=10 character) name of each field as found in the DBF
+            file onto the full name of that field.
+
+    TODO: This routine shouldn't refer to any particular year of data, but
+    right now it depends on the ferc1_dbf2tbl dictionary, which was generated
+    from the 2015 Form 1 database.
+    """
+    schema = dbc_schema(year, min_length=min_length, basedir=basedir)
+    return {table: {sn: ln for sn, ln, _, _ in fields}
+            for table, fields in schema.items()}
 
 
 def define_db(refyear, ferc1_tables, ferc1_meta,
@@ -170,10 +620,7 @@ def define_db(refyear, ferc1_tables, ferc1_meta,
         ferc1_meta (SQLAlchemy MetaData): SQLAlchemy MetaData object
             to store the schema in.
     """
-    ferc1_tblmap = extract_dbc_tables(refyear)
-    # Translate the list of FERC Form 1 database tables that has
-    # been passed in into a list of DBF files prefixes:
-    dbfs = [pc.ferc1_tbl2dbf[table] for table in ferc1_tables]
+    schema = dbc_schema(refyear, basedir=basedir)
 
     if verbose:
         print("Defining new FERC Form 1 DB based on {}...".format(refyear))
@@ -183,26 +630,16 @@ def define_db(refyear, ferc1_tables, ferc1_meta,
     # This keeps us from having collisions when re-initializing the DB.
     ferc1_meta.clear()
 
-    for dbf in dbfs:
-        dbf_filename = os.path.join(datadir(refyear, basedir),
-                                    '{}.DBF'.format(dbf))
-        ferc1_dbf = dbfread.DBF(dbf_filename)
-
+    for table_name in ferc1_tables:
         # And the corresponding SQLAlchemy Table object:
-        table_name = pc.ferc1_dbf2tbl[dbf]
         ferc1_sql = sa.Table(table_name, ferc1_meta)
 
-        # _NullFlags isn't a "real" data field... remove it.
-        fields = [f for f in ferc1_dbf.fields if not re.match(
-            '_NullFlags', f.name)]
-
-        for field in fields:
-            col_name = ferc1_tblmap[pc.ferc1_dbf2tbl[dbf]][field.name]
-            col_type = pc.dbf_typemap[field.type]
+        for _, col_name, dbf_type, length in schema[table_name]:
+            col_type = pc.dbf_typemap[dbf_type]
 
             # String/VarChar is the only type that really NEEDS a length
             if col_type == sa.String:
-                col_type = col_type(length=field.length)
+                col_type = col_type(length=length)
 
             # This eliminates the "footnote" fields which all mirror database
             # fields, but end with _f. We have not yet integrated the footnotes
@@ -234,17 +671,249 @@ def define_db(refyear, ferc1_tables, ferc1_meta,
             )
 
 
+def _new_respondents(respondents_df, seen):
+    """
+    Pick out the respondents which aren't in the FERC Form 1 DB clone yet.
+
+    The f1_respondent_id table has no year field, so every year of FERC Form 1
+    data lists the same respondents again. The first year's version of each
+    respondent is kept, along with placeholders for the respondents that are
+    missing from the data altogether (pc.missing_respondents_ferc1).
+
+    Args:
+        respondents_df (pandas.DataFrame): One year of f1_respondent_id.
+        seen (set): IDs of the respondents loaded already. Updated in place.
+    Returns:
+        pandas.DataFrame: The records to load.
+    """
+    missing = pd.DataFrame({
+        'respondent_id': list(pc.missing_respondents_ferc1.keys()),
+        'respondent_name': list(pc.missing_respondents_ferc1.values()),
+        'respondent_alias': '',
+        'status': '',
+        'form_type': 0,
+        # the status date needs to be an actual date
+        'status_date': pd.Timestamp(2017, 12, 31),
+        'sort_name': '',
+        'pswd_gen': '',
+    })
+    df = pd.concat([respondents_df, missing[respondents_df.columns]],
+                   ignore_index=True)
+    df = df[~df['respondent_id'].isin(seen)]
+    df = df.drop_duplicates(subset='respondent_id', keep='first')
+    seen.update(df['respondent_id'])
+    return df
+
+
+def _read_dbf_batches(year, dbf, columns, basedir, batch_size):
+    """Read one year of a FERC Form 1 DBF file, leaving out bad respondents."""
+    dbf_filename = os.path.join(datadir(year, basedir), '{}.DBF'.format(dbf))
+    return (df[~df['respondent_id'].isin(BAD_RESPONDENTS)]
+            for df in read_dbf(dbf_filename, columns, batch_size=batch_size))
+
+
+def _read_respondents(year, columns, basedir=SETTINGS['ferc1_data_dir']):
+    """Read one year of f1_respondent_id (F1_1), for _new_respondents()."""
+    dbf_filename = os.path.join(datadir(year, basedir), 'F1_1.DBF')
+    df = read_dbf(dbf_filename, columns)
+    return df[~df['respondent_id'].isin(BAD_RESPONDENTS)]
+
+
+def _sqlite_load(df, sql_table_name, ferc1_engine):
+    """Insert a DataFrame into a table of the SQLite FERC Form 1 DB."""
+    if df.empty:
+        return
+    table = ferc1_meta.tables[sql_table_name]
+    df = df.copy()
+    for col in df.columns:
+        # SQLAlchemy stores dates in SQLite as YYYY-MM-DD strings.
+        if isinstance(table.c[col].type, sa.Date) and \
+                not isinstance(table.c[col].type, sa.DateTime):
+            df[col] = df[col].dt.date
+    df = df.astype(object).where(df.notnull(), None)
+    with ferc1_engine.begin() as conn:
+        conn.execute(table.insert(), df.to_dict('records'))
+
+
+def _load_batches(batches, dbf, ferc1_engine):
+    """Load DataFrames into the table corresponding to a DBF file."""
+    # pc.ferc1_dbf2tbl is a dictionary mapping DBF files to SQL table names
+    sql_table_name = pc.ferc1_dbf2tbl[dbf]
+    rows = 0
+    for df in batches:
+        if ferc1_engine.dialect.name == 'sqlite':
+            _sqlite_load(df, sql_table_name, ferc1_engine)
+        else:
+            pudl.load._dump_load(df, sql_table_name, ferc1_engine,
+                                 format='binary', metadata=ferc1_meta,
+                                 null_empty_strings=False)
+        rows += len(df)
+    return rows
+
+
+def _load_dbf(year, dbf, columns, ferc1_engine,
+              basedir=SETTINGS['ferc1_data_dir'], batch_size=100000):
+    """Copy one year of a FERC Form 1 DBF file into the DB clone."""
+    rows = _load_batches(
+        _read_dbf_batches(year, dbf, columns, basedir, batch_size),
+        dbf, ferc1_engine)
+    return year, dbf, rows
+
+
+def _loaded_respondents(ferc1_engine):
+    """The IDs of the respondents in the FERC Form 1 DB clone already."""
+    table = ferc1_meta.tables['f1_respondent_id']
+    return {row[0] for row in
+            ferc1_engine.execute(sa.select([table.c.respondent_id]))}
+
+
+# The DB connection of each worker process used by _load_dbfs_parallel().
+_worker_engine = None
+
+
+def _init_worker(refyear, ferc1_tables, basedir, testing, backend):
+    """Give a worker process its own DB connection and the DB schema."""
+    global _worker_engine
+    # Forked workers inherit the schema, but spawned ones start empty.
+    if not ferc1_meta.tables:
+        define_db(refyear, ferc1_tables, ferc1_meta, basedir=basedir,
+                  verbose=False)
+    _worker_engine = connect_db(testing=testing, backend=backend)
+
+
+def _load_dbf_worker(year, dbf, columns, basedir, batch_size):
+    """Copy one year of a DBF file into the DB clone, in a worker process."""
+    return _load_dbf(year, dbf, columns, _worker_engine, basedir=basedir,
+                     batch_size=batch_size)
+
+
+def _load_dbfs_serial(loads, columns, ferc1_engine,
+                      basedir=SETTINGS['ferc1_data_dir'], batch_size=100000,
+                      verbose=True):
+    """
+    Copy FERC Form 1 DBF files into the DB clone, one after another.
+
+    Args:
+        loads (list): The (year, DBF file) pairs to load, in order.
+        columns (dict): For each DBF file, the mapping of its fields onto
+            DB columns. See read_dbf().
+        ferc1_engine (sqlalchemy.engine.Engine): The FERC Form 1 DB engine.
+    Returns:
+        dict: The number of records loaded for each (year, DBF file).
+    """
+    row_counts = {}
+    # IDs of the respondents that have been loaded already.
+    respondents = None
+    last_year = None
+    for year, dbf in loads:
+        if verbose and year != last_year:
+            print(f"{year} ", end="", flush=True)
+            last_year = year
+        # If we're reading in multiple years of FERC Form 1 data, we need to
+        # avoid collisions in the f1_respondent_id table, which does not have
+        # a year field... F1_1 is the DBF file that stores this table:
+        if dbf == 'F1_1':
+            if respondents is None:
+                respondents = _loaded_respondents(ferc1_engine)
+            df = _new_respondents(
+                _read_respondents(year, columns[dbf], basedir), respondents)
+            row_counts[(year, dbf)] = _load_batches([df], dbf, ferc1_engine)
+        else:
+            _, _, row_counts[(year, dbf)] = _load_dbf(
+                year, dbf, columns[dbf], ferc1_engine, basedir=basedir,
+                batch_size=batch_size)
+    return row_counts
+
+
+def _load_dbfs_parallel(loads, columns, ferc1_engine, workers, refyear,
+                        basedir=SETTINGS['ferc1_data_dir'], testing=False,
+                        backend='postgres', batch_size=100000, verbose=True):
+    """
+    Copy FERC Form 1 DBF files into the DB clone using worker processes.
+
+    Every (year, DBF file) is read and loaded by one worker, with its own DB
+    connection. The exception is f1_respondent_id, which is read by the
+    workers, but merged in the order of years and loaded before any of the
+    other tables, since they all refer to it. The resulting DB is the same as
+    the one loaded by _load_dbfs_serial().
+
+    Args:
+        loads (list): The (year, DBF file) pairs to load, in order.
+        columns (dict): For each DBF file, the mapping of its fields onto
+            DB columns. See read_dbf().
+        ferc1_engine (sqlalchemy.engine.Engine): The connection used to load
+            f1_respondent_id.
+        workers (int): The number of worker processes to use.
+        refyear (int): The year the DB schema was defined from, so that
+            workers which don't inherit the schema can define it too.
+    Returns:
+        dict: The number of records loaded for each (year, DBF file).
+    """
+    ferc1_tables = sorted({pc.ferc1_dbf2tbl[dbf] for _, dbf in loads})
+    respondent_years = [year for year, dbf in loads if dbf == 'F1_1']
+    row_counts = {}
+    if respondent_years:
+        respondents = _loaded_respondents(ferc1_engine)
+    # Don't share pooled connections with the forked workers.
+    ferc1_engine.dispose()
+    with concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker,
+            initargs=(refyear, ferc1_tables, basedir, testing,
+                      backend)) as pool:
+        if respondent_years:
+            futures = [pool.submit(_read_respondents, year, columns['F1_1'],
+                                   basedir)
+                       for year in respondent_years]
+            # Wait on the years in order, so the merge is deterministic.
+            dfs = [_new_respondents(f.result(), respondents) for f in futures]
+            _load_batches([pd.concat(dfs, ignore_index=True)], 'F1_1',
+                          ferc1_engine)
+            for year, df in zip(respondent_years, dfs):
+                row_counts[(year, 'F1_1')] = len(df)
+            if verbose:
+                print("f1_respondent_id ", end="", flush=True)
+        futures = [pool.submit(_load_dbf_worker, year, dbf, columns[dbf],
+                               basedir, batch_size)
+                   for year, dbf in loads if dbf != 'F1_1']
+        for future in concurrent.futures.as_completed(futures):
+            year, dbf, row_counts[(year, dbf)] = future.result()
+            if verbose:
+                print(f"{year}:{dbf} ", end="", flush=True)
+    return row_counts
+
+
 def init_db(ferc1_tables=pc.ferc1_default_tables,
             refyear=max(pc.working_years['ferc1']),
             years=pc.working_years['ferc1'],
             basedir=SETTINGS['ferc1_data_dir'],
             def_db=True,
             verbose=True,
-            testing=False):
+            testing=False,
+            batch_size=100000,
+            workers=1,
+            incremental=False,
+            backend='postgres'):
     """Assuming an empty FERC Form 1 DB, create tables and insert data.
 
-    This function uses dbfread and SQLAlchemy to migrate a set of FERC Form 1
-    database tables from the provided DBF format into a postgres database.
+    This function uses read_dbf() and SQLAlchemy to migrate a set of FERC
+    Form 1 database tables from the provided DBF format into a postgres
+    database.
+
+    The DBF records are read batch_size at a time, and each batch is loaded
+    with a binary COPY (see pudl.load), which keeps the empty strings in the
+    DBF files as empty strings.
+
+    The checksum of every DBF file that's loaded is recorded in the
+    f1_load_manifest table. In incremental mode, the DB isn't wiped first.
+    Instead, its tables are brought up to date with the schema of refyear
+    (see reconcile_schema()), and only the years of each table which haven't
+    been loaded yet, or whose DBF file has changed since, are loaded. Any old
+    records from those years are deleted first. Respondents are never
+    deleted, since the other tables refer to them, but new ones are added.
+
+    With the 'sqlite' backend, the data goes into a local SQLite file rather
+    than PostgreSQL (see connect_db()). SQLite only lets one connection write
+    at a time, so the DBF files are always loaded one after another.
 
     Args:
 
@@ -254,6 +923,12 @@ def init_db(ferc1_tables=pc.ferc1_default_tables,
             template.
         years (list): The set of years to read from FERC Form 1 dbf database
             into the FERC Form 1 DB.
+        batch_size (int): How many DBF records to load at a time.
+        workers (int): How many worker processes to read and load the DBF
+            files with. See _load_dbfs_parallel(). 1 means no parallelism.
+        incremental (bool): If True, only load new or changed years of data
+            into the existing DB, rather than starting over.
+        backend (str): Where to keep the DB: 'postgres' or 'sqlite'.
     """
     if verbose:
         print("Start ferc mirror db ingest at {}".format(datetime.datetime.now().
@@ -264,90 +939,97 @@ def init_db(ferc1_tables=pc.ferc1_default_tables,
             print("Not ingesting mirrored ferc db.")
         return None
 
-    ferc1_engine = connect_db(testing=testing)
+    ferc1_engine = connect_db(testing=testing, backend=backend)
 
     # This function (see below) uses metadata from the DBF files to define a
     # postgres database structure suitable for accepting the FERC Form 1 data
     if def_db:
-        define_db(refyear, ferc1_tables, ferc1_meta)
-
-    # Wipe the DB and start over...
-    drop_tables(ferc1_engine)
-    _create_tables(ferc1_engine)
+        define_db(refyear, ferc1_tables, ferc1_meta, basedir=basedir,
+                  verbose=verbose)
 
-    # Create a DB connection to use for the record insertions below:
-    conn = ferc1_engine.connect()
+    if incremental:
+        reconcile_schema(ferc1_engine, verbose=verbose)
+        loaded = loaded_checksums(ferc1_engine)
+    else:
+        # Wipe the DB and start over...
+        drop_tables(ferc1_engine)
+        _create_tables(ferc1_engine)
+        loaded = {}
 
     # This awkward dictionary of dictionaries lets us map from a DBF file
     # to a couple of lists -- one of the short field names from the DBF file,
     # and the other the full names that we want to have the SQL database...
-    ferc1_tblmap = extract_dbc_tables(refyear)
+    ferc1_tblmap = extract_dbc_tables(refyear, basedir=basedir)
 
     # Translate the list of FERC Form 1 database tables that has
     # been passed in into a list of DBF files prefixes:
     dbfs = [pc.ferc1_tbl2dbf[table] for table in ferc1_tables]
 
+    # Only the DBF fields which have a column in the DB (e.g. not the
+    # footnote fields) are loaded.
+    columns = {}
+    for dbf in dbfs:
+        sql_table = ferc1_meta.tables[pc.ferc1_dbf2tbl[dbf]]
+        columns[dbf] = {d: s for d, s in ferc1_tblmap[sql_table.name].items()
+                        if s in sql_table.c}
+
+    checksums = {(year, dbf): dbf_checksum(year, dbf, basedir)
+                 for year in years for dbf in dbfs}
+    loads = [(year, dbf) for year, dbf in checksums
+             if loaded.get((year, pc.ferc1_dbf2tbl[dbf])) !=
+             checksums[(year, dbf)]]
+    if incremental:
+        if verbose:
+            print(f"{len(loads)} of {len(checksums)} years of FERC Form 1 "
+                  "tables are new or changed.")
+        # Years that aren't in the manifest may still have records in the DB,
+        # e.g. from a load that didn't finish, so they're cleared out too.
+        for year, dbf in loads:
+            if dbf == 'F1_1':
+                continue
+            table_name = pc.ferc1_dbf2tbl[dbf]
+            deleted = _delete_year(ferc1_engine, table_name, year)
+            if verbose and deleted:
+                print(f"    Deleted {deleted:,} old records from "
+                      f"{table_name} {year}.")
+        if not loads:
+            return None
+
     if verbose:
         print("Cloning FERC Form 1 FoxPro DB to Postgreql:", flush=True)
         print("    ", end='', flush=True)
-    for year in years:
-        if verbose:
-            print(f"{year} ", end="", flush=True)
-        for dbf in dbfs:
-            dbf_filename = os.path.join(datadir(year, basedir),
-                                        '{}.DBF'.format(dbf))
-            dbf_table = dbfread.DBF(dbf_filename, load=True)
-
-            # pc.ferc1_dbf2tbl is a dictionary mapping DBF files to SQL table
-            # names
-            sql_table_name = pc.ferc1_dbf2tbl[dbf]
-            sql_stmt = sa.dialects.postgresql.insert(
-                ferc1_meta.tables[sql_table_name])
-
-            # Build up a list of dictionaries to INSERT into the postgres
-            # database. Each dictionary is one record. Within each dictionary
-            # the keys are the field names, and the values are the values for
-            # that field.
-            sql_records = []
-            bad_respondents = [514, 515, 516, 517, 518, 519, 522]
-            for dbf_rec in dbf_table.records:
-                sql_rec = {}
-                for d, s in ferc1_tblmap[sql_table_name].items():
-                    sql_rec[s] = dbf_rec[d]
-                if sql_rec['respondent_id'] not in bad_respondents:
-                    sql_records.append(sql_rec)
-
-            # If we're reading in multiple years of FERC Form 1 data, we
-            # need to avoid collisions in the f1_respondent_id table, which
-            # does not have a year field... F1_1 is the DBF file that stores
-            # this table:
-            if dbf == 'F1_1':
-                sql_stmt = sql_stmt.on_conflict_do_nothing()
-
-                for resp_id, resp_name in pc.missing_respondents_ferc1.items():
-                    sql_records.append(
-                        {'respondent_id': resp_id,
-                         'respondent_name': resp_name,
-                         'respondent_alias': '',
-                         'status': '',
-                         'form_type': 0,
-                         # the status date needs to be an actual date
-                         'status_date': datetime.date(2017, 12, 31),
-                         'sort_name': '',
-                         'pswd_gen': ''})
-
-            # insert the new records!
-            conn.execute(sql_stmt, sql_records)
+    if workers > 1 and backend != 'sqlite':
+        row_counts = _load_dbfs_parallel(
+            loads, columns, ferc1_engine, workers, refyear=refyear,
+            basedir=basedir, testing=testing, backend=backend,
+            batch_size=batch_size, verbose=verbose)
+    else:
+        row_counts = _load_dbfs_serial(
+            loads, columns, ferc1_engine, basedir=basedir,
+            batch_size=batch_size, verbose=verbose)
+    record_loads(
+        ferc1_engine,
+        {(year, pc.ferc1_dbf2tbl[dbf]): n
+         for (year, dbf), n in row_counts.items()},
+        {(year, pc.ferc1_dbf2tbl[dbf]): checksums[(year, dbf)]
+         for year, dbf in row_counts})
 
     if(verbose):
         print("\n", end='')
-    conn.close()
 
 
 ###########################################################################
 # Functions related to extracting ferc1 tables for pudl.
 ###########################################################################
 
+def _extract_columns(table, pudl_table):
+    """The columns of a FERC Form 1 DB table that the PUDL transforms use."""
+    columns = pc.ferc1_extract_columns.get(pudl_table)
+    if columns is None:
+        return [table]
+    return [table.c[col] for col in columns]
+
+
 def fuel(ferc1_raw_dfs,
          ferc1_engine,
          ferc1_table='f1_fuel',
@@ -356,9 +1038,10 @@ def fuel(ferc1_raw_dfs,
     """Pull the f1_fuel table from the ferc1 db."""
     # Grab the f1_fuel SQLAlchemy Table object from the metadata object.
     f1_fuel = ferc1_meta.tables[ferc1_table]
-    # Generate a SELECT statement that pulls all fields of the f1_fuel table,
-    # but only gets records with plant names, and non-zero fuel amounts:
-    f1_fuel_select = sa.sql.select([f1_fuel]).\
+    # Generate a SELECT statement that pulls the fields of the f1_fuel table
+    # we use, but only gets records with plant names, and non-zero fuel
+    # amounts:
+    f1_fuel_select = sa.sql.select(_extract_columns(f1_fuel, pudl_table)).\
         where(f1_fuel.c.fuel != '').\
         where(f1_fuel.c.fuel_quantity > 0).\
         where(f1_fuel.c.plant_name != '').\
@@ -378,7 +1061,7 @@ def plants_steam(ferc1_raw_dfs,
                  ferc1_years=pc.working_years['ferc1']):
     """ """
     f1_steam = ferc1_meta.tables[ferc1_table]
-    f1_steam_select = sa.sql.select([f1_steam]).\
+    f1_steam_select = sa.sql.select(_extract_columns(f1_steam, pudl_table)).\
         where(f1_steam.c.tot_capacity > 0).\
         where(f1_steam.c.plant_name != '').\
         where(f1_steam.c.report_year.in_(ferc1_years))
@@ -407,7 +1090,7 @@ def plants_small(ferc1_raw_dfs,
         """Year {} is too recent. Small plant data has not been categorized for
          any year after 2015.""".format(max(ferc1_years))
     f1_small = ferc1_meta.tables[ferc1_table]
-    f1_small_select = sa.sql.select([f1_small, ]).\
+    f1_small_select = sa.sql.select(_extract_columns(f1_small, pudl_table)).\
         where(f1_small.c.report_year.in_(ferc1_years)).\
         where(f1_small.c.plant_name != '').\
         where(or_((f1_small.c.capacity_rating != 0),
@@ -435,7 +1118,7 @@ def plants_hydro(ferc1_raw_dfs,
                  ferc1_years=pc.working_years['ferc1']):
     f1_hydro = ferc1_meta.tables[ferc1_table]
 
-    f1_hydro_select = sa.sql.select([f1_hydro]).\
+    f1_hydro_select = sa.sql.select(_extract_columns(f1_hydro, pudl_table)).\
         where(f1_hydro.c.plant_name != '').\
         where(f1_hydro.c.report_year.in_(ferc1_years))
 
@@ -456,7 +1139,8 @@ def plants_pumped_storage(ferc1_raw_dfs,
 
     # Removing the empty records.
     # This reduces the entries for 2015 from 272 records to 27.
-    f1_pumped_storage_select = sa.sql.select([f1_pumped_storage]).\
+    f1_pumped_storage_select = sa.sql.select(
+        _extract_columns(f1_pumped_storage, pudl_table)).\
         where(f1_pumped_storage.c.plant_name != '').\
         where(f1_pumped_storage.c.report_year.in_(ferc1_years))
 
@@ -475,7 +1159,8 @@ def plant_in_service(ferc1_raw_dfs,
                      ferc1_years=pc.working_years['ferc1']):
     f1_plant_in_srvce = \
         ferc1_meta.tables[ferc1_table]
-    f1_plant_in_srvce_select = sa.sql.select([f1_plant_in_srvce]).\
+    f1_plant_in_srvce_select = sa.sql.select(
+        _extract_columns(f1_plant_in_srvce, pudl_table)).\
         where(
             sa.sql.and_(
                 f1_plant_in_srvce.c.report_year.in_(ferc1_years),
@@ -495,7 +1180,8 @@ def purchased_power(ferc1_raw_dfs,
                     pudl_table='purchased_power_ferc1',
                     ferc1_years=pc.working_years['ferc1']):
     f1_purchased_pwr = ferc1_meta.tables[ferc1_table]
-    f1_purchased_pwr_select = sa.sql.select([f1_purchased_pwr]).\
+    f1_purchased_pwr_select = sa.sql.select(
+        _extract_columns(f1_purchased_pwr, pudl_table)).\
         where(f1_purchased_pwr.c.report_year.in_(ferc1_years))
 
     ferc1_purchased_pwr_df = pd.read_sql(f1_purchased_pwr_select, ferc1_engine)
@@ -511,7 +1197,8 @@ def accumulated_depreciation(ferc1_raw_dfs,
                              pudl_table='accumulated_depreciation_ferc1',
                              ferc1_years=pc.working_years['ferc1']):
     f1_accumdepr_prvsn = ferc1_meta.tables[ferc1_table]
-    f1_accumdepr_prvsn_select = sa.sql.select([f1_accumdepr_prvsn]).\
+    f1_accumdepr_prvsn_select = sa.sql.select(
+        _extract_columns(f1_accumdepr_prvsn, pudl_table)).\
         where(f1_accumdepr_prvsn.c.report_year.in_(ferc1_years))
 
     ferc1_apd_df = pd.read_sql(f1_accumdepr_prvsn_select, ferc1_engine)
@@ -524,12 +1211,29 @@ def accumulated_depreciation(ferc1_raw_dfs,
 def extract(ferc1_tables=pc.ferc1_pudl_tables,
             ferc1_years=pc.working_years['ferc1'],
             testing=False,
-            verbose=True):
-    """Extract FERC 1."""
+            verbose=True,
+            workers=1,
+            backend='postgres'):
+    """Extract FERC 1.
+
+    Only the columns listed in pc.ferc1_extract_columns are pulled out of the
+    FERC Form 1 DB. The tables don't depend on each other, so with more than
+    one worker they're read concurrently, each in its own thread, using the
+    engine's pool of connections.
+
+    Args:
+        ferc1_tables (list): The PUDL tables to extract the data for.
+        ferc1_years (list): The years of data to extract.
+        testing (bool): If True, read from the ferc1_test DB.
+        workers (int): The number of tables to read at once.
+        backend (str): Where the FERC Form 1 DB is: 'postgres' or 'sqlite'.
+    Returns:
+        dict: Raw DataFrames, keyed by PUDL table name, in the same order as
+        the tables are always extracted in.
+    """
     # BEGIN INGESTING FERC FORM 1 DATA:
-    ferc1_engine = connect_db(testing=testing)
+    ferc1_engine = connect_db(testing=testing, backend=backend)
 
-    ferc1_raw_dfs = {}
     ferc1_extract_functions = {
         'fuel_ferc1': fuel,
         'plants_steam_ferc1': plants_steam,
@@ -554,16 +1258,23 @@ def extract(ferc1_tables=pc.ferc1_pudl_tables,
     if verbose:
         print("============================================================")
         print("Extracting tables from cloned FERC Form 1 database.")
-    for table in ferc1_extract_functions:
-        if ferc1_tables:
-            if table in ferc1_tables:
-                if verbose:
-                    print("    {}...".format(table))
-                ferc1_extract_functions[table](
-                    ferc1_raw_dfs,
-                    ferc1_engine,
-                    ferc1_table=pc.table_map_ferc1_pudl[table],
-                    pudl_table=table,
-                    ferc1_years=ferc1_years)
+    tables = [table for table in ferc1_extract_functions
+              if ferc1_tables and table in ferc1_tables]
+    with concurrent.futures.ThreadPoolExecutor(max(workers, 1)) as executor:
+        futures = {}
+        for table in tables:
+            if verbose:
+                print("    {}...".format(table))
+            futures[table] = executor.submit(
+                ferc1_extract_functions[table],
+                {},
+                ferc1_engine,
+                ferc1_table=pc.table_map_ferc1_pudl[table],
+                pudl_table=table,
+                ferc1_years=ferc1_years)
+        # Collect the results in order, so the output is deterministic.
+        ferc1_raw_dfs = {}
+        for table in tables:
+            ferc1_raw_dfs.update(futures[table].result())
 
     return ferc1_raw_dfs
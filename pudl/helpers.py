@@ -1,12 +1,16 @@
 """General utility functions that are used in a variety of contexts."""
 
+import os
 import re
+import datetime
 from functools import partial
 import pandas as pd
 import numpy as np
 import sqlalchemy as sa
+import pytz
 import timezonefinder
 import pudl
+from pudl.settings import SETTINGS
 
 # This is a little abbreviated function that allows us to propagate the NA
 # values through groupby aggregations, rather than using inefficient lambda
@@ -393,6 +397,44 @@ def fix_int_na(df, columns, float_na=np.nan, int_na=-1, str_na=''):
     )
 
 
+def unify_categories(dfs):
+    """
+    Give shared categorical columns the same categories across DataFrames.
+
+    pandas.concat() only preserves a categorical column if it has exactly the
+    same categories in every DataFrame being concatenated. Otherwise the
+    column is silently converted to object, which can use many times more
+    memory. This function sets the categories of each categorical column that
+    appears in all of the DataFrames to the union of their categories.
+
+    Args:
+        dfs (list): A list of pandas.DataFrame objects that are going to be
+            concatenated.
+
+    Returns:
+        list: The same DataFrames, with their categorical columns recoded to
+        use identical categories.
+    """
+    if len(dfs) < 2:
+        return dfs
+    dfs = list(dfs)
+    for col in dfs[0].columns:
+        if not all((col in df.columns) and
+                   pd.api.types.is_categorical_dtype(df[col])
+                   for df in dfs):
+            continue
+        dtypes = {df[col].dtype for df in dfs}
+        if len(dtypes) == 1:
+            continue
+        categories = dfs[0][col].cat.categories
+        for df in dfs[1:]:
+            categories = categories.union(df[col].cat.categories)
+        cat_dtype = pd.api.types.CategoricalDtype(categories=categories)
+        for i, df in enumerate(dfs):
+            dfs[i] = df.assign(**{col: df[col].astype(cat_dtype)})
+    return dfs
+
+
 def month_year_to_date(df):
     """Convert all pairs of year/month fields in a dataframe into Date fields.
 
@@ -570,3 +612,105 @@ def find_timezone(*, lng=None, lat=None, state=None, strict=True):
         except KeyError:
             tz = None
     return tz
+
+
+# Coordinates are rounded to this many decimal places (about 10 meters)
+# before their timezones are looked up, so nearby plants share cache entries.
+TIMEZONE_CACHE_DECIMALS = 4
+
+
+def _read_timezone_cache(cache_path):
+    """Read the lng/lat to timezone cache as a dict keyed by rounded coords."""
+    if cache_path is None or not os.path.exists(cache_path):
+        return {}
+    cache_df = pd.read_csv(cache_path, dtype={'timezone': str},
+                           keep_default_na=False)
+    return dict(zip(zip(cache_df['lng_key'], cache_df['lat_key']),
+                    cache_df['timezone'].replace('', None)))
+
+
+def _write_timezone_cache(cache, cache_path):
+    """Save the lng/lat to timezone cache, replacing the old file at once."""
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    keys = list(cache.keys())
+    cache_df = pd.DataFrame({
+        'lng_key': [k[0] for k in keys],
+        'lat_key': [k[1] for k in keys],
+        'timezone': [cache[k] for k in keys],
+    })
+    tmp_path = cache_path + '.tmp'
+    cache_df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, cache_path)
+
+
+def find_timezones(*, lng, lat, state=None, strict=True,
+                   cache_path=SETTINGS['timezone_cache']):
+    """Find the timezones of many locations at once
+    param: lng (array-like) Longitudes, in decimal degrees. May contain NA.
+    param: lat (array-like) Latitudes, in decimal degrees. May contain NA.
+    param: state (array-like) Abbreviations for US states or Canadian
+        provinces, used like in find_timezone() when lng/lat don't work.
+    param: strict (bool) Raise an error if no timezone is found from lng/lat?
+    param: cache_path (str) CSV file caching the timezones found for rounded
+        coordinates between runs, or None to not use a cache.
+    returns: A numpy object array of IANA timezone strings (or None).
+
+    This does the same thing as calling find_timezone() on each location, but
+    each distinct location (rounded to TIMEZONE_CACHE_DECIMALS places) is only
+    looked up once, and the lookups are saved on disk, so that rebuilding the
+    plant entity table doesn't redo the (slow) geometric searches.
+    """
+    scale = 10**TIMEZONE_CACHE_DECIMALS
+    lng_key = np.round(np.asarray(lng, dtype=float) * scale)
+    lat_key = np.round(np.asarray(lat, dtype=float) * scale)
+    valid = (np.isfinite(lng_key) & np.isfinite(lat_key) &
+             (np.abs(lng_key) <= 180 * scale) &
+             (np.abs(lat_key) <= 90 * scale))
+    timezones = np.full(len(lng_key), None, dtype=object)
+    if valid.any():
+        codes, uniques = pd.MultiIndex.from_arrays(
+            [lng_key[valid].astype(np.int64),
+             lat_key[valid].astype(np.int64)]).factorize()
+        cache = _read_timezone_cache(cache_path)
+        n_cached = len(cache)
+        for key in uniques:
+            if key not in cache:
+                tz = tz_finder.timezone_at(lng=key[0] / scale,
+                                           lat=key[1] / scale)
+                if tz is None:  # Try harder
+                    tz = tz_finder.closest_timezone_at(lng=key[0] / scale,
+                                                       lat=key[1] / scale)
+                cache[key] = tz
+        if cache_path is not None and len(cache) > n_cached:
+            _write_timezone_cache(cache, cache_path)
+        unique_tzs = np.array([cache[key] for key in uniques] + [None],
+                              dtype=object)
+        timezones[valid] = unique_tzs[codes]
+    missing = pd.isnull(timezones)
+    if missing.any():
+        if strict:
+            raise ValueError(
+                f"Can't find timezones for {missing.sum()} locations.")
+        if state is not None:
+            timezones[missing] = (
+                pd.Series(np.asarray(state, dtype=object)[missing])
+                .map(pudl.constants.state_tz_approx).values)
+    return timezones
+
+
+def utc_offsets(timezones, when=datetime.datetime(2011, 1, 1)):
+    """Find the UTC offsets of many timezones at one moment
+    param: timezones (array-like) IANA timezone strings, which may be NA.
+    param: when (datetime.datetime) The naive local time at which to find the
+        offsets. The default, January 1st, gets standard (not daylight saving)
+        time in the northern hemisphere.
+    returns: A numpy timedelta64[ns] array of the offsets, NaT where the
+        timezone is missing.
+
+    Each distinct timezone is only looked up once.
+    """
+    codes, uniques = pd.factorize(np.asarray(timezones, dtype=object))
+    unique_offsets = np.array(
+        [pytz.timezone(tz).localize(when).utcoffset() for tz in uniques] +
+        [None], dtype='timedelta64[ns]')
+    return unique_offsets[codes]
@@ -15,6 +15,8 @@ This module defines database tables and initializes them with data from:
 """
 
 import os.path
+import collections
+import functools
 import datetime
 import time
 import pandas as pd
@@ -45,9 +47,11 @@ def connect_db(testing=False):
     return sa.create_engine(sa.engine.url.URL(**SETTINGS['db_pudl']))
 
 
-def _create_tables(engine):
+def _create_tables(engine, epacems_partitioned=False):
     """Create the tables and views associated with the PUDL Database."""
     pudl.models.entities.PUDLBase.metadata.create_all(engine)
+    if epacems_partitioned:
+        pudl.models.epacems.create_partitioned_table(engine)
     _create_views(engine)
 
 
@@ -89,7 +93,8 @@ def verify_input_files(ferc1_years,
                        eia923_years,
                        eia860_years,
                        epacems_years,
-                       epacems_states):
+                       epacems_states,
+                       epacems_partial_years=False):
     """Verify that all the files exist before starting the ingest
 
     :param ferc1_years: Years of FERC1 data we're going to import (iterable)
@@ -97,6 +102,8 @@ def verify_input_files(ferc1_years,
     :param eia860_years: Years of EIA860 data we're going to import (iterable)
     :param epacems_years: Years of CEMS data we're going to import (iterable)
     :param epacems_states: States of CEMS data we're going to import (iterable)
+    :param epacems_partial_years: If True, a CEMS state-year only needs some
+        of its monthly files, as when loading incrementally (bool)
     """
 
     # NOTE that these filename functions take other arguments, like BASEDIR.
@@ -130,6 +137,13 @@ def verify_input_files(ferc1_years,
     missing_epacems_year_states = set()
     for y in epacems_years:
         for s in epacems_states:
+            if epacems_partial_years:
+                try:
+                    if not pudl.extract.epacems.available_months(y, s):
+                        missing_epacems_year_states.add((str(y), s))
+                except AssertionError:
+                    missing_epacems_year_states.add((str(y), s))
+                continue
             for m in range(1, 13):
                 try:
                     f = pudl.extract.epacems.get_epacems_file(y, m, s)
@@ -483,7 +497,9 @@ def _ingest_glue_eia_ferc1(engine,
 
 
 def _ETL_ferc1(pudl_engine, ferc1_tables, ferc1_years, verbose, ferc1_testing,
-               csvdir, keep_csv):
+               csvdir, keep_csv, copy_format='csv', index_workers=1,
+               maintenance_work_mem=None, workers=1, backend='postgres',
+               csv_compression=None, parallel_workers=None):
     if not ferc1_years or not ferc1_tables:
         if verbose:
             print('Not ingesting FERC1')
@@ -493,7 +509,9 @@ def _ETL_ferc1(pudl_engine, ferc1_tables, ferc1_years, verbose, ferc1_testing,
     ferc1_raw_dfs = pudl.extract.ferc1.extract(ferc1_tables=ferc1_tables,
                                                ferc1_years=ferc1_years,
                                                testing=ferc1_testing,
-                                               verbose=verbose)
+                                               verbose=verbose,
+                                               workers=workers,
+                                               backend=backend)
     # Transform FERC form 1
     ferc1_transformed_dfs = pudl.transform.ferc1.transform(ferc1_raw_dfs,
                                                            ferc1_tables=ferc1_tables,
@@ -505,11 +523,18 @@ def _ETL_ferc1(pudl_engine, ferc1_tables, ferc1_years, verbose, ferc1_testing,
                              need_fix_inting=pc.need_fix_inting,
                              verbose=verbose,
                              csvdir=csvdir,
-                             keep_csv=keep_csv)
+                             keep_csv=keep_csv,
+                             csv_compression=csv_compression,
+                             format=copy_format,
+                             index_workers=index_workers,
+                             maintenance_work_mem=maintenance_work_mem,
+                             parallel_workers=parallel_workers)
 
 
 def _ETL_eia(pudl_engine, eia923_tables, eia923_years, eia860_tables,
-             eia860_years, verbose, csvdir, keep_csv):
+             eia860_years, verbose, csvdir, keep_csv, copy_format='csv',
+             index_workers=1, maintenance_work_mem=None,
+             csv_compression=None, parallel_workers=None):
     # Extract EIA forms 923, 860
     eia923_raw_dfs = pudl.extract.eia923.extract(eia923_years=eia923_years,
                                                  verbose=verbose)
@@ -543,10 +568,28 @@ def _ETL_eia(pudl_engine, eia923_tables, eia923_years, eia860_tables,
                                  need_fix_inting=pc.need_fix_inting,
                                  verbose=verbose,
                                  csvdir=csvdir,
-                                 keep_csv=keep_csv)
-
-
-def _ETL_cems(pudl_engine, epacems_years, verbose, csvdir, keep_csv, states):
+                                 keep_csv=keep_csv,
+                                 csv_compression=csv_compression,
+                                 format=copy_format,
+                                 index_workers=index_workers,
+                                 maintenance_work_mem=maintenance_work_mem,
+                                 parallel_workers=parallel_workers)
+
+
+def _print_spill(stats):
+    """Report a BulkCopy spill on stdout, for verbose loads."""
+    action = 'Queued' if stats.queued else 'Loaded'
+    print(f"    {action} {stats.rows:,} records "
+          f"({stats.nbytes / 1024**2:.0f} MB) for {stats.table_name} "
+          f"in {stats.seconds:.1f} s.", flush=True)
+
+
+def _ETL_cems(pudl_engine, epacems_years, verbose, csvdir, keep_csv, states,
+              workers=1, csv_engine='pandas', copy_format='csv',
+              copy_writers=0, partitioned=False, checksums=None,
+              on_duplicates='raise', index_workers=1, brin=False,
+              maintenance_work_mem=None, parallel_workers=None,
+              clustered=False, csv_compression=None, months=None):
     """"""
     # If we're not doing CEMS, just stop here to avoid printing messages like
     # "Reading EPA CEMS data...", which could be confusing.
@@ -558,10 +601,20 @@ def _ETL_cems(pudl_engine, epacems_years, verbose, csvdir, keep_csv, states):
         return None
     if states[0].lower() == 'all':
         states = list(pc.cems_states.keys())
+    # The months of source files there are, and their checksums, which are
+    # recorded in the load manifest.
+    if months is None:
+        months = {(year, state):
+                  pudl.extract.epacems.available_months(year, state)
+                  for year in epacems_years for state in states}
+    if checksums is None:
+        checksums = {key: pudl.extract.epacems.checksum(*key, months[key])
+                     for key in months}
 
     # NOTE: This a generator for raw dataframes
     epacems_raw_dfs = pudl.extract.epacems.extract(
-        epacems_years=epacems_years, states=states, verbose=verbose)
+        epacems_years=epacems_years, states=states, verbose=verbose,
+        workers=workers, csv_engine=csv_engine, months=months)
     # NOTE: This is a generator for transformed dataframes
     epacems_transformed_dfs = pudl.transform.epacems.transform(
         pudl_engine=pudl_engine, epacems_raw_dfs=epacems_raw_dfs, verbose=verbose
@@ -569,31 +622,190 @@ def _ETL_cems(pudl_engine, epacems_years, verbose, csvdir, keep_csv, states):
     if verbose:
         print("Loading tables from EPA CEMS into PUDL:")
         start_time = time.monotonic()
+    # (year, state) partitions of the CEMS table that exist already.
+    partitions = set()
+    row_counts = collections.Counter()
     with pudl.load.BulkCopy(
             table_name="hourly_emissions_epacems",
             engine=pudl_engine,
             csvdir=csvdir,
-            keep_csv=keep_csv) as loader:
+            keep_csv=keep_csv,
+            csv_compression=csv_compression,
+            format=copy_format,
+            writers=copy_writers,
+            on_spill=_print_spill if verbose else None) as loader:
 
         for transformed_df_dict in epacems_transformed_dfs:
             # There's currently only one dataframe in this dict at a time,
             # but that could be changed if useful.
             # The keys to the dict are a tuple (year, month, state)
-            for transformed_df in transformed_df_dict.values():
+            for yr_st, transformed_df in transformed_df_dict.items():
+                # Catch repeated plant/unit/hours now, rather than when the
+                # unique index is built after everything is loaded.
+                transformed_df = pudl.transform.epacems.check_duplicates(
+                    transformed_df, on_duplicates=on_duplicates)
+                if clustered:
+                    # Store each unit's time series contiguously.
+                    transformed_df = transformed_df.sort_values(
+                        list(pudl.models.epacems.CLUSTER_ORDER),
+                        ignore_index=True)
+                if partitioned:
+                    new_partitions = (pudl.models.epacems.partition_keys(
+                        transformed_df) - partitions)
+                    if new_partitions:
+                        pudl.models.epacems.create_partitions(
+                            pudl_engine, new_partitions)
+                        partitions |= new_partitions
                 loader.add(transformed_df)
+                row_counts[yr_st] += len(transformed_df)
+                # Only record the state-year in the load manifest once all of
+                # its records are in the database, so that if the load dies
+                # partway through, the manifest still matches the table. This
+                # happens in the background, as the writers catch up.
+                loader.when_loaded(functools.partial(
+                    pudl.models.epacems.record_loads,
+                    pudl_engine, {yr_st: row_counts[yr_st]}, checksums,
+                    months=months,
+                    sort_order=(pudl.models.epacems.CLUSTER_ORDER
+                                if clustered else None)))
     if verbose:
         time_message = "    Loading    EPA CEMS took {}".format(
             time.strftime("%H:%M:%S",
                           time.gmtime(time.monotonic() - start_time)))
         print(time_message)
         start_time = time.monotonic()
-    pudl.models.epacems.finalize(pudl_engine)
+    # The indexes are built several at a time, on separate connections.
+    pudl.models.epacems.finalize(pudl_engine, workers=index_workers,
+                                 brin=brin,
+                                 maintenance_work_mem=maintenance_work_mem,
+                                 parallel_workers=parallel_workers,
+                                 verbose=verbose)
     if verbose:
         time_message = "    Finalizing EPA CEMS took {}".format(
             time.strftime("%H:%M:%S", time.gmtime(
                 time.monotonic() - start_time))
         )
         print(time_message)
+        start_time = time.monotonic()
+    # Daily, monthly & annual totals for the state-years that were loaded.
+    pudl.models.epacems.refresh_rollups(pudl_engine, row_counts.keys(),
+                                        verbose=verbose)
+    if verbose:
+        time_message = "    Summing up EPA CEMS took {}".format(
+            time.strftime("%H:%M:%S", time.gmtime(
+                time.monotonic() - start_time))
+        )
+        print(time_message)
+
+
+def update_epacems(epacems_years,
+                   epacems_states,
+                   verbose=True,
+                   pudl_testing=False,
+                   csvdir='',
+                   keep_csv=False,
+                   csv_compression=None,
+                   epacems_workers=1,
+                   epacems_csv_engine='pandas',
+                   copy_format='csv',
+                   epacems_copy_writers=0,
+                   epacems_duplicates='raise',
+                   index_workers=1,
+                   epacems_brin=False,
+                   maintenance_work_mem=None,
+                   index_parallel_workers=None,
+                   epacems_clustered=False):
+    """
+    Load new or changed EPA CEMS data into an existing PUDL database.
+
+    Unlike init_db(), this doesn't drop and re-create the database. Instead,
+    it compares the checksums of the EPA CEMS source files for each of the
+    requested state-years to the ones recorded in the epacems_load_manifest
+    table when the data was loaded. Only the months there are files for are
+    included, so a year that EPA is still publishing can be loaded as it
+    goes. State-years which haven't been loaded yet, or whose files have
+    changed (or gained another month) since, are (re)loaded. Any records
+    already in the table for those state-years are deleted first, including
+    ones left behind by a load that didn't finish. Everything else is left
+    alone.
+
+    Args:
+        epacems_years (iterable): The list of years to check for EPA CEMS
+            data to load.
+        epacems_states (iterable): The list of states to check for EPA CEMS
+            data to load, or ['all'].
+        csv_compression (str): None to save the kept CSV as is, or 'gzip'.
+        epacems_workers (int): Number of processes to use when reading the
+            EPA CEMS CSV files.
+        epacems_csv_engine (str): Which CSV reader to use, 'pandas' or
+            'pyarrow'.
+        copy_format (str): 'csv' or 'binary' COPY format.
+        epacems_copy_writers (int): Number of background threads loading the
+            data into the database.
+        epacems_duplicates (str): What to do about duplicate plant, unit and
+            hour records: 'raise', 'drop' or 'warn'.
+        index_workers, epacems_brin, maintenance_work_mem and
+            index_parallel_workers: How to rebuild the indexes. See init_db().
+        epacems_clustered (bool): Sort each state-year by plant, unit and
+            time before loading it. See init_db().
+    """
+    if not epacems_states or not epacems_years:
+        if verbose:
+            print('Not updating EPA CEMS.')
+        return None
+    states = epacems_states
+    if states[0].lower() == 'all':
+        states = list(pc.cems_states.keys())
+    pudl_engine = connect_db(testing=pudl_testing)
+
+    loaded = pudl.models.epacems.loaded_checksums(pudl_engine)
+    # The most recent year may only have some of its months so far.
+    months = {(year, state): pudl.extract.epacems.available_months(year, state)
+              for year in epacems_years for state in states}
+    checksums = {key: pudl.extract.epacems.checksum(*key, months[key])
+                 for key in months}
+    stale = sorted(key for key, checksum in checksums.items()
+                   if loaded.get(key) != checksum)
+    if verbose:
+        print(f"{len(stale)} of {len(checksums)} EPA CEMS state-years are new "
+              "or changed.")
+    if not stale:
+        return None
+
+    plant_utc_offset = pudl.transform.epacems._load_plant_utc_offset(
+        pudl_engine)
+    # State-years that aren't in the manifest may still have records in the
+    # table, e.g. from a load that didn't finish, so they're cleared out too.
+    for year, state in stale:
+        deleted = pudl.models.epacems.delete_state_year(
+            pudl_engine, year, state, plant_utc_offset)
+        if verbose and deleted:
+            print(f"    Deleted {deleted:,} old records for {state} "
+                  f"{year}.")
+
+    # Load the stale states one year at a time.
+    for year in sorted({year for year, _ in stale}):
+        _ETL_cems(pudl_engine=pudl_engine,
+                  epacems_years=[year],
+                  states=[state for yr, state in stale if yr == year],
+                  verbose=verbose,
+                  csvdir=csvdir,
+                  keep_csv=keep_csv,
+                  csv_compression=csv_compression,
+                  workers=epacems_workers,
+                  csv_engine=epacems_csv_engine,
+                  copy_format=copy_format,
+                  copy_writers=epacems_copy_writers,
+                  partitioned=pudl.models.epacems.is_partitioned(pudl_engine),
+                  checksums=checksums,
+                  months=months,
+                  on_duplicates=epacems_duplicates,
+                  index_workers=index_workers,
+                  brin=epacems_brin,
+                  maintenance_work_mem=maintenance_work_mem,
+                  parallel_workers=index_parallel_workers,
+                  clustered=epacems_clustered)
+    pudl_engine.execute("ANALYZE hourly_emissions_epacems")
 
 
 def init_db(ferc1_tables=None,
@@ -609,7 +821,21 @@ def init_db(ferc1_tables=None,
             pudl_testing=None,
             ferc1_testing=None,
             csvdir=None,
-            keep_csv=None):
+            keep_csv=None,
+            csv_compression=None,
+            ferc1_workers=1,
+            ferc1_backend='postgres',
+            epacems_workers=1,
+            epacems_csv_engine='pandas',
+            copy_format='csv',
+            epacems_copy_writers=0,
+            epacems_partitioned=False,
+            epacems_duplicates='raise',
+            index_workers=1,
+            epacems_brin=False,
+            maintenance_work_mem=None,
+            index_parallel_workers=None,
+            epacems_clustered=False):
     """
     Create the PUDL database and fill it up with data.
 
@@ -633,6 +859,42 @@ def init_db(ferc1_tables=None,
             data. Note that there's only one EPA CEMS table.
         epacems_states (iterable): The list of states for which we are to pull
             EPA CEMS data. With all states, ETL takes ~8 hours.
+        csv_compression (str): If keep_csv is True, None (the default) saves
+            the CSVs as they are, and 'gzip' compresses them.
+        ferc1_workers (int): Number of FERC Form 1 tables to read out of the
+            FERC Form 1 DB at once. Defaults to 1 (no parallelism).
+        ferc1_backend (str): Whether the FERC Form 1 DB is kept in
+            'postgres' (the default) or in a 'sqlite' file.
+        epacems_workers (int): Number of processes to use when reading the
+            EPA CEMS CSV files. Defaults to 1 (no parallelism).
+        epacems_csv_engine (str): Which CSV reader to use for the EPA CEMS
+            data, either 'pandas' (the default) or 'pyarrow'.
+        copy_format (str): How to send the data to postgresql: 'csv' (the
+            default) or 'binary', for PostgreSQL's binary COPY format.
+        epacems_copy_writers (int): Number of background threads (each with
+            its own database connection) loading the EPA CEMS data, while
+            more of it is read and transformed. Defaults to 0, which
+            alternates between processing and loading the data.
+        epacems_partitioned (bool): If True, partition the EPA CEMS table by
+            year and state, and index each partition separately.
+        epacems_duplicates (str): What to do about duplicate plant, unit and
+            hour records in the EPA CEMS data, which would keep its unique
+            index from being built: 'raise' an error (the default), 'drop'
+            the extra copies, or 'warn' and load them anyway.
+        index_workers (int): How many indexes to build at a time, each on its
+            own database connection, after the data has been loaded.
+        epacems_brin (bool): If True, add a BRIN index on the EPA CEMS
+            operating_datetime_utc column, for scanning time ranges.
+        maintenance_work_mem (str): PostgreSQL maintenance_work_mem for each
+            index build, e.g. '1GB'. Defaults to the server's setting.
+        index_parallel_workers (int): PostgreSQL
+            max_parallel_maintenance_workers for each index build. Defaults
+            to the server's setting.
+        epacems_clustered (bool): If True, sort each state-year of EPA CEMS
+            data by plant, unit and time before loading it, so that each
+            unit's records are stored together, and the sort order is noted
+            in the load manifest. Otherwise the records are stored in the
+            order of the source files (by month).
         debug (bool): You can tell init_db to ingest whatever list of tables
             you want, but if your desired table is not in the list of known to
             be working tables, you need to set debug=True (otherwise init_db
@@ -668,7 +930,7 @@ def init_db(ferc1_tables=None,
     # Connect to the PUDL DB, wipe out & re-create tables:
     pudl_engine = connect_db(testing=pudl_testing)
     drop_tables(pudl_engine)
-    _create_tables(pudl_engine)
+    _create_tables(pudl_engine, epacems_partitioned=epacems_partitioned)
 
     _ingest_datasets_table(ferc1_years=ferc1_years,
                            eia860_years=eia860_years,
@@ -699,7 +961,14 @@ def init_db(ferc1_tables=None,
                verbose=verbose,
                ferc1_testing=ferc1_testing,
                csvdir=csvdir,
-               keep_csv=keep_csv)
+               keep_csv=keep_csv,
+               csv_compression=csv_compression,
+               copy_format=copy_format,
+               index_workers=index_workers,
+               maintenance_work_mem=maintenance_work_mem,
+               parallel_workers=index_parallel_workers,
+               workers=ferc1_workers,
+               backend=ferc1_backend)
     # ETL for EIA forms 860, 923
     _ETL_eia(pudl_engine=pudl_engine,
              eia923_tables=eia923_tables,
@@ -708,13 +977,30 @@ def init_db(ferc1_tables=None,
              eia860_years=eia860_years,
              verbose=verbose,
              csvdir=csvdir,
-             keep_csv=keep_csv)
+             keep_csv=keep_csv,
+             csv_compression=csv_compression,
+             copy_format=copy_format,
+             index_workers=index_workers,
+             maintenance_work_mem=maintenance_work_mem,
+             parallel_workers=index_parallel_workers)
     # ETL for EPA CEMS
     _ETL_cems(pudl_engine=pudl_engine,
               epacems_years=epacems_years,
               states=epacems_states,
               verbose=verbose,
               csvdir=csvdir,
-              keep_csv=keep_csv)
+              keep_csv=keep_csv,
+              csv_compression=csv_compression,
+              workers=epacems_workers,
+              csv_engine=epacems_csv_engine,
+              copy_format=copy_format,
+              copy_writers=epacems_copy_writers,
+              partitioned=epacems_partitioned,
+              on_duplicates=epacems_duplicates,
+              index_workers=index_workers,
+              brin=epacems_brin,
+              maintenance_work_mem=maintenance_work_mem,
+              parallel_workers=index_parallel_workers,
+              clustered=epacems_clustered)
 
     pudl_engine.execute("ANALYZE")
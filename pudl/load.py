@@ -1,17 +1,100 @@
 """A module with functions for loading the pudl database tables."""
 
-import shutil
 import os
 import io
+import sys
+import gzip
+import time
+import struct
+import logging
 import contextlib
+import collections
+import concurrent.futures
+import queue
+import threading
+import numpy as np
 import pandas as pd
+import sqlalchemy as sa
 import postgres_copy
 import pudl
 import pudl.models.entities
 import pudl.constants as pc
 
+logger = logging.getLogger(__name__)
 
-def _csv_dump_load(df, table_name, engine, csvdir='', keep_csv=False):
+
+def _fix_int_na(df, table_name, need_fix_inting=pc.need_fix_inting):
+    """
+    Prepare integer columns that contain NA values for CSV output.
+
+    Columns which already use one of the pandas nullable integer types are
+    written out correctly by to_csv() and are left alone. Only float or object
+    columns get converted using pudl.helpers.fix_int_na().
+    """
+    columns = [c for c in need_fix_inting.get(table_name, ())
+               if not pd.api.types.is_integer_dtype(df[c])]
+    if not columns:
+        return df
+    return pudl.helpers.fix_int_na(df, columns=columns)
+
+
+class _ChunkStream(io.RawIOBase):
+    """
+    A read-only file-like object, reading from an iterator of bytes.
+
+    This lets COPY FROM consume data as it's being generated, rather than
+    requiring the whole thing to be serialized in memory first. Optionally,
+    everything that gets read is also written to another file (tee), so the
+    same data can be saved to disk in the same pass.
+
+    Args:
+        chunks (iterable): An iterable of bytes objects.
+        tee (file): A binary file opened for writing, or None.
+    """
+
+    def __init__(self, chunks, tee=None):
+        super().__init__()
+        self._chunks = iter(chunks)
+        self._tee = tee
+        self._buffer = b''
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self._buffer:
+            try:
+                self._buffer = next(self._chunks)
+            except StopIteration:
+                return 0
+            if self._tee is not None:
+                self._tee.write(self._buffer)
+        n = min(len(b), len(self._buffer))
+        b[:n] = self._buffer[:n]
+        self._buffer = self._buffer[n:]
+        return n
+
+
+def _csv_chunks(df, chunk_rows=100000):
+    """Generate the CSV representation of a DataFrame a few rows at a time."""
+    yield df.iloc[:0].to_csv(index=False).encode('utf-8')
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows]
+        yield chunk.to_csv(index=False, header=False).encode('utf-8')
+
+
+def _open_csv(csvdir, table_name, compression=None):
+    """Open the file a table's CSV output should be saved to."""
+    outfile = os.path.join(csvdir, table_name + '.csv')
+    if compression == 'gzip':
+        return gzip.open(outfile + '.gz', 'wb')
+    if compression is None:
+        return open(outfile, 'wb')
+    raise ValueError(f"Unrecognized CSV compression: {compression}")
+
+
+def _csv_dump_load(df, table_name, engine, csvdir='', keep_csv=False,
+                   csv_compression=None, metadata=None):
     """
     Write a dataframe to CSV and load it into postgresql using COPY FROM.
 
@@ -20,8 +103,9 @@ def _csv_dump_load(df, table_name, engine, csvdir='', keep_csv=False):
     CSV file, and then loads it into the specified table using a sqlalchemy
     wrapper around the postgresql COPY FROM command, called postgres_copy.
 
-    Note that this creates an additional in-memory representation of the data,
-    which takes slightly less memory than the DataFrame itself.
+    The CSV is generated a chunk of rows at a time, as the database reads it,
+    so there's never more than a small piece of the CSV in memory. If the CSV
+    is being kept, each chunk is written to disk as it goes by.
 
     Args:
         df (pandas.DataFrame): The DataFrame which is to be dumped to CSV and
@@ -42,20 +126,406 @@ def _csv_dump_load(df, table_name, engine, csvdir='', keep_csv=False):
             has been loaded into the database. False if they should be deleted.
             NOTE: If multiple COPYs are done for the same table_name, only
             the last will be retained by keep_csv, which may be unsatisfying.
+        csv_compression (str): None to save the CSV as is, or 'gzip'.
+        metadata (sqlalchemy.MetaData): Where to look up the table. Defaults
+            to the PUDL database metadata.
     Returns: Nothing.
     """
-
-    tbl = pudl.models.entities.PUDLBase.metadata.tables[table_name]
-    with io.StringIO() as f:
-        df.to_csv(f, index=False)
-        f.seek(0)
+    if metadata is None:
+        metadata = pudl.models.entities.PUDLBase.metadata
+    tbl = metadata.tables[table_name]
+    with contextlib.ExitStack() as stack:
+        tee = None
+        if keep_csv:
+            tee = stack.enter_context(
+                _open_csv(csvdir, table_name, compression=csv_compression))
+        f = stack.enter_context(_ChunkStream(_csv_chunks(df), tee=tee))
         postgres_copy.copy_from(f, tbl, engine, columns=tuple(df.columns),
                                 format='csv', header=True, delimiter=',')
-        if keep_csv:
-            print(f"DEBUG: writing CSV")
-            f.seek(0)
-            outfile = os.path.join(csvdir, table_name + '.csv')
-            shutil.copyfileobj(f, outfile)
+
+
+###############################################################################
+# PostgreSQL binary COPY encoding
+###############################################################################
+# See https://www.postgresql.org/docs/current/sql-copy.html for the format.
+# The file starts with a fixed signature, a 32 bit flags field, and a 32 bit
+# header extension length. Each row is a 16 bit field count, followed by each
+# field as a 32 bit length (-1 for NULL) and that many bytes of data, in the
+# type's binary "send" representation. All integers are big-endian.
+PGCOPY_HEADER = b'PGCOPY\n\xff\r\n\x00' + struct.pack('!ii', 0, 0)
+PGCOPY_TRAILER = struct.pack('!h', -1)
+# PostgreSQL dates and timestamps count from 2000-01-01, not 1970-01-01.
+PG_EPOCH_DAYS = 10957
+PG_EPOCH_MICROSECONDS = PG_EPOCH_DAYS * 86400 * 10**6
+
+
+def _pg_fixed_width(values, mask, dtype):
+    """Encode a numpy array as fixed width big-endian binary fields."""
+    data = np.ascontiguousarray(values[~mask], dtype=dtype)
+    width = data.dtype.itemsize
+    return width, data.view(np.uint8)
+
+
+def _pg_numeric(values, mask, precision, scale):
+    """
+    Encode fixed precision decimal values in the PostgreSQL NUMERIC format.
+
+    NUMERIC values are sent as a count of base 10000 digits, the weight
+    (exponent) of the first digit, a sign flag, the display scale, and then
+    the digits themselves. Every value here gets the same number of digits,
+    which PostgreSQL is happy to accept (it strips the extra zeroes).
+    """
+    int_groups = max(1, -(-(precision - scale) // 4))
+    frac_groups = -(-scale // 4)
+    ndigits = int_groups + frac_groups
+    vals = values[~mask].astype(np.float64)
+    scaled = np.round(np.abs(vals) * 10**(4 * frac_groups)).astype(np.int64)
+    out = np.empty((len(vals), 4 + ndigits), dtype='>i2')
+    out[:, 0] = ndigits
+    out[:, 1] = int_groups - 1
+    out[:, 2] = np.where(vals < 0, 0x4000, 0)
+    out[:, 3] = scale
+    for i in range(ndigits - 1, -1, -1):
+        scaled, out[:, 4 + i] = np.divmod(scaled, 10000)
+    return out.itemsize * out.shape[1], out.view(np.uint8).ravel()
+
+
+def _pg_text(series, mask, null_empty_strings=True):
+    """
+    Encode a column as UTF-8 text fields.
+
+    Each distinct value is only encoded once. Categorical columns use their
+    existing codes, other columns are factorized first. Empty strings are
+    NULL, like in the CSV loader, unless null_empty_strings is False.
+
+    Returns:
+        tuple: An array of field lengths (-1 for NULL) and a uint8 array of
+        the concatenated non-NULL field contents.
+    """
+    if pd.api.types.is_categorical_dtype(series):
+        codes = series.cat.codes.values
+        uniques = series.cat.categories
+    else:
+        codes, uniques = pd.factorize(series)
+    encoded = [str(u).encode('utf-8') for u in uniques]
+    uniq_len = np.array([len(e) for e in encoded], dtype=np.int64)
+    uniq_start = np.concatenate([[0], np.cumsum(uniq_len)[:-1]])
+    uniq_bytes = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+    # Empty strings are written out as NULL by the CSV loader. Do the same.
+    mask = mask | (codes < 0)
+    if len(uniq_len) and null_empty_strings:
+        mask |= uniq_len[np.maximum(codes, 0)] == 0
+    codes = codes[~mask]
+    lengths = np.full(len(series), -1, dtype=np.int64)
+    lengths[~mask] = uniq_len[codes]
+    row_len = uniq_len[codes]
+    total = row_len.sum()
+    # Gather the bytes of each row's string out of the unique strings.
+    row_start = np.concatenate([[0], np.cumsum(row_len)[:-1]])
+    src = (np.repeat(uniq_start[codes] - row_start, row_len) +
+           np.arange(total, dtype=np.int64))
+    return lengths, uniq_bytes[src]
+
+
+def _pg_binary_field(series, col_type, null_empty_strings=True):
+    """
+    Encode one DataFrame column in the PostgreSQL binary COPY format.
+
+    Args:
+        series (pandas.Series): The data to be encoded.
+        col_type (sqlalchemy.types.TypeEngine): The type of the database
+            column that the data will be loaded into.
+        null_empty_strings (bool): Whether empty strings become NULL.
+
+    Returns:
+        tuple: An array of field lengths (-1 for NULL), and a uint8 array of
+        the concatenated contents of the non-NULL fields.
+    """
+    mask = series.isna().values
+    if isinstance(col_type, (sa.String, sa.Enum)):
+        return _pg_text(series, mask, null_empty_strings=null_empty_strings)
+
+    if isinstance(col_type, sa.Boolean):
+        values = series.fillna(False).values.astype(np.bool_)
+        width, data = _pg_fixed_width(values, mask, np.uint8)
+    elif isinstance(col_type, sa.Integer):
+        if isinstance(col_type, sa.SmallInteger):
+            dtype = '>i2'
+        elif isinstance(col_type, sa.BigInteger):
+            dtype = '>i8'
+        else:
+            dtype = '>i4'
+        if not pd.api.types.is_numeric_dtype(series):
+            series = pd.to_numeric(series)
+        values = np.asarray(series.fillna(0), dtype=np.int64)
+        width, data = _pg_fixed_width(values, mask, dtype)
+    elif isinstance(col_type, sa.Float):
+        # REAL is a 4 byte float, everything else is double precision.
+        dtype = '>f4' if isinstance(col_type, sa.REAL) else '>f8'
+        if not pd.api.types.is_numeric_dtype(series):
+            series = pd.to_numeric(series)
+        width, data = _pg_fixed_width(series.values, mask, dtype)
+    elif isinstance(col_type, sa.Numeric):
+        if col_type.precision is None:
+            raise ValueError("Binary COPY requires NUMERIC columns to have "
+                             "a fixed precision and scale.")
+        if not pd.api.types.is_numeric_dtype(series):
+            series = pd.to_numeric(series)
+        width, data = _pg_numeric(series.values, mask,
+                                  col_type.precision, col_type.scale or 0)
+    elif isinstance(col_type, sa.DateTime):
+        # Timezone aware timestamps are stored in UTC. to_datetime() and
+        # .values both give us the UTC time for those.
+        ns = pd.to_datetime(series).values.view(np.int64)
+        width, data = _pg_fixed_width(
+            ns // 1000 - PG_EPOCH_MICROSECONDS, mask, '>i8')
+    elif isinstance(col_type, sa.Date):
+        ns = pd.to_datetime(series).values.view(np.int64)
+        width, data = _pg_fixed_width(
+            ns // (86400 * 10**9) - PG_EPOCH_DAYS, mask, '>i4')
+    else:
+        raise ValueError(
+            f"Binary COPY doesn't know how to encode {col_type} columns.")
+
+    lengths = np.where(mask, -1, width).astype(np.int64)
+    return lengths, data
+
+
+def _pg_binary_rows(df, tbl, null_empty_strings=True):
+    """Encode all the rows of a DataFrame as binary COPY tuples.
+
+    The fields are first encoded column by column, and then scattered into a
+    single output buffer at the offsets they occupy in each row.
+
+    Args:
+        df (pandas.DataFrame): The data to be encoded.
+        tbl (sqlalchemy.Table): The table the data will be loaded into.
+        null_empty_strings (bool): Whether empty strings become NULL.
+
+    Returns:
+        bytes: The encoded rows, without the COPY header or trailer.
+    """
+    nrows = len(df)
+    fields = [_pg_binary_field(df[col], tbl.c[col].type,
+                               null_empty_strings=null_empty_strings)
+              for col in df.columns]
+    field_sizes = [4 + np.maximum(lengths, 0) for lengths, _ in fields]
+    row_sizes = 2 + np.sum(field_sizes, axis=0) if fields else np.full(
+        nrows, 2, dtype=np.int64)
+    row_start = np.concatenate([[0], np.cumsum(row_sizes)[:-1]])
+    buf = np.empty(int(row_sizes.sum()), dtype=np.uint8)
+
+    def scatter(offsets, values, width):
+        idx = offsets[:, None] + np.arange(width, dtype=np.int64)
+        buf[idx] = values.reshape(-1, width)
+
+    scatter(row_start, np.full(nrows, len(fields), dtype='>i2').view(np.uint8),
+            2)
+    field_start = row_start + 2
+    for (lengths, data), size in zip(fields, field_sizes):
+        scatter(field_start, lengths.astype('>i4').view(np.uint8), 4)
+        notnull = lengths >= 0
+        row_len = lengths[notnull]
+        if len(row_len) and (row_len == row_len[0]).all():
+            # Every field the same width (possibly all empty strings).
+            if row_len[0]:
+                scatter(field_start[notnull] + 4, data, int(row_len[0]))
+        elif len(row_len):
+            starts = np.concatenate([[0], np.cumsum(row_len)[:-1]])
+            dst = (np.repeat(field_start[notnull] + 4 - starts, row_len) +
+                   np.arange(row_len.sum(), dtype=np.int64))
+            buf[dst] = data
+        field_start = field_start + size
+    return buf.tobytes()
+
+
+def _pg_binary_chunks(df, tbl, chunk_rows=100000, null_empty_strings=True):
+    """
+    Generate a binary COPY stream from a DataFrame, a few rows at a time.
+
+    The intermediate arrays used in encoding the data are several times the
+    size of the encoded data, so the rows are encoded in chunks to keep memory
+    usage down.
+
+    Args:
+        df (pandas.DataFrame): The data to be encoded. The column names must
+            match the names of the columns in tbl.
+        tbl (sqlalchemy.Table): The table the data will be loaded into. Its
+            column types determine how the data is encoded.
+        chunk_rows (int): The number of rows to encode at a time.
+        null_empty_strings (bool): Whether empty strings become NULL.
+
+    Yields:
+        bytes: The COPY header, the encoded rows, and the COPY trailer.
+    """
+    yield PGCOPY_HEADER
+    for start in range(0, len(df), chunk_rows):
+        yield _pg_binary_rows(df.iloc[start:start + chunk_rows], tbl,
+                              null_empty_strings=null_empty_strings)
+    yield PGCOPY_TRAILER
+
+
+def _binary_dump_load(df, table_name, engine, csvdir='', keep_csv=False,
+                      csv_compression=None, metadata=None,
+                      null_empty_strings=True):
+    """
+    Load a DataFrame into postgresql using binary COPY FROM.
+
+    Rather than formatting every value as text and having postgresql parse it
+    again, the columns are encoded directly from their numpy arrays into the
+    binary format that PostgreSQL uses internally. The encoding of each column
+    is determined by the type of the database column it is loaded into.
+    Missing values (NaN, None, NaT, and empty strings) become NULL, just as
+    they do when loading CSVs.
+
+    Args:
+        df (pandas.DataFrame): The DataFrame to be loaded into the database.
+            All DataFrame columns must have exactly the same names as the
+            database fields they are meant to populate.
+        table_name (str): The exact name of the database table which the
+            DataFrame df is going to be used to populate.
+        engine (sqlalchemy.engine): SQLAlchemy database engine, which will be
+            used to pull the data into the database.
+        csvdir (str): Path to the directory into which the CSV file should be
+            saved, if it's being kept.
+        keep_csv (bool): If True, also write the data out to a CSV file.
+        csv_compression (str): None to save the CSV as is, or 'gzip'.
+        metadata (sqlalchemy.MetaData): Where to look up the table. Defaults
+            to the PUDL database metadata.
+        null_empty_strings (bool): If False, empty strings are loaded as
+            empty strings rather than NULL.
+
+    Returns: Nothing.
+    """
+    if metadata is None:
+        metadata = pudl.models.entities.PUDLBase.metadata
+    tbl = metadata.tables[table_name]
+    chunks = _pg_binary_chunks(df, tbl, null_empty_strings=null_empty_strings)
+    with _ChunkStream(chunks) as f:
+        postgres_copy.copy_from(f, tbl, engine, columns=tuple(df.columns),
+                                format='binary')
+    if keep_csv:
+        # Written the same way as the CSVs that are loaded, so that integer
+        # columns with NA values don't come out as floats.
+        csv_df = _fix_int_na(df, table_name)
+        with _open_csv(csvdir, table_name, csv_compression) as outfile:
+            for chunk in _csv_chunks(csv_df):
+                outfile.write(chunk)
+
+
+def _dump_load(df, table_name, engine, csvdir='', keep_csv=False,
+               format='csv', csv_compression=None, metadata=None,
+               null_empty_strings=True):
+    """Load a DataFrame into postgresql using either text or binary COPY.
+
+    The table is looked up in metadata, which defaults to the PUDL database
+    metadata. Empty strings are loaded as NULL, unless null_empty_strings is
+    False, which only the binary format supports.
+    """
+    if format == 'csv':
+        if not null_empty_strings:
+            raise ValueError("Only binary COPY can load empty strings.")
+        _csv_dump_load(df, table_name, engine, csvdir=csvdir,
+                       keep_csv=keep_csv, csv_compression=csv_compression,
+                       metadata=metadata)
+    elif format == 'binary':
+        _binary_dump_load(df, table_name, engine, csvdir=csvdir,
+                          keep_csv=keep_csv, csv_compression=csv_compression,
+                          metadata=metadata,
+                          null_empty_strings=null_empty_strings)
+    else:
+        raise ValueError(f"Unrecognized COPY format: {format}")
+
+
+def _frame_nbytes(df, accounting='sample', sample_size=1000):
+    """
+    Estimate how much memory a DataFrame occupies, in bytes.
+
+    A shallow count (pandas' default) only sees the 8 byte pointers in object
+    columns, and not the python strings they point to, which can be several
+    times bigger. A deep count looks at every one of those objects, which is
+    slow for big frames. Sampling looks at up to sample_size evenly spaced
+    values in each object column, and scales their size up to the whole
+    column.
+
+    Args:
+        df (pandas.DataFrame): The frame to measure.
+        accounting (str): 'shallow', 'deep' or 'sample'.
+        sample_size (int): Values per object column to measure when sampling.
+    Returns:
+        int: The (estimated) size of df in bytes.
+    """
+    if accounting == 'shallow':
+        return int(df.memory_usage(index=True).sum())
+    if accounting == 'deep':
+        return int(df.memory_usage(index=True, deep=True).sum())
+    if accounting != 'sample':
+        raise ValueError(f"Unknown memory accounting {accounting}.")
+    nbytes = int(df.memory_usage(index=True).sum())
+    nrows = len(df)
+    if nrows == 0:
+        return nbytes
+    step = max(nrows // sample_size, 1)
+    for col in df.columns:
+        if df[col].dtype != object:
+            continue
+        sample = df[col].values[::step]
+        nbytes += int(sum(map(sys.getsizeof, sample)) * nrows / len(sample))
+    return nbytes
+
+
+# Details of one BulkCopy spill, which are passed to its on_spill hook.
+SpillStats = collections.namedtuple('SpillStats', [
+    'table_name',  # The table the data is going into.
+    'frames',  # How many accumulated DataFrames were spilled.
+    'rows',  # Total number of records spilled.
+    'nbytes',  # Estimated size of the spilled data, in bytes.
+    'reason',  # 'bytes', 'rows', 'ceiling' or 'close'
+    'queued',  # True if handed to a background writer, False if loaded.
+    'seconds',  # Time spent loading (or waiting to queue) the data.
+])
+
+
+def log_spill(stats):
+    """The default BulkCopy on_spill hook, which logs each spill."""
+    action = 'Queued' if stats.queued else 'Loaded'
+    logger.info(
+        f"{action} {stats.rows:,} records ({stats.nbytes / 1024**2:.0f} MB "
+        f"from {stats.frames} frames) for {stats.table_name} in "
+        f"{stats.seconds:.1f} s, triggered by {stats.reason}.")
+
+
+# Process-wide limit on the data held by all BulkCopy buffers together, and
+# the amount each live BulkCopy is holding. See set_buffer_ceiling().
+_buffer_ceiling = None
+_buffered_bytes = {}
+_buffer_lock = threading.Lock()
+
+
+def set_buffer_ceiling(nbytes):
+    """
+    Limit the memory used by all concurrent BulkCopy buffers together.
+
+    Each BulkCopy spills when its own buffer or max_rows limits are reached.
+    With a ceiling set, whichever BulkCopy pushes the total accumulated by all
+    of them over the ceiling also spills, even if its own buffer isn't full.
+    Data that has been queued for background writers isn't counted.
+
+    Args:
+        nbytes (int): The ceiling in bytes, or None for no ceiling.
+    """
+    global _buffer_ceiling
+    _buffer_ceiling = nbytes
+
+
+def _buffer_total(key, nbytes):
+    """Record how much one BulkCopy holds, and return the process total."""
+    with _buffer_lock:
+        if nbytes:
+            _buffered_bytes[key] = nbytes
+        else:
+            _buffered_bytes.pop(key, None)
+        return sum(_buffered_bytes.values())
 
 
 class BulkCopy(contextlib.AbstractContextManager):
@@ -64,6 +534,15 @@ class BulkCopy(contextlib.AbstractContextManager):
     NOTE: You shoud use this class to load one table at a time. To load
     different tables, use different instances of BulkCopy.
 
+    By default, each spill blocks until the accumulated data has been loaded
+    into the database. If writers is greater than zero, the data is instead
+    loaded in the background: each spill puts the accumulated data on a queue,
+    and that many writer threads, each with its own database connection, pull
+    data off the queue and COPY it into postgresql. Meanwhile the caller can
+    keep extracting and transforming more data. If the writers fall behind,
+    the queue fills up and spill() waits for room, so at most about
+    (queue_size + writers + 1) * buffer bytes of data are held in memory.
+
     Args:
         table_name (str): The exact name of the database table which the
             DataFrame df is going to be used to populate. It will be used both
@@ -72,14 +551,36 @@ class BulkCopy(contextlib.AbstractContextManager):
         engine (sqlalchemy.engine): SQLAlchemy database engine, which will be
             used to pull the CSV output into the database.
         buffer (int): Size of data to accumulate (in bytes) before actually
-            writing the data into postgresql. (Approximate, because we don't
-            introspect memory usage 'deeply'). Default 1 GB.
+            writing the data into postgresql. Default 1 GB.
+        max_rows (int): Number of records to accumulate before writing them
+            into postgresql, regardless of their size. Default is no limit.
+        accounting (str): How to measure the size of the accumulated data:
+            'sample' (the default) estimates the size of strings in object
+            columns from a sample of them, 'deep' measures all of them, and
+            'shallow' counts only the pointers to them. See _frame_nbytes().
         csvdir (str): Path to the directory into which the CSV file should be
             saved, if it's being kept.
         keep_csv (bool): True if the CSV output should be saved after the data
             has been loaded into the database. False if they should be deleted.
             NOTE: If multiple COPYs are done for the same table_name, only
             the last will be retained by keep_csv, which may be unsatisfying.
+        format (str): Either 'csv' to COPY the data as text, or 'binary' to
+            encode it in the PostgreSQL binary COPY format, which is much
+            faster to generate and to parse.
+        csv_compression (str): None to save the kept CSV as is, or 'gzip'.
+        writers (int): Number of background threads loading data into the
+            database. Zero (the default) loads the data synchronously.
+        queue_size (int): Maximum number of spilled DataFrames waiting for a
+            writer. Defaults to the number of writers.
+        on_spill (callable): Called with a SpillStats namedtuple after every
+            spill. Defaults to log_spill(), which logs it.
+
+    A ceiling on the data held by all BulkCopy instances in the process
+    together can also be set with set_buffer_ceiling().
+
+    To find out when some data has made it into the database (e.g. to record
+    it in a load manifest) without waiting for it, use when_loaded().
+
     Example:
     with BulkCopy(my_table, my_engine) as p:
         for df in df_generator:
@@ -87,15 +588,44 @@ class BulkCopy(contextlib.AbstractContextManager):
     """
 
     def __init__(self, table_name, engine, buffer=1024**3,
-                 csvdir='', keep_csv=False):
+                 csvdir='', keep_csv=False, format='csv',
+                 csv_compression=None, writers=0, queue_size=None,
+                 max_rows=None, accounting='sample', on_spill=log_spill):
         self.table_name = table_name
         self.engine = engine
         self.buffer = buffer
+        self.max_rows = max_rows
+        self.accounting = accounting
+        self.on_spill = on_spill
         self.keep_csv = keep_csv
         self.csvdir = csvdir
+        self.format = format
+        self.csv_compression = csv_compression
         # Initialize a list to keep the dataframes
         self.accumulated_dfs = []
         self.accumulated_size = 0
+        self.accumulated_rows = 0
+        # Each spill is numbered. Callbacks wait on the spill the data they
+        # follow will go out with, and run once it and all the spills before
+        # it have been committed, since the writers may finish out of order.
+        self._spill_number = 0
+        self._callbacks = collections.defaultdict(list)
+        self._committed = set()
+        self._next_uncommitted = 0
+        self._lock = threading.Lock()
+        # Background writers, if any.
+        self._errors = []
+        self._threads = []
+        if writers > 0:
+            if queue_size is None:
+                queue_size = writers
+            self._queue = queue.Queue(maxsize=queue_size)
+            for i in range(writers):
+                thread = threading.Thread(
+                    target=self._writer, name=f"BulkCopy-{table_name}-{i}",
+                    daemon=True)
+                thread.start()
+                self._threads.append(thread)
 
     def add(self, df):
         """Add a DataFrame to the accumulated list"""
@@ -103,17 +633,19 @@ class BulkCopy(contextlib.AbstractContextManager):
             raise AssertionError(
                 "Expected dataframe as input."
             )
-        df = pudl.helpers.fix_int_na(
-            df, columns=pc.need_fix_inting[self.table_name]
-        )
+        self._raise_writer_errors()
         # Note: append to a list here, then do a concat when we spill
         self.accumulated_dfs.append(df)
-        self.accumulated_size += sum(df.memory_usage())
+        self.accumulated_size += _frame_nbytes(df, self.accounting)
+        self.accumulated_rows += len(df)
+        total = _buffer_total(id(self), self.accumulated_size)
         if self.accumulated_size > self.buffer:
-            # Debugging:
-            # print(f"DEBUG: Copying {len(self.accumulated_dfs)} accumulated dataframes, " +
-            #       f"totalling {round(self.accumulated_size / 1024**2)} MB")
-            self.spill()
+            self.spill(reason='bytes')
+        elif (self.max_rows is not None and
+              self.accumulated_rows >= self.max_rows):
+            self.spill(reason='rows')
+        elif _buffer_ceiling is not None and total > _buffer_ceiling:
+            self.spill(reason='ceiling')
 
     def _check_names(self):
         expected_colnames = set(self.accumulated_dfs[0].columns.values)
@@ -128,54 +660,343 @@ expected:
 {str(colnames.symmetric_difference(expected_colnames))}
             """)
 
-    def spill(self):
+    def when_loaded(self, callback):
+        """
+        Call a function once everything added so far is in the database.
+
+        This doesn't wait, or make the accumulated data spill any sooner.
+        The callback is called with no arguments, after the spill holding
+        the data added so far, and every spill before it, has been committed.
+        With background writers, that happens in a writer thread. If any of
+        that data fails to load, the callback is never called.
+        """
+        with self._lock:
+            number = self._spill_number
+            if not self.accumulated_dfs:
+                # Everything added so far has gone out already.
+                number -= 1
+            if number >= self._next_uncommitted:
+                self._callbacks[number].append(callback)
+                return
+        callback()
+
+    def _mark_committed(self, number):
+        """Note that a spill is in the database, and run any callbacks due."""
+        ready = []
+        with self._lock:
+            self._committed.add(number)
+            while self._next_uncommitted in self._committed:
+                self._committed.remove(self._next_uncommitted)
+                ready += self._callbacks.pop(self._next_uncommitted, [])
+                self._next_uncommitted += 1
+        for callback in ready:
+            callback()
+
+    def _load(self, df, engine):
+        """COPY one DataFrame into the database table."""
+        _dump_load(df, table_name=self.table_name, engine=engine,
+                   csvdir=self.csvdir, keep_csv=self.keep_csv,
+                   format=self.format, csv_compression=self.csv_compression)
+
+    def _writer(self):
+        """Load DataFrames from the queue until told to stop.
+
+        Each writer holds its own database connection, and commits after
+        every DataFrame. After any writer has failed, the remaining data is
+        discarded, but the queue is still drained so that nobody blocks
+        forever waiting to put more data on it.
+        """
+        conn = self.engine.raw_connection()
+        try:
+            while True:
+                item = self._queue.get()
+                try:
+                    if item is None:
+                        return
+                    if not self._errors:
+                        number, df = item
+                        self._load(df, conn)
+                        conn.commit()
+                        self._mark_committed(number)
+                except Exception as err:
+                    conn.rollback()
+                    self._errors.append(err)
+                finally:
+                    del item
+                    self._queue.task_done()
+        finally:
+            conn.close()
+
+    def _raise_writer_errors(self):
+        if self._errors:
+            raise AssertionError(
+                f"Background COPY into {self.table_name} failed."
+            ) from self._errors[0]
+
+    def spill(self, reason='close'):
         """Spill the accumulated dataframes into postgresql"""
         if self.accumulated_dfs:
+            number = self._spill_number
+            self._spill_number += 1
             self._check_names()
             if len(self.accumulated_dfs) > 1:
                 # Work around https://github.com/pandas-dev/pandas/issues/25257
-                all_dfs = pd.concat(self.accumulated_dfs,
-                                    copy=False, ignore_index=True, sort=False)
+                all_dfs = pd.concat(
+                    pudl.helpers.unify_categories(self.accumulated_dfs),
+                    copy=False, ignore_index=True, sort=False)
             else:
                 all_dfs = self.accumulated_dfs[0]
-            print(f"===================== Dramatic Pause ====================")
-            print(
-                f"    Loading {len(all_dfs):,} records ({round(self.accumulated_size/1024**2)} MB) into PUDL.", flush=True)
-            _csv_dump_load(all_dfs, table_name=self.table_name, engine=self.engine,
-                           csvdir=self.csvdir, keep_csv=self.keep_csv)
-            print(f"================ Resume Number Crunching ================",
-                  flush=True)
+            # The binary encoder writes NA integers as NULL directly. For CSV
+            # they're fixed once per spill, rather than once per frame.
+            if self.format == 'csv':
+                all_dfs = _fix_int_na(all_dfs, self.table_name)
+            stats = dict(table_name=self.table_name,
+                         frames=len(self.accumulated_dfs),
+                         rows=len(all_dfs), nbytes=self.accumulated_size,
+                         reason=reason, queued=bool(self._threads))
+            self.accumulated_dfs = []
+            start = time.monotonic()
+            if self._threads:
+                # Blocks while the queue is full, until a writer catches up.
+                self._queue.put((number, all_dfs))
+                self._raise_writer_errors()
+            else:
+                self._load(all_dfs, self.engine)
+                self._mark_committed(number)
+            del all_dfs
+            if self.on_spill is not None:
+                self.on_spill(SpillStats(
+                    seconds=time.monotonic() - start, **stats))
         self.accumulated_dfs = []
         self.accumulated_size = 0
+        self.accumulated_rows = 0
+        _buffer_total(id(self), 0)
+
+    def _stop_writers(self):
+        """Wait for the writers to finish loading everything queued."""
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
 
     def close(self):
-        self.spill()
+        try:
+            self.spill()
+        finally:
+            _buffer_total(id(self), 0)
+            self._stop_writers()
+        self._raise_writer_errors()
 
     def __exit__(self, exception_type, exception_value, traceback):
         self.close()
 
 
+def _create_index(engine, index, maintenance_work_mem=None,
+                  parallel_workers=None):
+    """
+    Create one index in its own transaction, and time it.
+
+    The maintenance_work_mem and max_parallel_maintenance_workers settings
+    are changed only for the transaction building the index (like SET LOCAL),
+    so they don't leak into other uses of the pooled connection.
+
+    If the index stands in for a primary key or unique constraint that was
+    dropped by defer_indexes(), the constraint is put back using the index
+    once it has been built. Those constraints used to be enforced while the
+    data was loaded, so failing to build one raises an error.
+
+    Returns:
+        float: How long the index took to build, in seconds. None if it
+        already existed, or couldn't be built (which raises a warning).
+    """
+    with engine.begin() as conn:
+        exists = conn.execute(
+            sa.text("SELECT to_regclass(:name)"), name=index.name).scalar()
+    if exists is not None:
+        return None
+    start = time.monotonic()
+    try:
+        with engine.begin() as conn:
+            if maintenance_work_mem is not None:
+                conn.execute(sa.text(
+                    "SELECT set_config('maintenance_work_mem', :v, true)"),
+                    v=str(maintenance_work_mem))
+            if parallel_workers is not None:
+                conn.execute(sa.text(
+                    "SELECT set_config("
+                    "'max_parallel_maintenance_workers', :v, true)"),
+                    v=str(parallel_workers))
+            index.create(conn)
+            constraint = index.info.get('constraint')
+            if constraint is not None:
+                conn.execute(
+                    f'ALTER TABLE "{index.table.name}" '
+                    f'ADD CONSTRAINT "{index.name}" {constraint} '
+                    f'USING INDEX "{index.name}"')
+    except (sa.exc.ProgrammingError, sa.exc.IntegrityError) as e:
+        if index.info.get('constraint') is not None:
+            raise
+        from warnings import warn
+        warn(f"Failed to add index/constraint '{index.name}'\n" +
+             "Details:\n" + str(e))
+        return None
+    return time.monotonic() - start
+
+
+def build_indexes(engine, indexes, workers=1, maintenance_work_mem=None,
+                  parallel_workers=None, verbose=False):
+    """
+    Build several indexes at once, each on its own database connection.
+
+    Building indexes after the data has been loaded is much faster than
+    updating them during the load. Indexes which already exist are skipped,
+    and indexes which can't be built (e.g. a unique index on non-unique data)
+    only raise a warning.
+
+    Args:
+        engine (sqlalchemy.engine.Engine): The database.
+        indexes (iterable): sqlalchemy.Index objects to create.
+        workers (int): How many indexes to build at a time.
+        maintenance_work_mem (str): Memory each index build may use for
+            sorting, as a PostgreSQL setting (e.g. '1GB'). The server's
+            setting is used if None.
+        parallel_workers (int): max_parallel_maintenance_workers for each
+            build (PostgreSQL 11+ uses them for btree indexes). The server's
+            setting is used if None.
+        verbose (bool): If True, print how long each index took.
+    Returns:
+        dict: {index name: seconds it took to build}, for the indexes which
+        were built.
+    """
+    timings = {}
+    with concurrent.futures.ThreadPoolExecutor(max(workers, 1)) as executor:
+        futures = {
+            executor.submit(_create_index, engine, index,
+                            maintenance_work_mem=maintenance_work_mem,
+                            parallel_workers=parallel_workers): index.name
+            for index in indexes
+        }
+        for future in concurrent.futures.as_completed(futures):
+            seconds = future.result()
+            if seconds is not None:
+                timings[futures[future]] = seconds
+                if verbose:
+                    print(f"    Built index {futures[future]} in "
+                          f"{seconds:.1f} s.", flush=True)
+    return timings
+
+
+def _constraint_index(table, constraint):
+    """
+    An index standing in for a primary key or unique constraint.
+
+    The index has the name PostgreSQL gives the constraint (and the index
+    behind it) by default, since the PUDL metadata doesn't name them. It's
+    defined on a copy of the table, so that it doesn't become part of the
+    PUDL metadata and get created along with the table next time.
+    """
+    columns = [col.name for col in constraint.columns]
+    if isinstance(constraint, sa.PrimaryKeyConstraint):
+        name, kind = f"{table.name}_pkey", "PRIMARY KEY"
+    else:
+        name = f"{table.name}_{'_'.join(columns)}_key"
+        kind = "UNIQUE"
+    copy = sa.Table(table.name, sa.MetaData(),
+                    *[sa.Column(col, table.c[col].type) for col in columns])
+    return sa.Index(constraint.name or name, *copy.columns,
+                    unique=True, info={'constraint': kind})
+
+
+def defer_indexes(engine, table_names):
+    """
+    Drop the indexes on some tables, to be rebuilt after loading.
+
+    The stand alone indexes in the PUDL metadata (sqlalchemy.Index, or
+    Column(index=True)) are dropped, along with the primary keys and unique
+    constraints, whose indexes are just as expensive to keep up to date.
+    Constraints which foreign keys refer to are left alone, since the
+    foreign keys can't do without them. Pass the returned indexes to
+    build_indexes() once the data has been loaded.
+
+    Args:
+        engine (sqlalchemy.engine.Engine): The PUDL database.
+        table_names (iterable): Names of the tables about to be loaded.
+    Returns:
+        list: The sqlalchemy.Index objects which were dropped, or which stand
+        in for the constraints which were dropped.
+    """
+    tables = pudl.models.entities.PUDLBase.metadata.tables
+    referenced = {fk.column.table.name for table in tables.values()
+                  for fk in table.foreign_keys}
+    indexes = []
+    constraints = []
+    for table_name in table_names:
+        if table_name not in tables:
+            continue
+        table = tables[table_name]
+        indexes.extend(table.indexes)
+        if table_name in referenced:
+            continue
+        for constraint in table.constraints:
+            if isinstance(constraint, (sa.PrimaryKeyConstraint,
+                                       sa.UniqueConstraint)) and \
+                    len(constraint.columns) > 0:
+                constraints.append(_constraint_index(table, constraint))
+    with engine.begin() as conn:
+        for index in indexes:
+            conn.execute(f'DROP INDEX IF EXISTS "{index.name}"')
+        for index in constraints:
+            conn.execute(f'ALTER TABLE "{index.table.name}" '
+                         f'DROP CONSTRAINT IF EXISTS "{index.name}"')
+    return indexes + constraints
+
+
 def dict_dump_load(transformed_dfs,
                    data_source,
                    pudl_engine,
                    need_fix_inting=pc.need_fix_inting,
                    verbose=True,
                    csvdir='',
-                   keep_csv=False):
+                   keep_csv=False,
+                   format='csv',
+                   csv_compression=None,
+                   index_workers=1,
+                   maintenance_work_mem=None,
+                   parallel_workers=None):
     """
-    Wrapper for _csv_dump_load for each data source.
+    Wrapper for _csv_dump_load or _binary_dump_load for each data source.
+
+    The tables' indexes, primary keys and unique constraints are dropped
+    before the data is loaded, and rebuilt afterwards, several at a time
+    (see defer_indexes() and build_indexes()).
+
+    Args:
+        format (str): Either 'csv' or 'binary'. See BulkCopy for details.
+        csv_compression (str): None to save the kept CSVs as is, or 'gzip'.
+        index_workers (int): How many indexes to rebuild at a time.
+        maintenance_work_mem (str): PostgreSQL maintenance_work_mem for each
+            index build, e.g. '1GB'.
+        parallel_workers (int): PostgreSQL max_parallel_maintenance_workers
+            for each index build.
     """
     if verbose:
         print(f"Loading tables from {data_source} into PUDL:")
+    indexes = defer_indexes(pudl_engine, transformed_dfs.keys())
     for table_name, df in transformed_dfs.items():
         if verbose and table_name != "hourly_emissions_epacems":
             print(f"    {table_name}...")
-        if table_name in list(need_fix_inting.keys()):
-            df = pudl.helpers.fix_int_na(
-                df, columns=pc.need_fix_inting[table_name])
-
-        _csv_dump_load(df,
-                       table_name,
-                       pudl_engine,
-                       csvdir=csvdir,
-                       keep_csv=keep_csv)
+        if format == 'csv':
+            df = _fix_int_na(df, table_name, need_fix_inting=need_fix_inting)
+
+        _dump_load(df,
+                   table_name,
+                   pudl_engine,
+                   csvdir=csvdir,
+                   keep_csv=keep_csv,
+                   format=format,
+                   csv_compression=csv_compression)
+    build_indexes(pudl_engine, indexes, workers=index_workers,
+                  maintenance_work_mem=maintenance_work_mem,
+                  parallel_workers=parallel_workers,
+                  verbose=verbose)
@@ -1,8 +1,12 @@
 """Database models for PUDL tables derived from EPA CEMS Data."""
 
+import datetime
 import sqlalchemy as sa
-from sqlalchemy import Integer, SmallInteger, String
+from sqlalchemy import Integer, SmallInteger, String, Float, Date
 from sqlalchemy import REAL, TIMESTAMP, Column, Enum
+import pandas as pd
+import pudl.constants
+import pudl.load
 import pudl.models.entities
 
 # Three types of Enum here, one for things that are sort of measured, one for
@@ -18,29 +22,13 @@ import pudl.models.entities
 # - nox_mass_measurement_code
 
 ENUM_FLAG_MEASUREMENT = Enum(
-    "LME",
-    "Measured",
-    "Measured and Substitute",
-    "Other",
-    "Substitute",
-    "Undetermined",
-    "Unknown Code",
-    "",
+    *pudl.constants.epacems_measurement_codes,
     name="enum_measurement_flag",
 )
 # ENUM_FLAG_CALCULATED = Enum("Calculated", "", name="enum_calculated_flag")
 
 ENUM_NOX = Enum(
-    "Calculated",
-    "LME",
-    "Measured",
-    "Measured and Substitute",
-    "Not Applicable",
-    "Other",
-    "Substitute",
-    "Undetermined",
-    "Unknown Code",
-    "",
+    *pudl.constants.epacems_nox_codes,
     name="enum_nox",
 )
 
@@ -84,6 +72,95 @@ class HourlyEmissions(pudl.models.entities.PUDLBase):
     unit_id_epa = Column(Integer)
 
 
+class EpaCemsLoadManifest(pudl.models.entities.PUDLBase):
+    """Which state-years of EPA CEMS data are in the database, and from what.
+
+    Used to tell which state-years need to be (re)loaded when the CEMS data
+    is updated incrementally.
+    """
+
+    __tablename__ = "epacems_load_manifest"
+    year = Column(SmallInteger, primary_key=True)
+    state = Column(pudl.models.glue.us_states_lower48, primary_key=True)
+    checksum = Column(String, nullable=False,
+                      comment="SHA-256 digest of the monthly source files.")
+    row_count = Column(Integer, nullable=False)
+    loaded_at = Column(TIMESTAMP(timezone=True), nullable=False)
+    sort_order = Column(String, comment="Comma separated columns the "
+                        "records were sorted by before loading. NULL if they "
+                        "were loaded in the source files' order.")
+    months = Column(String, comment="Comma separated months (1-12) of "
+                    "source files that were loaded. NULL if loaded before "
+                    "partial years were supported, which meant all 12.")
+
+
+# With clustering turned on, each state-year is sorted this way before it's
+# loaded, so that each unit's time series is stored in consecutive pages.
+CLUSTER_ORDER = ("plant_id_eia", "unitid", "operating_datetime_utc")
+
+
+# Daily, monthly and annual totals of the hourly data, by unit and by plant.
+# Most questions about the CEMS data are about these totals, and they're much
+# faster to query than the hourly table. They're built by refresh_rollups().
+# The periods are based on UTC time.
+ROLLUP_PERIODS = {
+    # period: (postgresql date_trunc() field, pandas period frequency)
+    "daily": ("day", "D"),
+    "monthly": ("month", "M"),
+    "annual": ("year", "Y"),
+}
+ROLLUP_LEVELS = {
+    "unit": ("plant_id_eia", "unitid"),
+    "plant": ("plant_id_eia",),
+}
+# The emissions that are summed up in the rollups, and whose hourly values
+# may have been substituted rather than measured.
+ROLLUP_EMISSIONS = {
+    "so2_mass_lbs": "so2_mass_measurement_code",
+    "nox_mass_lbs": "nox_mass_measurement_code",
+    "co2_mass_tons": "co2_mass_measurement_code",
+}
+
+
+def rollup_table_name(period, level):
+    """The name of a CEMS rollup table, e.g. monthly_emissions_epacems_unit.
+    """
+    return f"{period}_emissions_epacems_{level}"
+
+
+def _define_rollup_table(period, level):
+    columns = [
+        Column("state", pudl.models.glue.us_states_lower48, nullable=False),
+        Column("plant_id_eia", Integer, primary_key=True),
+    ]
+    if level == "unit":
+        columns.append(Column("unitid", String, primary_key=True))
+    columns += [
+        Column("report_date", Date, primary_key=True,
+               comment="Start of the (UTC) day, month or year."),
+        Column("hours_reported", Integer, nullable=False,
+               comment="Number of hourly records summed up."),
+        Column("operating_time_hours", Float),
+        Column("gross_load_mwh", Float),
+        Column("heat_content_mmbtu", Float),
+    ]
+    for emission in ROLLUP_EMISSIONS:
+        columns.append(Column(emission, Float))
+    for emission in ROLLUP_EMISSIONS:
+        pollutant = emission.split("_")[0]
+        columns.append(Column(
+            f"{pollutant}_substitute_fraction", REAL,
+            comment=f"Fraction of hours with substitute {pollutant} data."))
+    return sa.Table(rollup_table_name(period, level),
+                    pudl.models.entities.PUDLBase.metadata, *columns)
+
+
+ROLLUP_TABLES = {
+    (period, level): _define_rollup_table(period, level)
+    for period in ROLLUP_PERIODS for level in ROLLUP_LEVELS
+}
+
+
 DROP_VIEWS = ["DROP VIEW IF EXISTS hourly_emissions_epacems_view"]
 CREATE_VIEWS = ["""
     CREATE VIEW hourly_emissions_epacems_view AS
@@ -114,10 +191,273 @@ CREATE_VIEWS = ["""
                 ]
 
 
-def finalize(engine):
+# Optional partitioned layout for the hourly_emissions_epacems table. The
+# table is range partitioned by operating_datetime_utc, with one partition per
+# UTC year, and each year is list partitioned by state. Queries restricted to
+# a time range or a state only need to look at the relevant partitions, and
+# the partitions can be indexed (and re-indexed) independently.
+# Partitioned tables can't have a primary key that doesn't include the
+# partition keys, so the surrogate id comes from a sequence instead.
+ID_SEQUENCE = "hourly_emissions_epacems_id_seq"
+
+
+def _partitioned_table():
+    """The hourly_emissions_epacems table, but partitioned by year & state."""
+    table = HourlyEmissions.__table__
+    columns = [
+        Column("id", Integer, nullable=False,
+               server_default=sa.text(f"nextval('{ID_SEQUENCE}'::regclass)")),
+        Column("state", pudl.models.glue.us_states_lower48, nullable=False,
+               comment=table.c.state.comment),
+    ]
+    columns += [col.copy() for col in table.columns
+                if col.name not in ("id", "state")]
+    return sa.Table(
+        table.name, sa.MetaData(), *columns,
+        postgresql_partition_by="RANGE (operating_datetime_utc)",
+    )
+
+
+def create_partitioned_table(engine):
+    """Replace the hourly_emissions_epacems table with a partitioned one.
+
+    The table (and the enum types it uses) should already have been created
+    by the PUDL metadata, but must not have any views depending on it yet. It
+    must be empty, since it gets dropped. The partitions are created as they
+    are needed, by create_partitions().
+
+    Args:
+        engine (sqlalchemy.engine.Engine): The PUDL database engine.
+    """
+    table = _partitioned_table()
+    with engine.begin() as conn:
+        conn.execute(f"DROP TABLE IF EXISTS {table.name}")
+        conn.execute(f"CREATE SEQUENCE {ID_SEQUENCE}")
+        conn.execute(sa.schema.CreateTable(table))
+        # Dropping the table drops the sequence too, just like for SERIAL.
+        conn.execute(f"ALTER SEQUENCE {ID_SEQUENCE} OWNED BY {table.name}.id")
+
+
+def is_partitioned(engine):
+    """Check whether hourly_emissions_epacems is a partitioned table."""
+    sql = sa.text("""
+        SELECT count(*) FROM pg_partitioned_table
+        WHERE partrelid = to_regclass(:name)
+        """)
+    return bool(engine.execute(
+        sql, name=HourlyEmissions.__tablename__).scalar())
+
+
+def partition_keys(df):
+    """
+    Find the (year, state) partitions that a DataFrame of CEMS data needs.
+
+    Note that the partitions are by UTC year, so a year of data in local time
+    will usually need partitions for two years.
+
+    Args:
+        df (pandas.DataFrame): Transformed hourly_emissions_epacems data, with
+            state and operating_datetime_utc columns.
+
+    Returns:
+        set: (year, state) tuples.
+    """
+    keys = df.groupby([df["operating_datetime_utc"].dt.year,
+                       df["state"].astype(str)]).size().index
+    return set(keys)
+
+
+def _partition_name(year, state=None):
+    name = f"{HourlyEmissions.__tablename__}_{year}"
+    if state is not None:
+        name += f"_{state.lower()}"
+    return name
+
+
+def create_partitions(engine, keys):
+    """
+    Create (if they don't exist yet) the partitions for some years & states.
+
+    Args:
+        engine (sqlalchemy.engine.Engine): The PUDL database engine.
+        keys (iterable): (year, state) tuples, e.g. from partition_keys().
+    """
+    parent = HourlyEmissions.__tablename__
+    with engine.begin() as conn:
+        for year in sorted({year for year, _ in keys}):
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {_partition_name(year)}
+                PARTITION OF {parent}
+                FOR VALUES FROM ('{year}-01-01 00:00+00')
+                TO ('{year + 1}-01-01 00:00+00')
+                PARTITION BY LIST (state)
+                """)
+        for year, state in sorted(keys):
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {_partition_name(year, state)}
+                PARTITION OF {_partition_name(year)}
+                FOR VALUES IN ('{state}')
+                """)
+
+
+def partitions(engine):
+    """List the names of all the leaf partitions of hourly_emissions_epacems.
+    """
+    sql = sa.text("""
+        WITH RECURSIVE tree AS (
+            SELECT inhrelid FROM pg_inherits
+            WHERE inhparent = to_regclass(:name)
+            UNION ALL
+            SELECT i.inhrelid FROM pg_inherits AS i
+            JOIN tree ON i.inhparent = tree.inhrelid
+        )
+        SELECT c.relname
+        FROM tree JOIN pg_class AS c ON c.oid = tree.inhrelid
+        WHERE c.relkind = 'r'
+        ORDER BY c.relname
+        """)
+    return [row[0] for row in engine.execute(
+        sql, name=HourlyEmissions.__tablename__)]
+
+
+def _create_manifest(engine):
+    """Create the load manifest, or add any columns it's missing."""
+    manifest = EpaCemsLoadManifest.__table__
+    manifest.create(engine, checkfirst=True)
+    # Manifests from before partial years were supported lack the months.
+    engine.execute(f"ALTER TABLE {manifest.name} "
+                   "ADD COLUMN IF NOT EXISTS months VARCHAR")
+    return manifest
+
+
+def loaded_checksums(engine):
+    """
+    Look up the source file checksums of the CEMS state-years already loaded.
+
+    Returns:
+        dict: {(year, state): checksum}
+    """
+    manifest = _create_manifest(engine)
+    rows = engine.execute(sa.select(
+        [manifest.c.year, manifest.c.state, manifest.c.checksum]))
+    return {(year, state): checksum for year, state, checksum in rows}
+
+
+def record_loads(engine, row_counts, checksums, months=None,
+                 sort_order=None):
+    """
+    Record state-years of CEMS data as loaded, in the load manifest.
+
+    Args:
+        engine (sqlalchemy.engine.Engine): The PUDL database engine.
+        row_counts (dict): {(year, state): number of records loaded}
+        checksums (dict): {(year, state): checksum of the source files}
+        months (dict): {(year, state): months of source files loaded}
+        sort_order (iterable): The columns the records were sorted by before
+            they were loaded, e.g. CLUSTER_ORDER. None if they weren't.
+    """
+    if sort_order is not None:
+        sort_order = ",".join(sort_order)
+    if months is None:
+        months = {}
+    manifest = _create_manifest(engine)
+    loaded_at = datetime.datetime.now(datetime.timezone.utc)
+    with engine.begin() as conn:
+        for (year, state), row_count in row_counts.items():
+            conn.execute(manifest.delete().where(sa.and_(
+                manifest.c.year == year, manifest.c.state == state)))
+            conn.execute(manifest.insert().values(
+                year=year, state=state, checksum=checksums[(year, state)],
+                row_count=row_count, loaded_at=loaded_at,
+                sort_order=sort_order,
+                months=(",".join(str(m) for m in months[(year, state)])
+                        if (year, state) in months else None)))
+
+
+def delete_state_year(engine, year, state, plant_utc_offset):
+    """
+    Delete the records that came from one state-year of CEMS data.
+
+    The CEMS data is published by local (standard) time, but stored in UTC,
+    so one year of a state's data can begin and end at a different UTC time
+    for each plant. The plants are grouped by their UTC offset, and the rows
+    for each group are deleted separately. Every plant with a known offset
+    is included, rather than looking up which plants the state has in the
+    hourly table, which would mean scanning all of it. Records can't have
+    been loaded for plants without an offset.
+
+    Each DELETE is limited to a year's worth of time, which can use the
+    operating_datetime_utc index, or if the table is partitioned, only
+    touches the state's partitions for the UTC years that overlap it.
+
+    Args:
+        engine (sqlalchemy.engine.Engine): The PUDL database engine.
+        year (int): The year of the data to delete.
+        state (str): The two letter state abbreviation.
+        plant_utc_offset (pandas.DataFrame): plant_id_eia and utc_offset
+            (a timedelta) columns, as used in the transform step.
+
+    Returns:
+        int: The number of rows that were deleted.
+    """
+    table = HourlyEmissions.__table__
+    start = datetime.datetime(year, 1, 1, tzinfo=datetime.timezone.utc)
+    end = datetime.datetime(year + 1, 1, 1, tzinfo=datetime.timezone.utc)
+    deleted = 0
+    with engine.begin() as conn:
+        for utc_offset, group in plant_utc_offset.groupby("utc_offset"):
+            # Same convention as pudl.transform.epacems.fix_up_dates()
+            result = conn.execute(table.delete().where(sa.and_(
+                table.c.state == state,
+                table.c.plant_id_eia.in_(
+                    [int(x) for x in group["plant_id_eia"]]),
+                table.c.operating_datetime_utc >= start + utc_offset,
+                table.c.operating_datetime_utc < end + utc_offset,
+            )))
+            deleted += result.rowcount
+    return deleted
+
+
+def _partition_indexes(partition, brin=False):
+    """The finalize() indexes, for one partition of the table."""
+    table = sa.Table(partition, sa.MetaData(),
+                     *[col.copy() for col in HourlyEmissions.__table__.columns
+                       if col.name in ("plant_id_eia", "unitid",
+                                       "operating_datetime_utc")])
+    indexes = [
+        sa.Index(f"ix_{partition}_operating_datetime_utc",
+                 table.c.operating_datetime_utc),
+        sa.Index(f"ix_{partition}_plant_id_eia", table.c.plant_id_eia),
+        sa.Index(f"ix_{partition}_plant_unit_datetime",
+                 table.c.plant_id_eia,
+                 table.c.unitid,
+                 table.c.operating_datetime_utc,
+                 unique=True),
+    ]
+    if brin:
+        indexes.append(
+            sa.Index(f"brin_{partition}_operating_datetime_utc",
+                     table.c.operating_datetime_utc,
+                     postgresql_using="brin"))
+    return indexes
+
+
+def finalize(engine, workers=1, brin=False, maintenance_work_mem=None,
+             parallel_workers=None, verbose=False):
     """Finalize the EPA CEMS table
 
     args: engine (sqlalchemy engine)
+          workers (int): how many indexes to build at once, each on its own
+              database connection.
+          brin (bool): also add a BRIN index on operating_datetime_utc. It's
+              tiny, and good for scanning time ranges, because the data is
+              loaded in roughly chronological order within each state-year.
+          maintenance_work_mem (str): PostgreSQL maintenance_work_mem for each
+              index build, e.g. '2GB'.
+          parallel_workers (int): max_parallel_maintenance_workers for each
+              index build.
+          verbose (bool): print how long each index took to build.
+    returns: dict of {index name: seconds} for the indexes built.
 
     This function does a few things after all the data have been written because
     it's faster to do these after the fact.
@@ -125,30 +465,152 @@ def finalize(engine):
        the date part of operating_datetime_utc,
     2. Add a unique index for the combination of operating_datetime_utc,
        plant_id_eia, and unitid.
+
+    The indexes don't depend on each other, so they're built concurrently (see
+    pudl.load.build_indexes). If the table is partitioned, the indexes are
+    created separately on each partition rather than on the table as a whole,
+    so that there are many more of them to share out, and they can be rebuilt
+    one state-year at a time.
+
+    Indexes which already exist are skipped, so this can be re-run after
+    loading more data incrementally.
     """
+    if is_partitioned(engine):
+        indexes = [index for partition in partitions(engine)
+                   for index in _partition_indexes(partition, brin=brin)]
+    else:
+        # List of indexes and constraints we need to create later, after
+        # loading. See https://stackoverflow.com/a/41254430
+        # index names follow SQLAlchemy's convention ix_tablename_columnname,
+        # but this doesn't matter
+        indexes = [
+            sa.Index("ix_hourly_emissions_epacems_operating_datetime_utc",
+                     HourlyEmissions.operating_datetime_utc),
+            sa.Index("ix_hourly_emissions_epacems_plant_id_eia",
+                     HourlyEmissions.plant_id_eia),
+            # The name that follows the pattern would be
+            # ix_hourly_emissions_epacems_plant_id_eia_unitid_operating_datetime_utc
+            # But that's too long.
+            sa.Index("ix_plant_id_eia_unitid_operating_datetime_utc",
+                     HourlyEmissions.plant_id_eia,
+                     HourlyEmissions.unitid,
+                     HourlyEmissions.operating_datetime_utc,
+                     unique=True),
+        ]
+        if brin:
+            indexes.append(sa.Index(
+                "brin_hourly_emissions_epacems_operating_datetime_utc",
+                HourlyEmissions.operating_datetime_utc,
+                postgresql_using="brin"))
+    return pudl.load.build_indexes(
+        engine, indexes, workers=workers,
+        maintenance_work_mem=maintenance_work_mem,
+        parallel_workers=parallel_workers, verbose=verbose)
 
-    # List of indexes and constraints we need to create later, after loading
-    # See https://stackoverflow.com/a/41254430
-    # index names follow SQLAlchemy's convention ix_tablename_columnname, but
-    # this doesn't matter
-    indexes_to_create = [
-        sa.Index("ix_hourly_emissions_epacems_operating_datetime_utc",
-                 HourlyEmissions.operating_datetime_utc),
-        sa.Index("ix_hourly_emissions_epacems_plant_id_eia",
-                 HourlyEmissions.plant_id_eia),
-        # The name that follows the pattern would be
-        # ix_hourly_emissions_epacems_plant_id_eia_unitid_operating_datetime_utc
-        # But that's too long.
-        sa.Index("ix_plant_id_eia_unitid_operating_datetime_utc",
-                 HourlyEmissions.plant_id_eia,
-                 HourlyEmissions.unitid,
-                 HourlyEmissions.operating_datetime_utc,
-                 unique=True),
-    ]
-    for index in indexes_to_create:
-        try:
-            index.create(engine)
-        except sa.exc.ProgrammingError as e:
-            from warnings import warn
-            warn(f"Failed to add index/constraint '{index.name}'\n" +
-                 "Details:\n" + str(e))
+
+def _rollup_select(period, level, source):
+    """SQL aggregating the hourly data, or a finer rollup, into a rollup."""
+    trunc, _ = ROLLUP_PERIODS[period]
+    keys = ", ".join(ROLLUP_LEVELS[level])
+    report_date = f"date_trunc('{trunc}', {{date}})::date"
+    if source == HourlyEmissions.__tablename__:
+        report_date = report_date.format(
+            date="operating_datetime_utc AT TIME ZONE 'UTC'")
+        date_col = "operating_datetime_utc"
+        sums = [
+            "count(*)",
+            "sum(operating_time_hours::float8)",
+            "sum(gross_load_mw::float8 * operating_time_hours)",
+            "sum(heat_content_mmbtu::float8)",
+        ]
+        sums += [f"sum({emission}::float8)" for emission in ROLLUP_EMISSIONS]
+        sums += [
+            f"avg(CASE WHEN {code}::text LIKE '%Substitute%' "
+            "THEN 1.0 ELSE 0.0 END)"
+            for code in ROLLUP_EMISSIONS.values()
+        ]
+    else:
+        report_date = report_date.format(date="report_date")
+        date_col = "report_date"
+        sums = [
+            "sum(hours_reported)",
+            "sum(operating_time_hours)",
+            "sum(gross_load_mwh)",
+            "sum(heat_content_mmbtu)",
+        ]
+        sums += [f"sum({emission})" for emission in ROLLUP_EMISSIONS]
+        # Weight the finer grained fractions by their number of hours.
+        sums += [
+            f"sum({emission.split('_')[0]}_substitute_fraction * "
+            "hours_reported) / sum(hours_reported)"
+            for emission in ROLLUP_EMISSIONS
+        ]
+    table = ROLLUP_TABLES[(period, level)]
+    return f"""
+        INSERT INTO {table.name} ({", ".join(table.columns.keys())})
+        SELECT state, {keys}, {report_date} AS rollup_date, {", ".join(sums)}
+        FROM {source}
+        WHERE state = :state AND {date_col} >= :start AND {date_col} < :end
+        GROUP BY state, {keys}, rollup_date
+        """
+
+
+def _rollup_sources():
+    """The order to build the rollups in, and what each one is built from.
+
+    Only the daily unit rollup reads the hourly data. Everything else is
+    summed up from a finer grained rollup.
+    """
+    sources = []
+    finer = HourlyEmissions.__tablename__
+    for period in ROLLUP_PERIODS:
+        sources.append((period, "unit", finer))
+        finer = rollup_table_name(period, "unit")
+    for period in ROLLUP_PERIODS:
+        sources.append(
+            (period, "plant", rollup_table_name(period, "unit")))
+    return sources
+
+
+def refresh_rollups(engine, state_years, verbose=False):
+    """
+    Rebuild the parts of the rollup tables affected by some CEMS state-years.
+
+    A state-year of data is reported in local time, so in UTC it extends a few
+    hours into the neighboring years. Every rollup period which overlaps with
+    that time span is deleted and summed up again, for the state in question.
+
+    Args:
+        engine (sqlalchemy.engine.Engine): The PUDL database engine.
+        state_years (iterable): (year, state) tuples which have been
+            (re)loaded.
+        verbose (bool): If True, print progress messages.
+    """
+    years_by_state = {}
+    for year, state in state_years:
+        years_by_state.setdefault(state, set()).add(year)
+    for state, years in sorted(years_by_state.items()):
+        # Local time is never more than a day away from UTC.
+        first = pd.Timestamp(f"{min(years)}-01-01") - pd.Timedelta(days=1)
+        last = pd.Timestamp(f"{max(years) + 1}-01-01") + pd.Timedelta(days=1)
+        if verbose:
+            print(f"    Refreshing EPA CEMS rollups for {state} "
+                  f"{min(years)}-{max(years)}")
+        for period, level, source in _rollup_sources():
+            _, freq = ROLLUP_PERIODS[period]
+            start = first.to_period(freq).start_time
+            end = (last.to_period(freq) + 1).start_time
+            if source == HourlyEmissions.__tablename__:
+                bounds = {"start": start.tz_localize("UTC").to_pydatetime(),
+                          "end": end.tz_localize("UTC").to_pydatetime()}
+            else:
+                bounds = {"start": start.date(), "end": end.date()}
+            table = ROLLUP_TABLES[(period, level)]
+            with engine.begin() as conn:
+                conn.execute(table.delete().where(sa.and_(
+                    table.c.state == state,
+                    table.c.report_date >= start.date(),
+                    table.c.report_date < end.date())))
+                conn.execute(
+                    sa.text(_rollup_select(period, level, source)),
+                    state=state, **bounds)
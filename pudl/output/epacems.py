@@ -0,0 +1,220 @@
+"""Functions for pulling EPA CEMS data out of Apache Parquet or the PUDL DB.
+
+The hourly EPA CEMS data is much too big to pull out of the PUDL DB casually.
+scripts/epacems_to_parquet.py converts it to a Parquet dataset, partitioned by
+year and state, and sorted by plant, unit and time within each file (see
+pudl.output.export.epacems_to_parquet). The functions here read that dataset
+with pyarrow, passing the requested filters down to the dataset scan: whole
+partitions are skipped based on their year and state, and row groups within
+each file are skipped based on their plant ID and time min/max statistics.
+
+Daily, monthly and annual totals of the data, by unit and by plant, are also
+kept in the PUDL DB (see pudl.models.epacems.refresh_rollups), and can be
+pulled out with epacems_rollup().
+"""
+
+import os
+import datetime
+import sqlalchemy as sa
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pudl
+import pudl.constants as pc
+import pudl.models.epacems
+from pudl.settings import SETTINGS
+
+
+def epacems_dataset(epacems_dir=None):
+    """
+    Open the EPA CEMS Parquet dataset.
+
+    Args:
+        epacems_dir (str): The top level directory of the dataset. Defaults to
+            the output directory of scripts/epacems_to_parquet.py.
+    Returns:
+        pyarrow.dataset.Dataset
+    """
+    if epacems_dir is None:
+        epacems_dir = os.path.join(SETTINGS['pudl_dir'], 'results',
+                                   'parquet', 'epacems')
+    return ds.dataset(epacems_dir, format='parquet', partitioning='hive')
+
+
+def _timestamp(date):
+    """Convert a date-like object into a pyarrow UTC timestamp scalar."""
+    date = pd.Timestamp(date)
+    if date.tz is None:
+        date = date.tz_localize('UTC')
+    return pa.scalar(date.tz_convert('UTC').value,
+                     type=pa.timestamp('ns', tz='UTC'))
+
+
+def epacems_filter(dataset, plant_ids=None, unit_ids=None, states=None,
+                   start_date=None, end_date=None):
+    """
+    Build a pyarrow dataset filter expression selecting some EPA CEMS data.
+
+    All of the arguments are optional. Any that are None don't restrict the
+    data that's selected.
+
+    Args:
+        dataset (pyarrow.dataset.Dataset): The EPA CEMS dataset. Its schema
+            says which columns are used for partitioning.
+        plant_ids (iterable): EIA plant IDs (ORISPL codes) to select.
+        unit_ids (iterable): EPA unitid values to select.
+        states (iterable): Two letter state abbreviations to select.
+        start_date & end_date: date-like objects, including strings of the
+            form 'YYYY-MM-DD'. Dates are inclusive. Timezone naive dates are
+            in UTC.
+    Returns:
+        pyarrow.dataset.Expression, or None if there are no restrictions.
+    """
+    conditions = []
+    if plant_ids is not None:
+        conditions.append(
+            ds.field('plant_id_eia').isin([int(x) for x in plant_ids]))
+    if unit_ids is not None:
+        conditions.append(
+            ds.field('unitid').isin([str(x) for x in unit_ids]))
+    if states is not None:
+        conditions.append(
+            ds.field('state').isin([str(x).upper() for x in states]))
+    if start_date is not None:
+        start = pd.Timestamp(start_date)
+        conditions.append(ds.field('operating_datetime_utc') >=
+                          _timestamp(start))
+    if end_date is not None:
+        # An end date without a time means the whole day.
+        end = pd.Timestamp(end_date)
+        if end == end.normalize():
+            end = end + datetime.timedelta(days=1)
+            conditions.append(ds.field('operating_datetime_utc') <
+                              _timestamp(end))
+        else:
+            conditions.append(ds.field('operating_datetime_utc') <=
+                              _timestamp(end))
+    # The year partitions hold a year of data in local time, which includes a
+    # few hours of the neighboring UTC years. Pruning by year can only rule
+    # out the partitions that are more than a year away from the date range.
+    if 'year' in dataset.schema.names:
+        if start_date is not None:
+            conditions.append(ds.field('year') >= start.year - 1)
+        if end_date is not None:
+            conditions.append(ds.field('year') <= end.year + 1)
+    if not conditions:
+        return None
+    expression = conditions[0]
+    for condition in conditions[1:]:
+        expression = expression & condition
+    return expression
+
+
+def _compact_df(df):
+    """Give the EPA CEMS partition columns compact data types."""
+    if 'state' in df.columns:
+        df['state'] = df['state'].astype(str).astype(pc.epacems_state_dtype)
+    if 'year' in df.columns:
+        df['year'] = df['year'].astype('uint16')
+    return df
+
+
+def hourly_emissions_epacems(plant_ids=None, unit_ids=None, states=None,
+                             start_date=None, end_date=None, columns=None,
+                             epacems_dir=None, batches=False):
+    """
+    Pull hourly EPA CEMS records out of the Parquet dataset.
+
+    Args:
+        plant_ids (iterable): EIA plant IDs (ORISPL codes) to select.
+        unit_ids (iterable): EPA unitid values to select.
+        states (iterable): Two letter state abbreviations to select.
+        start_date & end_date: date-like objects, including strings of the
+            form 'YYYY-MM-DD' which will be used to specify the range of
+            operating_datetime_utc to select. Dates are inclusive.
+        columns (list): The columns to read. Default is all of them.
+        epacems_dir (str): The top level directory of the dataset. Defaults
+            to the output directory of scripts/epacems_to_parquet.py.
+        batches (bool): If True, return a generator of DataFrames, one per
+            record batch, rather than one big DataFrame.
+
+    Returns:
+        pandas.DataFrame, or a generator of them if batches is True. The
+        columns have the same compact data types used in the ETL (see
+        pudl.constants.epacems_dtypes).
+    """
+    dataset = epacems_dataset(epacems_dir)
+    expression = epacems_filter(dataset, plant_ids=plant_ids,
+                                unit_ids=unit_ids, states=states,
+                                start_date=start_date, end_date=end_date)
+    if batches:
+        return (
+            _compact_df(batch.to_pandas())
+            for batch in dataset.to_batches(columns=columns, filter=expression)
+            if batch.num_rows
+        )
+    table = dataset.to_table(columns=columns, filter=expression)
+    return _compact_df(table.to_pandas())
+
+
+# The pandas frequencies which have a matching rollup table.
+ROLLUP_FREQS = {
+    'D': 'daily',
+    'MS': 'monthly',
+    'AS': 'annual',
+    'YS': 'annual',
+}
+
+
+def epacems_rollup(freq, level='unit', testing=False, start_date=None,
+                   end_date=None, plant_ids=None, unit_ids=None, states=None):
+    """
+    Pull daily, monthly or annual EPA CEMS totals from the PUDL DB.
+
+    Besides the summed up emissions, heat input and gross load, each record
+    says how many hourly records went into it (hours_reported), and what
+    fraction of those hours had substitute rather than measured data for each
+    pollutant.
+
+    Args:
+        freq (str): a pandas timeseries offset alias: 'D' (daily), 'MS'
+            (monthly) or 'AS' (annual). The periods are in UTC.
+        level (str): Whether to pull totals by 'unit' or by 'plant'.
+        testing (bool): True if we are connecting to the pudl_test DB, False
+            if we're using the live DB.  False by default.
+        start_date & end_date: date-like objects, including strings of the
+            form 'YYYY-MM-DD' which will be used to specify the date range of
+            records to be pulled.  Dates are inclusive.
+        plant_ids (iterable): EIA plant IDs (ORISPL codes) to select.
+        unit_ids (iterable): EPA unitid values to select (unit level only).
+        states (iterable): Two letter state abbreviations to select.
+
+    Returns:
+        pandas.DataFrame
+    """
+    if freq not in ROLLUP_FREQS:
+        raise ValueError(
+            f"No EPA CEMS rollups for freq={freq}. "
+            f"Use one of {list(ROLLUP_FREQS)}.")
+    if level not in pudl.models.epacems.ROLLUP_LEVELS:
+        raise ValueError(f"No EPA CEMS rollups by {level}.")
+    pudl_engine = pudl.init.connect_db(testing=testing)
+    tbl = pudl.models.epacems.ROLLUP_TABLES[(ROLLUP_FREQS[freq], level)]
+    select = sa.sql.select([tbl, ])
+    if start_date is not None:
+        select = select.where(tbl.c.report_date >= start_date)
+    if end_date is not None:
+        select = select.where(tbl.c.report_date <= end_date)
+    if plant_ids is not None:
+        select = select.where(
+            tbl.c.plant_id_eia.in_([int(x) for x in plant_ids]))
+    if unit_ids is not None:
+        if level != 'unit':
+            raise ValueError("Can't select unit_ids in plant level rollups.")
+        select = select.where(tbl.c.unitid.in_([str(x) for x in unit_ids]))
+    if states is not None:
+        select = select.where(
+            tbl.c.state.in_([str(x).upper() for x in states]))
+    df = pd.read_sql(select, pudl_engine, parse_dates=['report_date'])
+    df['state'] = df['state'].astype(pc.epacems_state_dtype)
+    return df
@@ -2,6 +2,12 @@
 
 Function names should be indicative of the format of the thing that's being
 exported (e.g. CSV, Excel spreadsheets, parquet files, HDF5).
+
+Note that the year partitions of the EPA CEMS Parquet dataset hold the data
+for the year it was reported for, in local time, so each one includes a few
+hours of the following year in UTC. Datasets written by earlier versions of
+scripts/epacems_to_parquet.py were partitioned by the UTC year of
+operating_datetime_utc instead, and shouldn't be mixed with new ones.
 """
 
 import os
@@ -9,12 +15,16 @@ import re
 import hashlib
 import datetime
 import logging
+import concurrent.futures
 import sqlalchemy as sa
 import tableschema
 import datapackage
 import goodtables
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import pudl
+import pudl.constants as pc
 
 logger = logging.getLogger(__name__)
 
@@ -427,3 +437,188 @@ def annotated_xlsx(df, notes_dict, tags_dict, first_cols, sheet_name,
     # Return the xlsx_writer object, which can be written out, outside of
     # function, with 'xlsx_writer.save()'
     return xlsx_writer
+
+
+###############################################################################
+# EPA CEMS Apache Parquet output
+###############################################################################
+# The transformed EPA CEMS data already uses compact data types (see
+# pudl.constants.epacems_dtypes). We just need to add a year column for
+# partitioning the dataset.
+EPACEMS_PARQUET_DTYPES = {
+    'year': 'uint16',
+    **pc.epacems_dtypes,
+}
+# Within each file, the records are sorted by these columns, so that the
+# row group statistics can be used to skip data for other plants and times.
+EPACEMS_PARQUET_SORT = ['plant_id_eia', 'unitid', 'operating_datetime_utc']
+
+
+def epacems_parquet_schema(partition_cols=('year', 'state')):
+    """
+    The pyarrow schema of the EPA CEMS Parquet files.
+
+    Args:
+        partition_cols (iterable): The columns used to partition the dataset.
+            These are encoded in the directory names, and left out of the
+            files themselves.
+    Returns:
+        pyarrow.Schema
+    """
+    dtypes = {col: dtype for col, dtype in EPACEMS_PARQUET_DTYPES.items()
+              if col not in partition_cols}
+    template = pd.DataFrame(columns=dtypes.keys()).astype(dtypes)
+    schema = pa.Schema.from_pandas(template, preserve_index=False)
+    # An empty categorical column doesn't tell pyarrow the type of its
+    # categories, but they are all strings.
+    fields = [
+        pa.field(field.name, pa.dictionary(pa.int32(), pa.string()))
+        if pa.types.is_dictionary(field.type) else field
+        for field in schema
+    ]
+    return pa.schema(fields, metadata=schema.metadata)
+
+
+def epacems_parquet_path(outdir, year, state,
+                         partition_cols=('year', 'state')):
+    """
+    The path of the Parquet file for one state-year of EPA CEMS data.
+
+    The directories follow the Hive partitioning convention (e.g.
+    year=2017/state=CO/) and there's always exactly one file per state-year,
+    so that re-running the conversion overwrites the previous output. The
+    year is the reporting year, not the UTC year (see the module docstring).
+    """
+    values = {'year': year, 'state': state}
+    partition_dirs = [f"{col}={values[col]}" for col in partition_cols]
+    return os.path.join(outdir, *partition_dirs,
+                        f"epacems-{year}-{state}.parquet")
+
+
+def epacems_state_year_to_parquet(df, year, state, outdir,
+                                  partition_cols=('year', 'state'),
+                                  compression='snappy',
+                                  row_group_size=100000):
+    """
+    Write one state-year of transformed EPA CEMS data to a Parquet file.
+
+    The records are sorted by plant, unit and time, and broken up into row
+    groups of row_group_size records each, with min/max statistics for each
+    column, so readers can skip the row groups that can't match a filter on
+    plant or time. Categorical columns are dictionary encoded.
+
+    Args:
+        df (pandas.DataFrame): The transformed EPA CEMS data.
+        year (int): The year of the data. Note that this is the year the data
+            was reported for, in local time. The first few hours of the year
+            are in the previous year in UTC.
+        state (str): The two letter state abbreviation of the data.
+        outdir (str): The top level directory of the Parquet dataset.
+        partition_cols (iterable): The columns to partition the dataset on,
+            'year' and/or 'state'.
+        compression (str): The Parquet compression codec.
+        row_group_size (int): The maximum number of records per row group.
+    Returns:
+        str: The path to the file that was written.
+    """
+    path = epacems_parquet_path(outdir, year, state, partition_cols)
+    schema = epacems_parquet_schema(partition_cols)
+    df = (
+        df.assign(year=year)
+        .astype({'year': EPACEMS_PARQUET_DTYPES['year']})
+        .sort_values(EPACEMS_PARQUET_SORT)
+        .reset_index(drop=True)
+    )
+    table = pa.Table.from_pandas(df[schema.names], schema=schema,
+                                 preserve_index=False)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write to a temporary file and then move it into place, so nobody ever
+    # sees a partially written file.
+    tmp_path = path + '.tmp'
+    pq.write_table(table, tmp_path, row_group_size=row_group_size,
+                   compression=compression, use_dictionary=True,
+                   write_statistics=True)
+    os.replace(tmp_path, path)
+    return path
+
+
+def _epacems_state_year_to_parquet(year, state, plant_utc_offset,
+                                   csv_engine='pandas', **kwargs):
+    """Extract, transform and write out one state-year, in a worker process.
+    """
+    raw_dfs = pudl.extract.epacems.extract(
+        epacems_years=[year], states=[state], verbose=False,
+        csv_engine=csv_engine)
+    transformed_dfs = pudl.transform.epacems.transform(
+        pudl_engine=None, epacems_raw_dfs=raw_dfs, verbose=False,
+        plant_utc_offset=plant_utc_offset)
+    for df_dict in transformed_dfs:
+        df = df_dict[(year, state)]
+    if df.empty:
+        return None, 0
+    path = epacems_state_year_to_parquet(df, year, state, **kwargs)
+    return path, len(df)
+
+
+def epacems_to_parquet(epacems_years, states, outdir, pudl_engine=None,
+                       plant_utc_offset=None, workers=1, csv_engine='pandas',
+                       partition_cols=('year', 'state'), compression='snappy',
+                       row_group_size=100000, verbose=True):
+    """
+    Convert EPA CEMS data to a partitioned Apache Parquet dataset.
+
+    Each state-year is extracted, transformed and written out to its own file
+    independently, so they're spread across a pool of worker processes. The
+    only thing that needs the PUDL database is the plants' UTC offsets, which
+    are looked up once, up front.
+
+    Args:
+        epacems_years (iterable): The years of EPA CEMS data to convert.
+        states (iterable): The states of EPA CEMS data to convert.
+        outdir (str): The top level directory of the Parquet dataset.
+        pudl_engine (sqlalchemy.engine.Engine): The PUDL database, used to
+            look up the plants' timezones, unless plant_utc_offset is given.
+        plant_utc_offset (pandas.DataFrame): plant_id_eia and utc_offset
+            columns, as from pudl.transform.epacems._load_plant_utc_offset().
+        workers (int): The number of worker processes to use.
+        csv_engine (str): The CSV reader to use, 'pandas' or 'pyarrow'.
+        partition_cols (iterable): The columns to partition the dataset on,
+            'year' and/or 'state'.
+        compression (str): The Parquet compression codec.
+        row_group_size (int): The maximum number of records per row group.
+        verbose (bool): If True, print progress messages.
+    Returns:
+        list: The paths of the files that were written.
+    """
+    if not outdir:
+        raise AssertionError("Required output directory not specified.")
+    for col in partition_cols:
+        if col not in ('year', 'state'):
+            raise ValueError(f"Can't partition EPA CEMS data on {col}.")
+    if plant_utc_offset is None:
+        plant_utc_offset = pudl.transform.epacems._load_plant_utc_offset(
+            pudl_engine)
+    lookup = pudl.transform.epacems._plant_utc_offset_lookup(plant_utc_offset)
+    kwargs = {
+        'outdir': outdir,
+        'csv_engine': csv_engine,
+        'partition_cols': tuple(partition_cols),
+        'compression': compression,
+        'row_group_size': row_group_size,
+    }
+    paths = []
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(_epacems_state_year_to_parquet,
+                        year, state, lookup, **kwargs): (year, state)
+            for year in epacems_years for state in states
+        }
+        for future in concurrent.futures.as_completed(futures):
+            path, nrows = future.result()
+            if verbose:
+                year, state = futures[future]
+                print(f'            {(year, state)}: {nrows} records',
+                      flush=True)
+            if path is not None:
+                paths.append(path)
+    return sorted(paths)
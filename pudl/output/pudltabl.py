@@ -234,6 +234,65 @@ class PudlTabl(object):
                 testing=self.testing)
         return self._dfs['fbp_ferc1']
 
+    def epacems(self, plant_ids=None, unit_ids=None, states=None,
+                columns=None, epacems_dir=None, batches=False, level=None):
+        """Pull EPA CEMS data, hourly or summed up over this object's freq.
+
+        If freq is None, the hourly data is read from the Apache Parquet
+        dataset (see pudl.output.epacems.hourly_emissions_epacems). If freq
+        is 'D', 'MS' or 'AS', the daily, monthly or annual totals by unit or
+        by plant (depending on level) are read from the rollup tables in the
+        PUDL DB (see pudl.output.epacems.epacems_rollup).
+
+        The records are limited to this object's date range. Because the
+        selection depends on the arguments, the results are not cached.
+
+        Args:
+            plant_ids, unit_ids, states, columns: Which records and columns
+                to select. Used for both the hourly data and the totals.
+            epacems_dir (str): Where to find the Parquet dataset. Only used
+                for the hourly data.
+            batches (bool): Return a generator of DataFrames rather than a
+                single DataFrame. Only used for the hourly data.
+            level (str): 'unit' (the default) or 'plant' totals. Only used
+                for the totals.
+
+        Raises:
+            ValueError: If an argument is given which doesn't apply to the
+                hourly data or the totals, whichever this object's freq
+                selects.
+        """
+        if self.freq is not None:
+            if epacems_dir is not None or batches:
+                raise ValueError(
+                    "epacems_dir and batches only apply to the hourly EPA "
+                    f"CEMS data, not to the {self.freq} totals.")
+            df = pudl.output.epacems.epacems_rollup(
+                self.freq,
+                level=level if level is not None else 'unit',
+                testing=self.testing,
+                start_date=self.start_date,
+                end_date=self.end_date,
+                plant_ids=plant_ids,
+                unit_ids=unit_ids,
+                states=states)
+            if columns is not None:
+                df = df[columns]
+            return df
+        if level is not None:
+            raise ValueError(
+                "level only applies to the EPA CEMS totals. Set freq to get "
+                "daily, monthly or annual totals rather than hourly data.")
+        return pudl.output.epacems.hourly_emissions_epacems(
+            plant_ids=plant_ids,
+            unit_ids=unit_ids,
+            states=states,
+            start_date=self.start_date,
+            end_date=self.end_date,
+            columns=columns,
+            epacems_dir=epacems_dir,
+            batches=batches)
+
     def bga(self, update=False):
         """Pull the more complete EIA/PUDL boiler-generator associations."""
         if update or self._dfs['bga'] is None:
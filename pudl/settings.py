@@ -40,6 +40,10 @@ SETTINGS['epacems_data_dir'] = os.path.join(
 SETTINGS['test_dir'] = os.path.join(SETTINGS['pudl_dir'], 'test')
 SETTINGS['docs_dir'] = os.path.join(SETTINGS['pudl_dir'], 'docs')
 SETTINGS['csvdir'] = os.path.join(SETTINGS['pudl_dir'], 'results', 'csvdump')
+SETTINGS['timezone_cache'] = os.path.join(
+    SETTINGS['pudl_dir'], 'results', 'timezone_cache.csv')
+SETTINGS['ferc1_schema_cache'] = os.path.join(
+    SETTINGS['pudl_dir'], 'results', 'ferc1_schema_cache')
 
 
 # These DB connection dictionaries are used by sqlalchemy.URL()
@@ -74,3 +78,16 @@ SETTINGS['db_pudl_test'] = {
     'username': 'catalyst',
     'database': 'pudl_test'
 }
+
+# The FERC Form 1 DB can also be kept in a local SQLite file, which doesn't
+# need a database server (see the ferc1_backend setting).
+SETTINGS['db_ferc1_sqlite'] = {
+    'drivername': 'sqlite',
+    'database': os.path.join(SETTINGS['pudl_dir'], 'results', 'ferc1.sqlite')
+}
+
+SETTINGS['db_ferc1_test_sqlite'] = {
+    'drivername': 'sqlite',
+    'database': os.path.join(SETTINGS['pudl_dir'], 'results',
+                             'ferc1_test.sqlite')
+}
@@ -79,11 +79,9 @@ def _add_timezone(plants_entity):
     Returns the same table, with a "timezone" column added. Timezone may be
     missing if lat/lon is missing or invalid.
     """
-    plants_entity["timezone"] = plants_entity.apply(
-        lambda row: pudl.helpers.find_timezone(
-            lng=row["longitude"], lat=row["latitude"], state=row["state"], strict=False
-        ),
-        axis=1,
+    plants_entity["timezone"] = pudl.helpers.find_timezones(
+        lng=plants_entity["longitude"], lat=plants_entity["latitude"],
+        state=plants_entity["state"], strict=False
     )
     return plants_entity
 
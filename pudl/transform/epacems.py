@@ -6,6 +6,8 @@ import sqlalchemy as sa
 import pudl
 import pudl.constants as pc
 
+NS_PER_HOUR = 3600 * 10**9
+
 ###############################################################################
 ###############################################################################
 # DATATABLE TRANSFORM FUNCTIONS
@@ -17,38 +19,60 @@ def fix_up_dates(df, plant_utc_offset):
     """Fix the dates for the CEMS data
     Args:
         df(pandas.DataFrame): A CEMS hourly dataframe for one year-month-state
-        plant_utc_offset(pandas.DataFrame): A dataframe of plants' timezones
+        plant_utc_offset(numpy.ndarray): A timedelta64[ns] array of the plants'
+            UTC offsets, indexed by plant_id_eia, as returned by
+            _plant_utc_offset_lookup(). Missing offsets are NaT.
     Output:
         pandas.DataFrame: The same data, with an op_datetime_utc column added
         and the op_date and op_hour columns removed
+
+    This is the hottest part of the CEMS transform, so it avoids merging the
+    offsets onto the (huge) hourly dataframe, and avoids creating intermediate
+    datetime columns. Everything is done with integer nanoseconds:
+      - each distinct op_date string is parsed only once,
+      - the UTC offsets are looked up by using plant_id_eia as an index,
+      - the hours and offsets are added in place to a single array.
     """
-    # Convert op_date and op_hour from string and integer to datetime:
-    # Note that doing this conversion, rather than reading the CSV with
-    # `parse_dates=True`, is >10x faster.
-    df["op_datetime_naive"] = (
-        # Read the date as a datetime, so all the dates are midnight
-        # Mark as UTC (it's not true yet, but it will be once we add
-        # utc_offsets, and it's easier to do here)
-        pd.to_datetime(
-            df["op_date"], format=r"%m-%d-%Y", exact=True, cache=True, utc=True
-        )
-        +
-        # Add the hour
-        pd.to_timedelta(df["op_hour"], unit="h", box=False)
-    )
-    df = df.merge(plant_utc_offset, how="left", on="plant_id_eia")
+    plant_ids = df["plant_id_eia"].values
     # Some of the timezones in the plants_entity_eia table may be missing,
     # but none of the CEMS plants should be.
-    if not df["utc_offset"].notna().all():
-        missing_plants = df.loc[df["utc_offset"].isna(), "plant_id_eia"].unique()
+    if not len(plant_ids) or plant_ids.max() < len(plant_utc_offset):
+        offsets = plant_utc_offset[plant_ids]
+        known = ~np.isnat(offsets)
+    else:
+        # Plant IDs beyond the end of the lookup array have no offset.
+        known = plant_ids < len(plant_utc_offset)
+        known[known] = ~np.isnat(plant_utc_offset[plant_ids[known]])
+    if not known.all():
+        missing_plants = np.unique(plant_ids[~known])
         raise ValueError(
             "utc_offset should never be missing for CEMS plants, but was missing " +
             "for these: " + str(list(missing_plants))
             )
+    # Convert op_date from string to datetime, one unique date at a time.
+    # Note that doing this conversion, rather than reading the CSV with
+    # `parse_dates=True`, is >10x faster.
+    if pd.api.types.is_categorical_dtype(df["op_date"]):
+        date_codes = df["op_date"].cat.codes.values
+        unique_dates = df["op_date"].cat.categories
+    else:
+        date_codes, unique_dates = pd.factorize(df["op_date"])
+    if (date_codes < 0).any():
+        raise ValueError("Found missing op_date values in EPA CEMS data.")
+    unique_dates = pd.to_datetime(
+        unique_dates, format=r"%m-%d-%Y", exact=True
+    ).values.view(np.int64)
+    # Read the date as a datetime, so all the dates are midnight. Then mark
+    # as UTC (it's not true yet, but it will be once we add utc_offsets)
+    utc_ns = unique_dates[date_codes]
+    # Add the hour
+    utc_ns += df["op_hour"].values.astype(np.int64) * NS_PER_HOUR
     # Add the offset from UTC. CEMS data don't have DST, so the offset is
     # always the same for a given plant.
-    df["operating_datetime_utc"] = df["op_datetime_naive"] + df["utc_offset"]
-    del df["op_date"], df["op_hour"], df["op_datetime_naive"], df["utc_offset"]
+    utc_ns += offsets.view(np.int64)
+    df["operating_datetime_utc"] = pd.DatetimeIndex(
+        utc_ns.view("datetime64[ns]"), tz="UTC")
+    del df["op_date"], df["op_hour"]
     return df
 
 
@@ -60,24 +84,35 @@ def _load_plant_utc_offset(pudl_engine):
     CEMS times don't change for DST, so we get get the UTC offset by using the
     offset for the plants' timezones in January.
     """
-    import pytz
-
+    plants = pudl.models.entities.PUDLBase.metadata.tables["plants_entity_eia"]
     plants_eia_entity_select = sa.sql.select(
-        [pudl.models.entities.PUDLBase.metadata.tables["plants_entity_eia"]]
-    )
-    # TODO: that this reads all the columns. It would be better to select a subset.
-    timezones = pd.read_sql(plants_eia_entity_select, pudl_engine)[
-        ["plant_id_eia", "timezone"]
-    ].dropna()
+        [plants.c.plant_id_eia, plants.c.timezone]
+    ).where(plants.c.timezone.isnot(None))
     # Some plants lack the info to get a timezone. None of these plants are in CEMS.
-    jan1 = pd.datetime(2011, 1, 1)  # year doesn't matter
-    timezones["utc_offset"] = timezones["timezone"].apply(
-        lambda tz: pytz.timezone(tz).localize(jan1).utcoffset()
-    )
+    timezones = pd.read_sql(plants_eia_entity_select, pudl_engine)
+    timezones["utc_offset"] = pudl.helpers.utc_offsets(timezones["timezone"])
     del timezones["timezone"]
     return timezones
 
 
+def _plant_utc_offset_lookup(plant_utc_offset):
+    """Turn a dataframe of plant UTC offsets into an array indexed by plant ID
+
+    Args:
+        plant_utc_offset (pandas.DataFrame): A dataframe with columns
+            plant_id_eia and utc_offset, as returned by _load_plant_utc_offset
+    Returns:
+        numpy.ndarray: A timedelta64[ns] array, in which the element at index
+        plant_id_eia is the UTC offset for that plant. Plants with no known
+        offset are NaT.
+    """
+    plant_ids = plant_utc_offset["plant_id_eia"].values.astype(np.int64)
+    lookup = np.full(plant_ids.max() + 1, np.timedelta64("NaT"),
+                     dtype="timedelta64[ns]")
+    lookup[plant_ids] = pd.to_timedelta(plant_utc_offset["utc_offset"]).values
+    return lookup
+
+
 def harmonize_eia_epa_orispl(df):
     """
     Harmonize the ORISPL code to match the EIA data -- NOT YET IMPLEMENTED
@@ -110,14 +145,19 @@ def add_facility_id_unit_id_epa(df):
     Returns:
         The same DataFrame guaranteed to have int facility_id and unit_id_epa cols
     """
+    id_cols = ["facility_id", "unit_id_epa"]
     if ("facility_id" not in df.columns) or ("unit_id_epa" not in df.columns):
         # Can't just assign np.NaN and get an integer NaN, so make a new array
         # with the right shape:
-        na_col = pd.array(np.full(df.shape[0], np.NaN), dtype="Int64")
+        na_col = pd.array(np.full(df.shape[0], np.NaN),
+                          dtype=pc.epacems_dtypes["facility_id"])
         if "facility_id" not in df.columns:
             df["facility_id"] = na_col
         if "unit_id_epa" not in df.columns:
             df["unit_id_epa"] = na_col
+    # In years when the columns appear partway through, concatenating the
+    # months turns them into floats. Make sure they're nullable integers.
+    df = df.astype({col: pc.epacems_dtypes[col] for col in id_cols})
     return df
 
 
@@ -159,22 +199,129 @@ def correct_gross_load_mw(df):
     return df
 
 
-def transform(pudl_engine, epacems_raw_dfs, verbose=True):
-    """Transform EPA CEMS hourly"""
+def duplicate_hours(df):
+    """Find records which repeat the plant, unit and hour of an earlier one
+
+    Args:
+        df (pandas.DataFrame): Transformed CEMS hourly data, with
+            plant_id_eia, unitid and operating_datetime_utc columns.
+    Returns:
+        numpy.ndarray: A boolean array, True for every record whose
+        (plant_id_eia, unitid, operating_datetime_utc) key has already
+        appeared in an earlier row.
+
+    This is the key of the unique index that's built once all the data is
+    loaded. Rather than hashing the three columns together, each key is
+    packed into a single int64 (plant ID, the unit's category code, and
+    hours since the earliest record), so the check is cheap enough to run on
+    every state-year as it goes by.
+    """
+    if not len(df):
+        return np.zeros(0, dtype=bool)
+    plant_ids = df["plant_id_eia"].values.astype(np.int64)
+    if pd.api.types.is_categorical_dtype(df["unitid"]):
+        unit_codes = df["unitid"].cat.codes.values.astype(np.int64)
+    else:
+        unit_codes = pd.factorize(df["unitid"])[0].astype(np.int64)
+    hours = df["operating_datetime_utc"].values.view(np.int64) // NS_PER_HOUR
+    hours = hours - hours.min()
+    unit_bits = int(unit_codes.max()).bit_length()
+    hour_bits = int(hours.max()).bit_length()
+    plant_bits = int(plant_ids.max()).bit_length()
+    if plant_bits + unit_bits + hour_bits > 63 or plant_ids.min() < 0:
+        # Won't fit in an int64. Fall back on comparing the columns.
+        return df.duplicated(
+            ["plant_id_eia", "unitid", "operating_datetime_utc"]).values
+    keys = (((plant_ids << unit_bits) | unit_codes) << hour_bits) | hours
+    # Duplicates are rare. Sorting the keys is the quickest way to show
+    # there aren't any, and they're only hashed to find which ones they are.
+    sorted_keys = np.sort(keys)
+    if not (sorted_keys[1:] == sorted_keys[:-1]).any():
+        return np.zeros(len(keys), dtype=bool)
+    return pd.Series(keys).duplicated().values
+
+
+def check_duplicates(df, on_duplicates="raise"):
+    """Deal with repeated plant, unit and hour records in CEMS data
+
+    If the same plant, unit and hour shows up twice, the unique index built
+    by pudl.models.epacems.finalize() can't be created. Checking each
+    state-year before it's loaded finds the problem right away, rather than
+    after the whole (hours long) load.
+
+    Args:
+        df (pandas.DataFrame): Transformed CEMS hourly data for a state-year.
+        on_duplicates (str): What to do about duplicate records: 'raise' a
+            ValueError, 'drop' all but the first copy of them, or 'warn' and
+            keep them.
+    Returns:
+        pandas.DataFrame: The data, without any duplicates if they were
+        dropped.
+    """
+    if on_duplicates not in ("raise", "drop", "warn"):
+        raise ValueError(f"Unknown on_duplicates option: {on_duplicates}")
+    dupes = duplicate_hours(df)
+    if not dupes.any():
+        return df
+    examples = (df.loc[dupes, ["plant_id_eia", "unitid",
+                               "operating_datetime_utc"]]
+                .head(5).to_dict("records"))
+    msg = (f"Found {dupes.sum():,} duplicate plant/unit/hour records in EPA "
+           f"CEMS data, e.g. {examples}")
+    if on_duplicates == "raise":
+        raise ValueError(msg)
+    if on_duplicates == "warn":
+        from warnings import warn
+        warn(msg)
+        return df
+    return df.loc[~dupes].reset_index(drop=True)
+
+
+def transform_state_year(raw_df, plant_utc_offset):
+    """
+    Transform one state-year of raw EPA CEMS data.
+
+    Args:
+        raw_df (pandas.DataFrame): The extracted data for one state-year.
+        plant_utc_offset (numpy.ndarray): The plant UTC offset lookup array,
+            from _plant_utc_offset_lookup().
+    Returns:
+        pandas.DataFrame: The transformed data.
+    """
+    return (
+        raw_df.fillna(pc.epacems_columns_fill_na_dict)
+        .pipe(harmonize_eia_epa_orispl)
+        .pipe(fix_up_dates, plant_utc_offset=plant_utc_offset)
+        .pipe(add_facility_id_unit_id_epa)
+        .pipe(correct_gross_load_mw)
+    )
+
+
+def transform(pudl_engine, epacems_raw_dfs, verbose=True,
+              plant_utc_offset=None):
+    """Transform EPA CEMS hourly
+
+    Args:
+        pudl_engine (sqlalchemy.engine.Engine): The PUDL database, used to
+            look up the plants' timezones.
+        epacems_raw_dfs (iterable): Dictionaries of {(year, state): raw_df}.
+        verbose (bool): If True, print progress messages.
+        plant_utc_offset (numpy.ndarray): The plant UTC offset lookup array
+            from _plant_utc_offset_lookup(). If given, the database isn't
+            needed.
+    Yields:
+        dict: {(year, state): transformed_df}
+    """
     if verbose:
         print("Transforming tables from EPA CEMS:")
     # epacems_raw_dfs is a generator. Pull out one dataframe, run it through
     # a transformation pipeline, and yield it back as another generator.
-    plant_utc_offset = _load_plant_utc_offset(pudl_engine)
+    if plant_utc_offset is None:
+        plant_utc_offset = _plant_utc_offset_lookup(
+            _load_plant_utc_offset(pudl_engine))
     for raw_df_dict in epacems_raw_dfs:
         # There's currently only one dataframe in this dict at a time, but
         # that could be changed if you want.
         for yr_st, raw_df in raw_df_dict.items():
-            df = (
-                raw_df.fillna(pc.epacems_columns_fill_na_dict)
-                .pipe(harmonize_eia_epa_orispl)
-                .pipe(fix_up_dates, plant_utc_offset=plant_utc_offset)
-                .pipe(add_facility_id_unit_id_epa)
-                .pipe(correct_gross_load_mw)
-            )
+            df = transform_state_year(raw_df, plant_utc_offset)
             yield {yr_st: df}
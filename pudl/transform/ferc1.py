@@ -15,13 +15,13 @@ import pandas as pd
 import numpy as np
 
 # These modules are required for the FERC Form 1 Plant ID & Time Series
-from sklearn.metrics.pairwise import cosine_similarity
 from sklearn.base import BaseEstimator, ClassifierMixin
 from sklearn.pipeline import Pipeline
 from sklearn.compose import ColumnTransformer
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.preprocessing import Normalizer, RobustScaler, MinMaxScaler
-from sklearn.preprocessing import OneHotEncoder
+from sklearn.preprocessing import OneHotEncoder, normalize
+from sklearn.utils.extmath import safe_sparse_dot
 
 # NetworkX is used to knit incomplete ferc plant time series together.
 import networkx as nx
@@ -409,12 +409,12 @@ def fuel(ferc1_raw_dfs, ferc1_transformed_dfs, verbose=True):
 
     # Fuel cost per kWh is a per-unit value that doesn't make sense to report
     # for a single fuel that may be only a small part of the fuel consumed.
-    fuel_ferc1_df.drop('fuel_cost_kwh', axis=1, inplace=True)
+    fuel_ferc1_df.drop('fuel_cost_kwh', axis=1, inplace=True, errors='ignore')
 
     # This is heat rate, but as it's based only on the heat content of a given
     # fuel which may only be a small portion of the overall fuel consumption,
     # it doesn't make any sense here.  Drop it.
-    fuel_ferc1_df.drop('fuel_generaton', axis=1, inplace=True)
+    fuel_ferc1_df.drop('fuel_generaton', axis=1, inplace=True, errors='ignore')
 
     # Convert from BTU/unit of fuel to 1e6 BTU/unit.
     fuel_ferc1_df['fuel_avg_mmbtu_per_unit'] = fuel_ferc1_df['fuel_avg_heat'] / 1e6
@@ -1066,7 +1066,7 @@ class FERCPlantClassifier(BaseEstimator, ClassifierMixin):
 
     """
 
-    def __init__(self, min_sim=0.75, plants_df=None):
+    def __init__(self, min_sim=0.75, plants_df=None, block_size=1000):
         """
         Initialize the classifier.
 
@@ -1081,19 +1081,24 @@ class FERCPlantClassifier(BaseEstimator, ClassifierMixin):
             in order to calculate the distance metrics between all of the
             records so we can group the plants in the fit() step, so we can
             check how well they are categorized later...
+        block_size : The number of records whose similarities to all the
+            records from one year are calculated at once. The similarities
+            are never all kept in memory, only block_size times the number of
+            records in a year of them.
 
         """
         self.min_sim = min_sim
         self.plants_df = plants_df
+        self.block_size = block_size
         self._years = self.plants_df.report_year.unique()
 
     def fit(self, X, y=None):
         """
         The fit method takes the vectorized, normalized, weighted FERC plant
-        features (X) as input, calculates the pairwise cosine similarity matrix
+        features (X) as input, calculates the pairwise cosine similarities
         between all records, and groups the records in their best time series.
-        The similarity matrix and best time series are stored as data members
-        in the object for later use in scoring & predicting.
+        The best time series are stored as a data member in the object for
+        later use in scoring & predicting.
 
         This isn't quite the way a fit method would normally work.
 
@@ -1106,11 +1111,7 @@ class FERCPlantClassifier(BaseEstimator, ClassifierMixin):
             self
 
         """
-        self._cossim_df = pd.DataFrame(cosine_similarity(X))
-        self._best_of = self._best_by_year()
-        # Make the best match indices integers rather than floats w/ NA values.
-        self._best_of[self._years] = self._best_of[self._years].fillna(
-            -1).astype(int)
+        self._best_of = self._best_by_year(X)
 
         return self
 
@@ -1136,7 +1137,7 @@ class FERCPlantClassifier(BaseEstimator, ClassifierMixin):
 
         """
         try:
-            getattr(self, "_cossim_df")
+            getattr(self, "_best_of")
         except AttributeError:
             raise RuntimeError(
                 "You must train classifer before predicting data!")
@@ -1226,34 +1227,44 @@ class FERCPlantClassifier(BaseEstimator, ClassifierMixin):
 
         return np.mean(scores)
 
-    def _best_by_year(self):
-        """Find the best match for each plant record in each other year."""
-        # only keep similarity matrix entries above our minimum threshold:
+    def _best_by_year(self, X):
+        """
+        Find the best match for each plant record in each other year.
+
+        Rather than calculating the whole n x n cosine similarity matrix, the
+        similarities are calculated block_size records at a time, against the
+        records from one year at a time, and only the index of the most
+        similar record at or above min_sim is kept. Ties go to the first of
+        the records, and where there's no good enough match the index is -1.
+        The normalized vectors are multiplied just like in cosine_similarity,
+        so with the sparse features from make_ferc_clf() the similarities are
+        exactly the same.
+        """
+        X = normalize(X)
         out_df = self.plants_df.copy()
-        sim_df = self._cossim_df[self._cossim_df >= self.min_sim]
-
-        # Add a column for each of the years, in which we will store indices
-        # of the records which best match the record in question:
-        for yr in self._years:
-            newcol = yr
-            out_df[newcol] = -1
-
-        # seed_yr is the year we are matching *from* -- we do the entire
-        # matching process from each year, since it may not be symmetric:
-        for seed_yr in self._years:
-            seed_idx = self.plants_df.index[
-                self.plants_df.report_year == seed_yr]
-            # match_yr is all the other years, in which we are finding the best
-            # match
-            for match_yr in self._years:
-                best_of_yr = match_yr
-                match_idx = self.plants_df.index[
-                    self.plants_df.report_year == match_yr]
-                # For each record specified by seed_idx, obtain the index of
-                # the record within match_idx that that is the most similar.
-                best_idx = sim_df.iloc[seed_idx, match_idx].idxmax(axis=1)
-                out_df.iloc[seed_idx,
-                            out_df.columns.get_loc(best_of_yr)] = best_idx
+        year_idx = {yr: self.plants_df.index[self.plants_df.report_year == yr]
+                    for yr in self._years}
+
+        # match_yr is the year in which we are finding the best match for
+        # every record. Matching isn't symmetric, so it's done from every year.
+        for match_yr in self._years:
+            match_idx = year_idx[match_yr].values
+            match_X = X[match_idx].T
+            best_of_yr = np.full(len(out_df), -1, dtype=int)
+            # seed_yr is the year we are matching *from*:
+            for seed_yr in self._years:
+                seed_idx = year_idx[seed_yr].values
+                for start in range(0, len(seed_idx), self.block_size):
+                    block_idx = seed_idx[start:start + self.block_size]
+                    sim = safe_sparse_dot(X[block_idx], match_X,
+                                          dense_output=True)
+                    # Only similarities above our minimum threshold count:
+                    sim[~(sim >= self.min_sim)] = -np.inf
+                    best = sim.argmax(axis=1)
+                    found = np.isfinite(sim[np.arange(len(best)), best])
+                    best_of_yr[block_idx] = np.where(
+                        found, match_idx[best], -1)
+            out_df[match_yr] = best_of_yr
 
         return out_df
 
@@ -0,0 +1,270 @@
+#!/usr/bin/env python
+"""Time the pieces of the EPA CEMS extract & transform pipeline.
+
+The EPA CEMS data is by far the largest dataset that PUDL processes, and most
+of the ETL time goes into reading the monthly CSVs and massaging them into
+shape. This script runs the different implementations of those steps on a
+full state-year of data, and reports how long each one takes, and how much
+memory the resulting dataframes occupy, so that changes to the pipeline can
+be compared against each other on real data.
+
+With --queries, it instead measures how quickly the data for one plant can be
+read back out of the PUDL database, depending on whether the hourly records
+are stored in the order of the source files or clustered by plant, unit and
+time (see the epacems_clustered setting). The state-year has to have been
+loaded into the database already.
+
+Example:
+    ./epacems_benchmark.py --year 2017 --state TX
+    ./epacems_benchmark.py --year 2017 --state TX --queries
+"""
+
+import sys
+import time
+import argparse
+import statistics
+import tracemalloc
+import pandas as pd
+import sqlalchemy as sa
+import pudl
+
+# require modern python
+if not sys.version_info >= (3, 6):
+    raise AssertionError(
+        f"PUDL requires Python 3.6 or later. {sys.version_info} found."
+    )
+
+
+def parse_command_line(argv):
+    """
+    Parse command line arguments. See the -h option.
+
+    :param argv: arguments on the command line must include caller file name.
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '-y',
+        '--year',
+        type=int,
+        help="""Which year of EPA CEMS data to use. (default: %(default)s)""",
+        default=2017
+    )
+    parser.add_argument(
+        '-s',
+        '--state',
+        type=str,
+        help="""Which state's EPA CEMS data to use, as a two letter
+        abbreviation. (default: %(default)s)""",
+        default='ID'
+    )
+    parser.add_argument(
+        '-r',
+        '--repeat',
+        type=int,
+        help="""How many times to repeat each timing. The best time is
+        reported. (default: %(default)s)""",
+        default=3
+    )
+    parser.add_argument(
+        '-q',
+        '--queries',
+        action='store_true',
+        help="""Benchmark per-plant queries against the PUDL database, with
+        and without clustering, instead of the extract & transform steps."""
+    )
+    parser.add_argument(
+        '-t',
+        '--testing',
+        action='store_true',
+        help="""Query the pudl_test database rather than the live one."""
+    )
+    arguments = parser.parse_args(argv[1:])
+    return arguments
+
+
+def best_time(func, repeat=3):
+    """Call func repeat times, and return its last result and best time."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return result, min(times)
+
+
+def peak_memory(func):
+    """Call func and return the peak memory it allocated, in bytes."""
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def report(label, seconds, df, peak=None):
+    """Print out the timing and memory footprint of one benchmark."""
+    mem_mb = df.memory_usage(deep=True).sum() / 1024**2
+    msg = (f"    {label:<30} {seconds:8.2f} s {len(df):>10,} rows "
+           f"{mem_mb:8.1f} MB")
+    if peak is not None:
+        msg += f" (peak allocation {peak / 1024**2:.1f} MB)"
+    print(msg)
+
+
+def read_state_year(year, state, engine):
+    """Read all 12 months of CEMS data for one state-year."""
+    dfs = [
+        pudl.extract.epacems.read_cems_csv(
+            pudl.extract.epacems.get_epacems_file(year, month, state),
+            engine=engine)
+        for month in range(1, 13)
+    ]
+    # Concatenated the same way as in extract(), so the categoricals stay
+    # categoricals even where their categories differ from month to month.
+    return pd.concat(pudl.helpers.unify_categories(dfs),
+                     sort=True, copy=False, ignore_index=True)
+
+
+def benchmark_csv_engines(year, state, repeat=3):
+    """Compare the pandas and pyarrow CEMS CSV readers."""
+    print(f"Reading EPA CEMS CSVs for {state} {year}:")
+    for engine in ('pandas', 'pyarrow'):
+        df, seconds = best_time(
+            lambda: read_state_year(year, state, engine), repeat=repeat)
+        report(f"read_cems_csv({engine})", seconds, df)
+
+
+def _fix_up_dates_merge(df, plant_utc_offset):
+    """The previous fix_up_dates(), which merged the offsets onto the data.
+
+    Kept here only as a point of comparison for the vectorized version.
+    """
+    df["op_datetime_naive"] = (
+        pd.to_datetime(
+            df["op_date"], format=r"%m-%d-%Y", exact=True, cache=True, utc=True
+        ) +
+        pd.to_timedelta(df["op_hour"], unit="h")
+    )
+    df = df.merge(plant_utc_offset, how="left", on="plant_id_eia")
+    df["operating_datetime_utc"] = df["op_datetime_naive"] + df["utc_offset"]
+    del df["op_date"], df["op_hour"], df["op_datetime_naive"], df["utc_offset"]
+    return df
+
+
+def benchmark_fix_up_dates(year, state, repeat=3):
+    """Compare the merge based and vectorized UTC datetime calculations."""
+    raw_df = read_state_year(year, state, engine='pyarrow')
+    # Use a made up offset for every plant, so we don't need a database.
+    plant_ids = raw_df["plant_id_eia"].unique()
+    plant_utc_offset = pd.DataFrame({
+        "plant_id_eia": plant_ids.astype(int),
+        "utc_offset": pd.Timedelta(hours=-6),
+    })
+    lookup = pudl.transform.epacems._plant_utc_offset_lookup(plant_utc_offset)
+    print(f"Calculating UTC datetimes for {state} {year}:")
+    implementations = {
+        "merge (previous)":
+            lambda: _fix_up_dates_merge(raw_df.copy(), plant_utc_offset),
+        "fix_up_dates":
+            lambda: pudl.transform.epacems.fix_up_dates(raw_df.copy(), lookup),
+    }
+    for label, func in implementations.items():
+        df, seconds = best_time(func, repeat=repeat)
+        report(label, seconds, df, peak=peak_memory(func))
+
+
+# The two physical layouts to compare. In the source files (and so in the
+# database, unless it was loaded with clustering) the records are grouped by
+# month, and then sorted by plant, unit and hour within each month.
+LAYOUTS = {
+    "file order": "date_trunc('month', operating_datetime_utc), "
+                  "plant_id_eia, unitid, operating_datetime_utc",
+    "clustered": ", ".join(pudl.models.epacems.CLUSTER_ORDER),
+}
+
+PLANT_QUERY = """
+SELECT * FROM {table}
+WHERE plant_id_eia = :plant_id
+AND operating_datetime_utc >= :start AND operating_datetime_utc < :end
+"""
+
+
+def _copy_state_year(engine, table, year, state, order_by):
+    """Copy a state-year of hourly data into a scratch table, in order."""
+    engine.execute(f"DROP TABLE IF EXISTS {table}")
+    engine.execute(sa.text(f"""
+        CREATE TABLE {table} AS SELECT * FROM hourly_emissions_epacems
+        WHERE state = :state
+        AND operating_datetime_utc >= :start AND operating_datetime_utc < :end
+        ORDER BY {order_by}"""),
+                   state=state, start=f"{year}-01-01",
+                   end=f"{year + 1}-01-01")
+    engine.execute(f"CREATE INDEX ix_{table} ON {table} "
+                   "(plant_id_eia, operating_datetime_utc)")
+    engine.execute(f"CREATE INDEX brin_{table} ON {table} "
+                   "USING brin (operating_datetime_utc)")
+    engine.execute(f"ANALYZE {table}")
+
+
+def _time_plant_query(engine, table, plant_id, start, end, repeat=3):
+    """Time one per-plant query, and count the pages it touches."""
+    query = sa.text(PLANT_QUERY.format(table=table))
+    params = dict(plant_id=int(plant_id), start=start, end=end)
+    _, seconds = best_time(
+        lambda: engine.execute(query, **params).fetchall(), repeat=repeat)
+    plan = engine.execute(
+        sa.text("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " +
+                PLANT_QUERY.format(table=table)), **params).scalar()
+    plan = plan[0]["Plan"]
+    pages = (plan.get("Shared Hit Blocks", 0) +
+             plan.get("Shared Read Blocks", 0))
+    return seconds, pages
+
+
+def benchmark_plant_queries(year, state, repeat=3, testing=False):
+    """Compare per-plant query latency with and without clustering."""
+    engine = pudl.init.connect_db(testing=testing)
+    plant_ids = [row[0] for row in engine.execute(sa.text(
+        "SELECT DISTINCT plant_id_eia FROM hourly_emissions_epacems "
+        "WHERE state = :state"), state=state)]
+    if not plant_ids:
+        raise AssertionError(
+            f"No EPA CEMS data for {state} in the database. Load it first.")
+    ranges = {
+        "one plant, one year": (f"{year}-01-01", f"{year + 1}-01-01"),
+        "one plant, one week": (f"{year}-06-01", f"{year}-06-08"),
+    }
+    print(f"Querying {len(plant_ids)} plants in {state} {year}:")
+    for layout, order_by in LAYOUTS.items():
+        table = "epacems_benchmark_" + layout.replace(" ", "_")
+        _copy_state_year(engine, table, year, state, order_by)
+        try:
+            for label, (start, end) in ranges.items():
+                results = [
+                    _time_plant_query(engine, table, plant_id, start, end,
+                                      repeat=repeat)
+                    for plant_id in plant_ids
+                ]
+                latency = statistics.median(r[0] for r in results) * 1000
+                pages = statistics.mean(r[1] for r in results)
+                print(f"    {layout:<12} {label:<22} {latency:8.2f} ms "
+                      f"(median) {pages:10.1f} pages (mean)")
+        finally:
+            engine.execute(f"DROP TABLE IF EXISTS {table}")
+
+
+def main():
+    """Main function controlling flow of the script."""
+    args = parse_command_line(sys.argv)
+    if args.queries:
+        benchmark_plant_queries(args.year, args.state, repeat=args.repeat,
+                                testing=args.testing)
+        return
+    benchmark_csv_engines(args.year, args.state, repeat=args.repeat)
+    benchmark_fix_up_dates(args.year, args.state, repeat=args.repeat)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
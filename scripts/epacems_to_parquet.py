@@ -27,9 +27,6 @@ For more information on working with these systems check out:
 import os
 import sys
 import argparse
-import pandas as pd
-import pyarrow as pa
-import pyarrow.parquet as pq
 import pudl
 from pudl.settings import SETTINGS
 import pudl.constants as pc
@@ -40,35 +37,6 @@ if not sys.version_info >= (3, 6):
         f"PUDL requires Python 3.6 or later. {sys.version_info} found."
     )
 
-IN_DTYPES = {
-    'unitid': str,
-    'facility_id': str,
-    'unit_id_epa': str,
-}
-
-OUT_DTYPES = {
-    'year': 'uint16',
-    'state': 'category',
-    # 'plant_name': 'category',
-    'plant_id_eia': 'uint16',
-    'unitid': 'category',
-    'gross_load_mw': 'float32',
-    'steam_load_1000_lbs': 'float32',
-    'so2_mass_lbs': 'float32',
-    'so2_mass_measurement_code': 'category',
-    'nox_rate_lbs_mmbtu': 'float32',
-    'nox_rate_measurement_code': 'category',
-    'nox_mass_lbs': 'float32',
-    'nox_mass_measurement_code': 'category',
-    'co2_mass_tons': 'float32',
-    'co2_mass_measurement_code': 'category',
-    'heat_content_mmbtu': 'float32',
-    'facility_id': 'category',
-    'unit_id_epa': 'category',
-    'operating_datetime_utc': pd.DatetimeTZDtype(tz="UTC"),
-    'operating_time_hours': 'float32'
-}
-
 
 def parse_command_line(argv):
     """
@@ -141,6 +109,31 @@ def parse_command_line(argv):
         dataset? (default: %(default)s)""",
         default='snappy'
     )
+    parser.add_argument(
+        '-w',
+        '--workers',
+        type=int,
+        help="""How many state-years to process at once, each in its own
+        process. (default: %(default)s)""",
+        default=os.cpu_count()
+    )
+    parser.add_argument(
+        '-r',
+        '--row_group_size',
+        type=int,
+        help="""Maximum number of records in each Parquet row group. Smaller
+        row groups let readers skip more of the data when filtering by plant
+        or time, but compress less well. (default: %(default)s)""",
+        default=100000
+    )
+    parser.add_argument(
+        '--csv_engine',
+        type=str,
+        choices=['pandas', 'pyarrow'],
+        help="""Which CSV reader to use for the original EPA CEMS data.
+        (default: %(default)s)""",
+        default='pandas'
+    )
     parser.add_argument(
         "--testing",
         action="store_true",
@@ -153,91 +146,29 @@ def parse_command_line(argv):
     return arguments
 
 
-def downcast_numeric(df, from_dtype, to_dtype):
-    """Downcast columns from_dtype to_dtype to save space."""
-    to_downcast = df.select_dtypes(include=[from_dtype])
-    for col in to_downcast.columns:
-        df[col] = pd.to_numeric(to_downcast[col], downcast=to_dtype)
-    return df
-
-
-def year_from_operating_datetime(df):
-    """Add a 'year' column based on the year in the operating_datetime."""
-    df['year'] = df.operating_datetime_utc.dt.year
-    return df
-
-
-def cems_to_parquet(transformed_df_dicts, outdir=None, schema=None,
-                    compression='snappy', partition_cols=('year', 'state')):
-    """
-    Take transformed EPA CEMS dataframes and output them as Parquet files.
-
-    We need to do a few additional manipulations of the dataframes after they
-    have been transformed by PUDL to get them ready for output to the Apache
-    Parquet format. Mostly this has to do with ensuring homogeneous data types
-    across all of the dataframes, and downcasting to the most efficient data
-    type possible for each of them. We also add a 'year' column so that we can
-    partition the datset on disk by year as well as state.
-    """
-    if not schema:
-        raise AssertionError("Required Parquet table schema not specified.")
-    if not outdir:
-        raise AssertionError("Required output directory not specified.")
-
-    for df_dict in transformed_df_dicts:
-        for yr_st, df in df_dict.items():
-            print(f'            {yr_st}: {len(df)} records')
-            if not df.empty:
-                df = (
-                    df.astype(IN_DTYPES)
-                    .pipe(downcast_numeric,
-                          from_dtype='float',
-                          to_dtype='float')
-                    .pipe(downcast_numeric,
-                          from_dtype='int',
-                          to_dtype='unsigned')
-                    .pipe(year_from_operating_datetime)
-                    .astype(OUT_DTYPES)
-                )
-                pq.write_to_dataset(
-                    pa.Table.from_pandas(
-                        df, preserve_index=False, schema=schema),
-                    root_path=outdir, partition_cols=partition_cols,
-                    compression=compression)
-
-
 def main():
     """Main function controlling flow of the script."""
 
     args = parse_command_line(sys.argv)
 
-    # Create a pandas dataframe that has the appropriate column types for our
-    # Parquet output, so we can use it as a template / schema.
-    cems_df_template = pd.DataFrame(columns=OUT_DTYPES.keys())
-    cems_df_template = cems_df_template.astype(OUT_DTYPES)
-    cems_table = pa.Table.from_pandas(cems_df_template)
     # transform.epacems needs to reach into the database to get timezones, so
     # get a database connection here
     pudl_engine = pudl.init.connect_db(testing=args.testing)
 
     # Use the PUDL EPA CEMS Extract / Transform pipelines to process the
-    # original raw data from EPA as needed.
-    raw_dfs = pudl.extract.epacems.extract(
+    # original raw data from EPA as needed, and write the resulting files to
+    # disk, one state-year at a time.
+    pudl.output.export.epacems_to_parquet(
         epacems_years=args.years,
         states=args.states,
-        verbose=args.verbose
-    )
-    transformed_dfs = pudl.transform.epacems.transform(
-        pudl_engine=pudl_engine, epacems_raw_dfs=raw_dfs, verbose=args.verbose
-    )
-
-    # Do a few additional manipulations specific to the Apache Parquet output,
-    # and write the resulting files to disk.
-    cems_to_parquet(transformed_dfs,
-                    outdir=args.outdir,
-                    schema=cems_table.schema,
-                    compression=args.compression,
-                    partition_cols=args.partition_cols)
+        outdir=args.outdir,
+        pudl_engine=pudl_engine,
+        workers=args.workers,
+        csv_engine=args.csv_engine,
+        partition_cols=args.partition_cols,
+        compression=args.compression,
+        row_group_size=args.row_group_size,
+        verbose=args.verbose)
 
 
 if __name__ == '__main__':
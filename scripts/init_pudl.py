@@ -40,6 +40,35 @@ def main():
     settings_init = pudl.settings.settings_init(
         settings_file=args.settings_file)
 
+    if settings_init['epacems_incremental']:
+        pudl.init.verify_input_files(
+            ferc1_years=[],
+            eia923_years=[],
+            eia860_years=[],
+            epacems_years=settings_init['epacems_years'],
+            epacems_states=settings_init['epacems_states'],
+            epacems_partial_years=True
+        )
+        pudl.init.update_epacems(
+            epacems_years=settings_init['epacems_years'],
+            epacems_states=settings_init['epacems_states'],
+            verbose=settings_init['verbose'],
+            pudl_testing=settings_init['pudl_testing'],
+            csvdir=SETTINGS['csvdir'],
+            keep_csv=settings_init['keep_csv'],
+            csv_compression=settings_init['csv_compression'],
+            epacems_workers=settings_init['epacems_workers'],
+            epacems_csv_engine=settings_init['epacems_csv_engine'],
+            copy_format=settings_init['copy_format'],
+            epacems_copy_writers=settings_init['epacems_copy_writers'],
+            epacems_duplicates=settings_init['epacems_duplicates'],
+            index_workers=settings_init['index_workers'],
+            epacems_brin=settings_init['epacems_brin'],
+            maintenance_work_mem=settings_init['maintenance_work_mem'],
+            index_parallel_workers=settings_init['index_parallel_workers'],
+            epacems_clustered=settings_init['epacems_clustered'])
+        return
+
     pudl.init.verify_input_files(
         ferc1_years=settings_init['ferc1_years'],
         eia923_years=settings_init['eia923_years'],
@@ -53,7 +82,10 @@ def main():
                                years=settings_init['ferc1_years'],
                                def_db=True,
                                verbose=settings_init['verbose'],
-                               testing=settings_init['ferc1_testing'])
+                               testing=settings_init['ferc1_testing'],
+                               workers=settings_init['ferc1_workers'],
+                               incremental=settings_init['ferc1_incremental'],
+                               backend=settings_init['ferc1_backend'])
 
     pudl.init.init_db(ferc1_tables=settings_init['ferc1_tables'],
                       ferc1_years=settings_init['ferc1_years'],
@@ -68,7 +100,24 @@ def main():
                       pudl_testing=settings_init['pudl_testing'],
                       ferc1_testing=settings_init['ferc1_testing'],
                       csvdir=SETTINGS['csvdir'],
-                      keep_csv=settings_init['keep_csv'])
+                      keep_csv=settings_init['keep_csv'],
+                      csv_compression=settings_init['csv_compression'],
+                      ferc1_workers=settings_init['ferc1_workers'],
+                      ferc1_backend=settings_init['ferc1_backend'],
+                      epacems_workers=settings_init['epacems_workers'],
+                      epacems_csv_engine=settings_init['epacems_csv_engine'],
+                      copy_format=settings_init['copy_format'],
+                      epacems_copy_writers=settings_init[
+                          'epacems_copy_writers'],
+                      epacems_partitioned=settings_init['epacems_partitioned'],
+                      epacems_duplicates=settings_init['epacems_duplicates'],
+                      index_workers=settings_init['index_workers'],
+                      epacems_brin=settings_init['epacems_brin'],
+                      maintenance_work_mem=settings_init[
+                          'maintenance_work_mem'],
+                      index_parallel_workers=settings_init[
+                          'index_parallel_workers'],
+                      epacems_clustered=settings_init['epacems_clustered'])
 
 
 if __name__ == '__main__':
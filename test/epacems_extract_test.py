@@ -0,0 +1,47 @@
+"""Tests for reading the EPA CEMS CSV files."""
+
+import os
+import shutil
+import pandas as pd
+import pytest
+import pudl
+from pudl.settings import SETTINGS
+
+
+def test_check_categories():
+    """Unknown measurement codes are rejected, not turned into NA."""
+    df = pd.DataFrame({
+        'STATE': pd.Categorical(['CO', 'CO']),
+        'SO2_MASS_MEASURE_FLG': pd.Categorical(['Measured', None]),
+        'NOX_MASS_MEASURE_FLG': pd.Categorical(['LME', 'Calculated']),
+    })
+    checked = pudl.extract.epacems._check_categories(df.copy(), 'test.zip')
+    for col in df.columns:
+        assert checked[col].dtype == pudl.constants.epacems_csv_dtypes[col]
+        assert checked[col].isna().sum() == df[col].isna().sum()
+
+    df['NOX_MASS_MEASURE_FLG'] = pd.Categorical(['LME', 'BOGUS'])
+    with pytest.raises(ValueError, match='BOGUS'):
+        pudl.extract.epacems._check_categories(df, 'test.zip')
+
+
+def test_partial_year(tmp_path, monkeypatch):
+    """Only the months that have been published so far are read."""
+    test_dir = os.path.join(SETTINGS['test_dir'], 'data', 'epa', 'cems')
+    os.mkdir(tmp_path / 'epacems2017')
+    for month in (1, 2, 3):
+        filename = f'epacems2017id{month:02}.zip'
+        shutil.copy(os.path.join(test_dir, 'epacems2017', filename),
+                    tmp_path / 'epacems2017' / filename)
+    monkeypatch.setitem(SETTINGS, 'epacems_data_dir', str(tmp_path))
+
+    assert pudl.extract.epacems.available_months(2017, 'ID') == [1, 2, 3]
+    raw_df = next(pudl.extract.epacems.extract(
+        [2017], ['ID'], verbose=False))[(2017, 'ID')]
+    assert set(raw_df['op_date'].astype(str).str[:2]) == {'01', '02', '03'}
+
+    before = pudl.extract.epacems.checksum(2017, 'ID')
+    shutil.copy(os.path.join(test_dir, 'epacems2017', 'epacems2017id04.zip'),
+                tmp_path / 'epacems2017')
+    assert pudl.extract.epacems.checksum(2017, 'ID') != before
+    assert pudl.extract.epacems.checksum(2017, 'ID', [1, 2, 3]) == before
@@ -0,0 +1,93 @@
+"""Tests for loading EPA CEMS data into the PUDL database."""
+
+import pandas as pd
+import pytest
+import pudl
+
+
+def _state_year(year, state, hours=3):
+    """A few hours of made up transformed CEMS data for one unit."""
+    return pd.DataFrame({
+        'state': state,
+        'plant_id_eia': 3,
+        'unitid': '1',
+        'operating_datetime_utc': pd.date_range(
+            f'{year}-01-01 07:00', periods=hours, freq='H', tz='UTC'),
+        'gross_load_mw': 1.0,
+        'facility_id': pd.array([1] * hours, dtype='Int32'),
+        'unit_id_epa': pd.array([None] * hours, dtype='Int32'),
+    })
+
+
+def test_etl_cems_records_each_state_year(monkeypatch):
+    """State-years are in the manifest as soon as they have been loaded."""
+    def extract(epacems_years, states, **kwargs):
+        yield {(2017, 'CO'): _state_year(2017, 'CO')}
+        yield {(2017, 'UT'): _state_year(2017, 'UT')}
+        raise RuntimeError("The WY data went missing.")
+
+    loaded = []
+    recorded = []
+    monkeypatch.setattr(pudl.extract.epacems, 'extract', extract)
+    monkeypatch.setattr(pudl.transform.epacems, 'transform',
+                        lambda pudl_engine, epacems_raw_dfs, verbose:
+                        epacems_raw_dfs)
+    monkeypatch.setattr(pudl.load, '_dump_load',
+                        lambda df, table_name, engine, **kwargs:
+                        loaded.append(df))
+    monkeypatch.setattr(pudl.models.epacems, 'record_loads',
+                        lambda engine, row_counts, checksums, **kwargs:
+                        recorded.append((dict(row_counts), len(loaded))))
+
+    with pytest.raises(RuntimeError):
+        pudl.init._ETL_cems(
+            None, [2017], verbose=False, csvdir='', keep_csv=False,
+            states=['CO', 'UT', 'WY'],
+            checksums={(2017, st): st for st in ['CO', 'UT', 'WY']},
+            months={(2017, st): range(1, 13) for st in ['CO', 'UT', 'WY']})
+    # The state-years that were read were loaded together when the loader
+    # was closed, and only recorded after that.
+    assert recorded == [({(2017, 'CO'): 3}, 1), ({(2017, 'UT'): 3}, 1)]
+
+
+def test_update_epacems_clears_unrecorded_rows(monkeypatch):
+    """Rows with no manifest entry are deleted before they're reloaded."""
+    # CO 2017 was partly loaded, but never recorded in the manifest, while
+    # UT 2017 was loaded and recorded, and hasn't changed since.
+    rows = {(2017, 'CO'): 5, (2017, 'UT'): 8}
+    manifest = {(2017, 'UT'): 'ut'}
+    deleted = []
+
+    class FakeEngine(object):
+        def execute(self, sql):
+            pass
+
+    def delete_state_year(engine, year, state, plant_utc_offset):
+        deleted.append((year, state))
+        return rows.pop((year, state), 0)
+
+    def etl_cems(pudl_engine, epacems_years, states, **kwargs):
+        for state in states:
+            for year in epacems_years:
+                assert (year, state) not in rows, "Duplicate hours loaded."
+                rows[(year, state)] = 10
+
+    monkeypatch.setattr(pudl.init, 'connect_db',
+                        lambda testing: FakeEngine())
+    monkeypatch.setattr(pudl.models.epacems, 'loaded_checksums',
+                        lambda engine: dict(manifest))
+    monkeypatch.setattr(pudl.extract.epacems, 'available_months',
+                        lambda year, state: [1, 2, 3])
+    monkeypatch.setattr(pudl.extract.epacems, 'checksum',
+                        lambda year, state, months: state.lower())
+    monkeypatch.setattr(pudl.transform.epacems, '_load_plant_utc_offset',
+                        lambda engine: None)
+    monkeypatch.setattr(pudl.models.epacems, 'delete_state_year',
+                        delete_state_year)
+    monkeypatch.setattr(pudl.models.epacems, 'is_partitioned',
+                        lambda engine: False)
+    monkeypatch.setattr(pudl.init, '_ETL_cems', etl_cems)
+
+    pudl.init.update_epacems([2017], ['CO', 'UT', 'WY'], verbose=False)
+    assert deleted == [(2017, 'CO'), (2017, 'WY')]
+    assert rows == {(2017, 'CO'): 10, (2017, 'UT'): 8, (2017, 'WY'): 10}
@@ -0,0 +1,61 @@
+"""Tests for writing and querying the EPA CEMS Apache Parquet dataset."""
+
+import pandas as pd
+import pytest
+import pudl
+from pudl.output.pudltabl import PudlTabl
+from pudl.settings import SETTINGS
+
+
+def test_epacems_parquet_roundtrip(tmp_path, monkeypatch):
+    """Convert the test CEMS data to Parquet, and query it with filters."""
+    monkeypatch.setitem(SETTINGS, 'epacems_data_dir',
+                        SETTINGS['test_dir'] + '/data/epa/cems')
+    raw_df = next(pudl.extract.epacems.extract(
+        [2017], ['ID'], verbose=False))[(2017, 'ID')]
+    # Use a made up offset for every plant, so we don't need a database.
+    plant_utc_offset = pd.DataFrame({
+        'plant_id_eia': raw_df['plant_id_eia'].unique().astype(int),
+        'utc_offset': pd.Timedelta(hours=-7),
+    })
+    outdir = str(tmp_path)
+    # Running it twice overwrites the same file rather than adding another.
+    for _ in range(2):
+        paths = pudl.output.export.epacems_to_parquet(
+            [2017], ['ID'], outdir, plant_utc_offset=plant_utc_offset,
+            row_group_size=1000, verbose=False)
+    assert paths == [
+        pudl.output.export.epacems_parquet_path(outdir, 2017, 'ID')]
+
+    all_df = pudl.output.epacems.hourly_emissions_epacems(
+        epacems_dir=outdir)
+    assert len(all_df) == len(raw_df)
+    assert (all_df['state'] == 'ID').all()
+
+    plant_id = all_df['plant_id_eia'].iloc[0]
+    df = pudl.output.epacems.hourly_emissions_epacems(
+        plant_ids=[plant_id], states=['ID'],
+        start_date='2017-03-01', end_date='2017-03-02',
+        columns=['plant_id_eia', 'unitid', 'operating_datetime_utc'],
+        epacems_dir=outdir)
+    expected = all_df.loc[
+        (all_df['plant_id_eia'] == plant_id) &
+        (all_df['operating_datetime_utc'] >= '2017-03-01') &
+        (all_df['operating_datetime_utc'] < '2017-03-03')]
+    assert len(df) == len(expected) > 0
+    assert list(df.columns) == ['plant_id_eia', 'unitid',
+                                'operating_datetime_utc']
+
+    batches = pudl.output.epacems.hourly_emissions_epacems(
+        states=['CO'], epacems_dir=outdir, batches=True)
+    assert sum(len(batch) for batch in batches) == 0
+
+
+def test_pudltabl_epacems_arguments():
+    """Arguments that don't apply to the hourly data or totals are refused."""
+    with pytest.raises(ValueError):
+        PudlTabl(freq='MS').epacems(batches=True)
+    with pytest.raises(ValueError):
+        PudlTabl(freq='AS').epacems(epacems_dir='/tmp')
+    with pytest.raises(ValueError):
+        PudlTabl().epacems(level='plant')
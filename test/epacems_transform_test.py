@@ -0,0 +1,29 @@
+"""Tests for the EPA CEMS transform functions."""
+
+import pandas as pd
+import pytest
+import pudl
+
+
+def test_check_duplicates():
+    """Repeated plant/unit/hour records are found, dropped or rejected."""
+    df = pd.DataFrame({
+        'plant_id_eia': [3, 3, 3, 55555, 3],
+        'unitid': ['1', '2', '1', '1', '1'],
+        'operating_datetime_utc': pd.to_datetime(
+            ['2017-01-01 07:00', '2017-01-01 07:00', '2017-01-01 08:00',
+             '2017-01-01 07:00', '2017-01-01 07:00'], utc=True),
+        'gross_load_mw': [1.0, 2.0, 3.0, 4.0, 5.0],
+    })
+    dupes = pudl.transform.epacems.duplicate_hours(df)
+    assert list(dupes) == [False, False, False, False, True]
+    assert (dupes == df.duplicated(
+        ['plant_id_eia', 'unitid', 'operating_datetime_utc'])).all()
+
+    dropped = pudl.transform.epacems.check_duplicates(df, 'drop')
+    assert list(dropped['gross_load_mw']) == [1.0, 2.0, 3.0, 4.0]
+    with pytest.raises(ValueError):
+        pudl.transform.epacems.check_duplicates(df)
+    with pytest.warns(UserWarning):
+        assert len(pudl.transform.epacems.check_duplicates(df, 'warn')) == 5
+    assert pudl.transform.epacems.check_duplicates(dropped) is dropped
@@ -0,0 +1,132 @@
+"""Tests for reading the FERC Form 1 DBF & DBC files."""
+
+import glob
+import os
+import zipfile
+import dbfread
+import pandas as pd
+import sqlalchemy as sa
+import pudl.extract.ferc1
+import pudl.constants as pc
+from pudl.settings import SETTINGS
+
+
+def _unzip_f1_2017(tmp_path):
+    """Unpack the 2017 FERC Form 1 test data, returning the DBF paths."""
+    zip_path = os.path.join(SETTINGS['test_dir'], 'data', 'ferc', 'form1',
+                            'f1_2017', 'f1_2017.zip')
+    with zipfile.ZipFile(zip_path) as archive:
+        archive.extractall(tmp_path)
+    return sorted(glob.glob(os.path.join(str(tmp_path), '*.DBF')))
+
+
+def _assert_same(df, ref):
+    """Check read_dbf() output against the records dbfread returns."""
+    ref = ref.drop(columns=['_NullFlags'])
+    assert list(df.columns) == list(ref.columns)
+    assert len(df) == len(ref)
+    for col in df.columns:
+        got, expected = df[col], ref[col]
+        if pd.api.types.is_datetime64_any_dtype(got):
+            expected = pd.to_datetime(expected)
+        elif got.dtype != object:
+            got, expected = got.astype(float), expected.astype(float)
+        same = (got == expected) | (got.isna() & expected.isna())
+        assert same.all(), col
+
+
+def test_read_dbf_matches_dbfread(tmp_path):
+    """Every test DBF file reads the same as it does with dbfread."""
+    dbf_paths = _unzip_f1_2017(tmp_path)
+    assert dbf_paths
+    for path in dbf_paths:
+        ref = pd.DataFrame(iter(dbfread.DBF(path)))
+        _assert_same(pudl.extract.ferc1.read_dbf(path), ref)
+        batches = list(pudl.extract.ferc1.read_dbf(path, batch_size=100))
+        assert sum(len(batch) for batch in batches) == len(ref)
+
+
+def test_read_dbf_deleted_and_null(tmp_path):
+    """Deleted records are skipped, and flagged fields are null."""
+    path = os.path.join(str(tmp_path), 'F1_1.DBF')
+    _unzip_f1_2017(tmp_path)
+    header = pudl.extract.ferc1.dbf_header(path)
+    null_flags = [f for f in header['fields'] if f.type == '0'][0]
+    with open(path, 'r+b') as f:
+        # Delete the first record.
+        f.seek(header['headerlen'])
+        f.write(b'*')
+        # RESPONDENT is the first nullable field: null it in the 2nd record.
+        f.seek(header['headerlen'] + header['recordlen'] + null_flags.offset)
+        flags = f.read(1)[0]
+        f.seek(-1, os.SEEK_CUR)
+        f.write(bytes([flags | 1]))
+    df = pudl.extract.ferc1.read_dbf(
+        path, columns={'RESPONDENT': 'respondent_id'})
+    assert list(df.columns) == ['respondent_id']
+    assert len(df) == header['numrecords'] - 1
+    assert pd.isna(df['respondent_id'].iloc[0])
+    assert df['respondent_id'].iloc[1:].notna().all()
+
+
+def test_dbc_schema_cache(tmp_path):
+    """The parsed DBC schema is cached, and parsed again when it changes."""
+    year_dir = tmp_path / 'f1_2017'
+    dbf_paths = _unzip_f1_2017(year_dir)
+    cache_dir = str(tmp_path / 'cache')
+    parsed = pudl.extract.ferc1.dbc_schema(
+        2017, basedir=str(tmp_path), cache_dir=None)
+    assert len(parsed) == len(dbf_paths)
+    assert parsed['f1_fuel'][0] == ('RESPONDENT', 'respondent_id', 'I', 4)
+
+    cached = pudl.extract.ferc1.dbc_schema(
+        2017, basedir=str(tmp_path), cache_dir=cache_dir)
+    assert cached == parsed
+    assert len(os.listdir(cache_dir)) == 1
+    assert pudl.extract.ferc1.dbc_schema(
+        2017, basedir=str(tmp_path), cache_dir=cache_dir) == parsed
+
+    # Without F1_31 there's no f1_fuel table, and a new cache entry.
+    os.remove(str(year_dir / 'F1_31.DBF'))
+    changed = pudl.extract.ferc1.dbc_schema(
+        2017, basedir=str(tmp_path), cache_dir=cache_dir)
+    assert 'f1_fuel' not in changed
+    assert len(os.listdir(cache_dir)) == 2
+
+
+def test_extract_columns_exist(tmp_path):
+    """Every column the FERC Form 1 extract asks for is in the DB schema."""
+    _unzip_f1_2017(tmp_path / 'f1_2017')
+    meta = sa.MetaData()
+    pudl.extract.ferc1.define_db(2017, pc.ferc1_default_tables, meta,
+                                 basedir=str(tmp_path), verbose=False)
+    for pudl_table, columns in pc.ferc1_extract_columns.items():
+        table = meta.tables[pc.table_map_ferc1_pudl[pudl_table]]
+        assert set(columns) <= set(table.c.keys()), pudl_table
+
+
+def test_sqlite_backend(tmp_path, monkeypatch):
+    """The FERC Form 1 DB can be cloned into SQLite, and extracted from it."""
+    _unzip_f1_2017(tmp_path / 'f1_2017')
+    monkeypatch.setitem(SETTINGS['db_ferc1_test_sqlite'], 'database',
+                        str(tmp_path / 'ferc1_test.sqlite'))
+    init_args = dict(ferc1_tables=pc.ferc1_default_tables, refyear=2017,
+                     years=[2017], basedir=str(tmp_path), verbose=False,
+                     testing=True, backend='sqlite')
+    pudl.extract.ferc1.init_db(**init_args)
+    engine = pudl.extract.ferc1.connect_db(testing=True, backend='sqlite')
+    n_fuel = engine.execute('SELECT COUNT(*) FROM f1_fuel').scalar()
+    assert n_fuel > 0
+    assert n_fuel == engine.execute(
+        "SELECT row_count FROM f1_load_manifest "
+        "WHERE table_name = 'f1_fuel' AND report_year = 2017").scalar()
+    # Nothing has changed, so an incremental update loads nothing.
+    pudl.extract.ferc1.init_db(incremental=True, **init_args)
+    assert engine.execute('SELECT COUNT(*) FROM f1_fuel').scalar() == n_fuel
+
+    raw_dfs = pudl.extract.ferc1.extract(
+        ferc1_tables=['fuel_ferc1'], ferc1_years=[2017], testing=True,
+        verbose=False, backend='sqlite')
+    fuel = raw_dfs['fuel_ferc1']
+    assert len(fuel) > 0
+    assert list(fuel.columns) == list(pc.ferc1_extract_columns['fuel_ferc1'])
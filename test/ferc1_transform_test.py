@@ -0,0 +1,69 @@
+"""Tests for the FERC Form 1 transform functions."""
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics.pairwise import cosine_similarity
+import pudl
+
+
+def _steam_plants(n_plants=30, years=(2015, 2016, 2017)):
+    """Make up a few years of large steam plant records to classify."""
+    rng = np.random.default_rng(0)
+    names = [f'plant {i % 12} unit {i % 5}' for i in range(n_plants)]
+    frames = []
+    for yr in years:
+        df = pd.DataFrame({
+            'report_year': yr,
+            'plant_name': names,
+            'plant_type': rng.choice(['steam', 'combustion_turbine'],
+                                     n_plants),
+            'construction_type': rng.choice(['outdoor', 'conventional'],
+                                            n_plants),
+            'capacity_mw': rng.uniform(10, 1000, n_plants),
+            'construction_year': rng.integers(1950, 1955, n_plants),
+            'utility_id_ferc1': rng.integers(1, 4, n_plants),
+            'coal_fraction_mmbtu': rng.uniform(0, 1, n_plants),
+            'gas_fraction_mmbtu': rng.uniform(0, 1, n_plants),
+        })
+        # Identical records tie for the best match.
+        df = pd.concat([df, df.iloc[:3]], ignore_index=True)
+        frames.append(df)
+    df = pd.concat(frames, ignore_index=True)
+    df['record_id'] = [f'f1_steam_{i}' for i in range(len(df))]
+    return df
+
+
+def _best_by_year_dense(clf, X):
+    """The best matches, found in the complete cosine similarity matrix."""
+    sim_df = pd.DataFrame(cosine_similarity(X))
+    sim_df = sim_df[sim_df >= clf.min_sim]
+    out_df = clf.plants_df.copy()
+    for yr in clf._years:
+        out_df[yr] = -1
+    for seed_yr in clf._years:
+        seed_idx = clf.plants_df.index[clf.plants_df.report_year == seed_yr]
+        for match_yr in clf._years:
+            match_idx = clf.plants_df.index[
+                clf.plants_df.report_year == match_yr]
+            out_df.iloc[seed_idx, out_df.columns.get_loc(match_yr)] = (
+                sim_df.iloc[seed_idx, match_idx].idxmax(axis=1))
+    out_df[clf._years] = out_df[clf._years].fillna(-1).astype(int)
+    return out_df
+
+
+def test_best_by_year_blocks():
+    """Blocked similarities find the same best matches as the full matrix."""
+    plants_df = _steam_plants()
+    pipe = pudl.transform.ferc1.make_ferc_clf(plants_df, min_sim=0.9)
+    X = pipe.named_steps['preprocessor'].fit_transform(plants_df)
+    clf = pipe.named_steps['classifier']
+    expected = _best_by_year_dense(clf, X)
+    years = list(clf._years)
+    # Some records have no good enough match, and the duplicated records
+    # match the first of the identical records in their own year.
+    assert (expected[years] == -1).any().any()
+    assert list(expected.loc[30:32, 2015]) == [0, 1, 2]
+
+    for block_size in (1000, 7, 1):
+        clf.block_size = block_size
+        pd.testing.assert_frame_equal(clf.fit(X)._best_of, expected)
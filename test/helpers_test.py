@@ -0,0 +1,33 @@
+"""Tests for the general purpose helper functions in pudl.helpers."""
+
+import numpy as np
+import pandas as pd
+import pudl
+
+
+def test_find_timezones(tmp_path):
+    """Vectorized, cached timezone lookups match the one-at-a-time ones."""
+    plants = pd.DataFrame({
+        'longitude': [-116.2, -116.20001, -104.99, np.nan, 500.0],
+        'latitude': [43.6, 43.6, 39.74, np.nan, 0.0],
+        'state': ['ID', 'ID', 'CO', 'TX', 'XX'],
+    })
+    cache_path = str(tmp_path / 'timezone_cache.csv')
+    for _ in range(2):
+        timezones = pudl.helpers.find_timezones(
+            lng=plants['longitude'], lat=plants['latitude'],
+            state=plants['state'], strict=False, cache_path=cache_path)
+        assert list(timezones[:4]) == [
+            'America/Boise', 'America/Boise', 'America/Denver',
+            'US/Central']
+        assert pd.isnull(timezones[4])
+    expected = pudl.helpers.find_timezone(lng=-104.99, lat=39.74)
+    assert timezones[2] == expected
+    # The two nearly identical Boise locations share a cache entry.
+    assert len(pd.read_csv(cache_path)) == 2
+
+    offsets = pudl.helpers.utc_offsets(timezones)
+    assert offsets.dtype == np.dtype('timedelta64[ns]')
+    assert list(pd.to_timedelta(offsets[:4]) / pd.Timedelta(hours=1)) == [
+        -7, -7, -7, -6]
+    assert np.isnat(offsets[4])
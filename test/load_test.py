@@ -0,0 +1,235 @@
+"""Tests for the PostgreSQL COPY loading helpers in pudl.load."""
+
+import io
+import struct
+import datetime
+import functools
+import threading
+import numpy as np
+import pandas as pd
+import sqlalchemy as sa
+import pudl.load
+
+
+def _decode_fields(buf):
+    """Split a binary COPY stream up into rows of raw field bytes."""
+    assert buf[:19] == pudl.load.PGCOPY_HEADER
+    pos = 19
+    rows = []
+    while True:
+        (nfields,) = struct.unpack_from('!h', buf, pos)
+        pos += 2
+        if nfields == -1:
+            break
+        row = []
+        for _ in range(nfields):
+            (length,) = struct.unpack_from('!i', buf, pos)
+            pos += 4
+            if length == -1:
+                row.append(None)
+            else:
+                row.append(buf[pos:pos + length])
+                pos += length
+        rows.append(row)
+    assert pos == len(buf)
+    return rows
+
+
+def test_pg_binary_encoding():
+    """Encode a mix of column types and NULLs and read them back."""
+    tbl = sa.Table(
+        'binary_copy_test', sa.MetaData(),
+        sa.Column('small', sa.SmallInteger),
+        sa.Column('integer', sa.Integer),
+        sa.Column('real', sa.REAL),
+        sa.Column('double', sa.Float),
+        sa.Column('money', sa.Numeric(14, 2)),
+        sa.Column('flag', sa.Boolean),
+        sa.Column('code', sa.Enum('a', 'bb', name='test_enum')),
+        sa.Column('text', sa.String),
+        sa.Column('day', sa.Date),
+        sa.Column('utc', sa.TIMESTAMP(timezone=True)),
+    )
+    df = pd.DataFrame({
+        'small': pd.array([1, None, -3], dtype='Int16'),
+        'integer': [10.0, np.nan, 30.0],
+        'real': np.array([1.5, np.nan, -2.25], dtype=np.float32),
+        'double': [0.1, 2.0, np.nan],
+        'money': [1234.56, -0.05, np.nan],
+        'flag': [True, None, False],
+        'code': pd.Categorical(['bb', None, 'a']),
+        'text': ['héllo', '', None],
+        'day': pd.to_datetime(['2000-01-02', None, '1999-12-31']),
+        'utc': pd.to_datetime(['2000-01-01 01:00', '2018-06-01', None],
+                              utc=True),
+    })
+    buf = b''.join(pudl.load._pg_binary_chunks(df, tbl, chunk_rows=2))
+    rows = _decode_fields(buf)
+
+    assert len(rows) == 3
+    assert rows[0][0] == struct.pack('!h', 1)
+    assert rows[1][0] is None
+    assert rows[2][1] == struct.pack('!i', 30)
+    assert rows[1][1] is None
+    assert rows[2][2] == struct.pack('!f', -2.25)
+    assert rows[1][2] is None
+    assert rows[0][3] == struct.pack('!d', 0.1)
+    # NUMERIC(14, 2): 4 base 10000 digits, weight 2, positive, dscale 2.
+    assert rows[0][4] == struct.pack('!8h', 4, 2, 0, 2, 0, 0, 1234, 5600)
+    assert rows[1][4] == struct.pack('!8h', 4, 2, 0x4000, 2, 0, 0, 0, 500)
+    assert rows[2][4] is None
+    assert [r[5] for r in rows] == [b'\x01', None, b'\x00']
+    assert [r[6] for r in rows] == [b'bb', None, b'a']
+    # Empty strings are NULL, just like in the CSV based loader.
+    assert [r[7] for r in rows] == ['héllo'.encode('utf-8'), None, None]
+    assert rows[0][8] == struct.pack('!i', 1)
+    assert rows[2][8] == struct.pack('!i', -1)
+    assert rows[0][9] == struct.pack('!q', 3600 * 10**6)
+    june = datetime.datetime(2018, 6, 1) - datetime.datetime(2000, 1, 1)
+    assert rows[1][9] == struct.pack('!q', int(june.total_seconds()) * 10**6)
+    assert rows[2][9] is None
+
+
+def test_chunk_stream_csv():
+    """Streaming CSV chunks reproduce to_csv(), and tee a copy of the data."""
+    df = pd.DataFrame({'plant_id_eia': range(25), 'plant_name': 'a, "b"'})
+    tee = io.BytesIO()
+    stream = pudl.load._ChunkStream(
+        pudl.load._csv_chunks(df, chunk_rows=10), tee=tee)
+    data = stream.read()
+    assert data == df.to_csv(index=False).encode('utf-8')
+    assert tee.getvalue() == data
+
+
+def test_bulk_copy_spills(monkeypatch):
+    """BulkCopy spills by rows, by bytes and at the shared ceiling."""
+    loaded = []
+    monkeypatch.setattr(pudl.load, '_dump_load',
+                        lambda df, table_name, engine, **kwargs:
+                        loaded.append((table_name, df)))
+    df = pd.DataFrame({'utility_id_eia': [1.0, np.nan, 3.0],
+                       'unitid': ['a' * 100, 'b' * 100, 'c' * 100]})
+    deep = pudl.load._frame_nbytes(df, 'deep')
+    assert pudl.load._frame_nbytes(df, 'sample') == deep
+    assert pudl.load._frame_nbytes(df, 'shallow') < deep / 2
+
+    spills = []
+    with pudl.load.BulkCopy('plants_eia860', None, max_rows=5,
+                            on_spill=spills.append) as loader:
+        for _ in range(4):
+            loader.add(df)
+    assert [(s.rows, s.reason) for s in spills] == [(6, 'rows'),
+                                                    (6, 'rows')]
+    # NA integers are fixed up for CSV output when the data is spilled.
+    assert loaded[0][1]['utility_id_eia'].dtype == object
+
+    spills.clear()
+    with pudl.load.BulkCopy('plants_eia860', None, buffer=deep + 1,
+                            on_spill=spills.append) as loader:
+        loader.add(df)
+        loader.add(df)
+        loader.add(df)
+    assert [s.reason for s in spills] == ['bytes', 'close']
+
+    spills.clear()
+    monkeypatch.setattr(pudl.load, '_buffer_ceiling', int(deep * 1.5))
+    with pudl.load.BulkCopy('a', None, on_spill=spills.append) as first:
+        with pudl.load.BulkCopy('b', None, on_spill=spills.append) as second:
+            first.add(df)
+            second.add(df)
+            assert spills[0].table_name == 'b'
+            assert spills[0].reason == 'ceiling'
+    assert [s.table_name for s in spills] == ['b', 'a']
+    assert pudl.load._buffered_bytes == {}
+
+
+def test_pg_binary_empty_strings():
+    """Empty strings can be kept, even when every value is empty."""
+    tbl = sa.Table('empty_strings_test', sa.MetaData(),
+                   sa.Column('text', sa.String),
+                   sa.Column('blank', sa.String))
+    df = pd.DataFrame({'text': ['a', '', None], 'blank': ['', '', '']})
+    rows = _decode_fields(b''.join(pudl.load._pg_binary_chunks(
+        df, tbl, null_empty_strings=False)))
+    assert rows == [[b'a', b''], [b'', b''], [None, b'']]
+    rows = _decode_fields(b''.join(pudl.load._pg_binary_chunks(df, tbl)))
+    assert rows == [[b'a', None], [None, None], [None, None]]
+
+
+def test_binary_keep_csv_ints(tmp_path, monkeypatch):
+    """The CSV kept by a binary COPY writes NA integers as integers."""
+    monkeypatch.setattr(pudl.load.postgres_copy, 'copy_from',
+                        lambda f, tbl, engine, **kwargs: None)
+    df = pd.DataFrame({'utility_id_eia': [1.0, np.nan, 3.0]})
+    pudl.load._binary_dump_load(df, 'plants_eia860', None,
+                                csvdir=str(tmp_path), keep_csv=True)
+    kept = (tmp_path / 'plants_eia860.csv').read_text()
+    assert kept.splitlines() == ['utility_id_eia', '1', '', '3']
+
+
+def test_defer_indexes():
+    """Primary keys are deferred, unless a foreign key refers to them."""
+    statements = []
+
+    class FakeConnection(object):
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *args):
+            pass
+
+        def execute(self, sql):
+            statements.append(sql)
+
+    class FakeEngine(object):
+        def begin(self):
+            return FakeConnection()
+
+    indexes = pudl.load.defer_indexes(
+        FakeEngine(), ['generation_eia923', 'plants_entity_eia'])
+    assert [index.name for index in indexes] == ['generation_eia923_pkey']
+    assert indexes[0].unique
+    assert indexes[0].info['constraint'] == 'PRIMARY KEY'
+    assert [col.name for col in indexes[0].columns] == ['id']
+    assert statements == ['ALTER TABLE "generation_eia923" '
+                          'DROP CONSTRAINT IF EXISTS "generation_eia923_pkey"']
+    # The stand in index isn't added to the PUDL metadata.
+    tables = pudl.models.entities.PUDLBase.metadata.tables
+    assert not tables['generation_eia923'].indexes
+
+
+def test_bulk_copy_when_loaded(monkeypatch):
+    """Callbacks run once earlier data is committed, without blocking."""
+    release = threading.Event()
+
+    def dump_load(df, table_name, engine, **kwargs):
+        # Hold up the first spill, so the later ones finish before it.
+        if df['x'].iloc[0] == 0:
+            assert release.wait(10)
+
+    class FakeConnection(object):
+        def commit(self):
+            pass
+
+        def rollback(self):
+            pass
+
+        def close(self):
+            pass
+
+    class FakeEngine(object):
+        def raw_connection(self):
+            return FakeConnection()
+
+    monkeypatch.setattr(pudl.load, '_dump_load', dump_load)
+    done = []
+    with pudl.load.BulkCopy('a', FakeEngine(), max_rows=1, writers=2,
+                            on_spill=None) as loader:
+        loader.when_loaded(functools.partial(done.append, 'nothing'))
+        for i in range(3):
+            loader.add(pd.DataFrame({'x': [i]}))
+            loader.when_loaded(functools.partial(done.append, i))
+        # Everything has been handed off, but the first spill isn't in yet.
+        assert done == ['nothing']
+        release.set()
+    assert done == ['nothing', 0, 1, 2]